@@ -0,0 +1,244 @@
+"""
+Map-reduce analysis of an experiment's downloaded output files. An analyzer maps the files of one simulation to a
+small result and reduces the results of all simulations to one answer. Map runs in a process pool, and each
+analyzer's results are cached on disk keyed by its version and the checksums of the files it read, so re-running
+an analysis, updating it when more simulations finish, or adding or changing one analyzer, only maps what hasn't
+been mapped before.
+
+Example::
+
+    class InfectedAfterVax( Analyzer ):
+        filenames = [ "ReportTyphoidByAgeAndGender.csv" ]
+
+        def map( self, files, sim ):
+            df = pd.read_csv( files["ReportTyphoidByAgeAndGender.csv"] )
+            df.columns = [ column.strip() for column in df.columns ]
+            return df.loc[ df["Time Of Report (Year)"] >= CAMP_START_YEAR, "Infected" ].sum()
+
+        def reduce( self, results ):
+            return pd.Series( results ).sort_index()
+
+    analysis = ExperimentAnalysis( experiment.id, [ InfectedAfterVax() ], cache_dir=".analysis_cache" )
+    infected = analysis.run()["InfectedAfterVax"]
+"""
+import abc
+import glob
+import hashlib
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+
+class Analyzer( abc.ABC ):
+    """
+    Base class for analyzers. Subclasses set filenames and implement map and reduce. Analyzers are pickled to
+    worker processes, so keep their state small and picklable.
+
+    Attributes:
+        filenames: Output files every simulation needs, relative to the simulation's directory (e.g.,
+            "output/InsetChart.json").
+        version: Bump when map changes, so cached map results are not reused.
+    """
+    filenames = []
+    version = 1
+
+    @property
+    def uid( self ):
+        """Name of the analyzer in results and cache keys. Defaults to the class name."""
+        return type( self ).__name__
+
+    @abc.abstractmethod
+    def map( self, files, sim ):
+        """
+        Return the result for one simulation.
+
+        Args:
+            files: {filename: path} for this simulation's files.
+            sim: Simulation id (its directory relative to the experiment directory).
+        """
+
+    def reduce( self, results ):
+        """
+        Return the experiment-level answer from {sim: map result} (with every simulation mapped so far).
+        """
+        return results
+
+
+class FunctionAnalyzer( Analyzer ):
+    """
+    Analyzer from plain functions: map_fn( files, sim ) and optionally reduce_fn( results ). Both must be
+    module-level functions to be usable with a process pool.
+    """
+    def __init__( self, name, filenames, map_fn, reduce_fn=None, version=1 ):
+        self.name = name
+        self.filenames = list( filenames )
+        self.map_fn = map_fn
+        self.reduce_fn = reduce_fn
+        self.version = version
+
+    @property
+    def uid( self ):
+        return self.name
+
+    def map( self, files, sim ):
+        return self.map_fn( files, sim )
+
+    def reduce( self, results ):
+        return results if self.reduce_fn is None else self.reduce_fn( results )
+
+
+def _map_sim( analyzers, sim, files ):
+    return { analyzer.uid: analyzer.map( { name: files[name] for name in analyzer.filenames }, sim )
+             for analyzer in analyzers }
+
+
+class ExperimentAnalysis:
+    """
+    Runs analyzers over the simulations under an experiment directory, as laid out by
+    task.get_file_from_comps or platform downloads: <root>/<sim>/<files>.
+
+    Args:
+        root: Experiment directory.
+        analyzers: List of Analyzer instances with distinct uids.
+        cache_dir: Directory for cached map results. None keeps results in memory only.
+        processes: Worker processes for map. None uses all cores; 1 maps serially.
+    """
+    def __init__( self, root, analyzers, cache_dir=None, processes=None ):
+        uids = [ analyzer.uid for analyzer in analyzers ]
+        if len( set( uids ) ) != len( uids ):
+            raise ValueError( f"Analyzer uids must be unique, got {uids}." )
+        self.root = root
+        self.analyzers = list( analyzers )
+        self.cache_dir = cache_dir
+        self.processes = processes
+        self.results = { uid: {} for uid in uids }
+        self._keys = {}  # ( analyzer uid, sim ) -> cache key of its mapped result
+        self._stats = {}  # path -> ( size, mtime_ns, sha256 ), so unchanged files aren't hashed again
+        if cache_dir:
+            os.makedirs( cache_dir, exist_ok=True )
+            index = os.path.join( cache_dir, "index.json" )
+            if os.path.isfile( index ):
+                with open( index ) as index_file:
+                    self._stats = { path: tuple( stat ) for path, stat in json.load( index_file ).items() }
+
+    @property
+    def filenames( self ):
+        return sorted( { name for analyzer in self.analyzers for name in analyzer.filenames } )
+
+    def find_sims( self ):
+        """
+        Return {sim: {filename: path}} for every simulation directory that has all the analyzers' files.
+        """
+        filenames = self.filenames
+        if not filenames:
+            return {}
+        sims = {}
+        depth = len( os.path.normpath( filenames[0] ).split( os.sep ) )
+        for path in glob.glob( os.path.join( self.root, "**", filenames[0] ), recursive=True ):
+            sim_dir = path
+            for _ in range( depth ):
+                sim_dir = os.path.dirname( sim_dir )
+            files = { name: os.path.join( sim_dir, name ) for name in filenames }
+            if all( os.path.isfile( file_path ) for file_path in files.values() ):
+                sims[ os.path.relpath( sim_dir, self.root ) ] = files
+        return dict( sorted( sims.items() ) )
+
+    def _checksum( self, path ):
+        stat = os.stat( path )
+        cached = self._stats.get( path )
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        digest = hashlib.sha256()
+        with open( path, "rb" ) as raw_file:
+            for chunk in iter( lambda: raw_file.read( 1 << 20 ), b"" ):
+                digest.update( chunk )
+        self._stats[path] = ( stat.st_size, stat.st_mtime_ns, digest.hexdigest() )
+        return digest.hexdigest()
+
+    def _key( self, analyzer, files ):
+        digest = hashlib.sha256()
+        digest.update( f"{analyzer.uid}:{analyzer.version};".encode() )
+        for name in sorted( analyzer.filenames ):
+            digest.update( f"{name}:{self._checksum( files[name] )};".encode() )
+        return digest.hexdigest()
+
+    def _cache_path( self, key ):
+        return os.path.join( self.cache_dir, key[:2], key + ".pkl" )
+
+    def _store( self, sim, keys, mapped ):
+        for uid, result in mapped.items():
+            self._keys[ ( uid, sim ) ] = keys[uid]
+            self.results[uid][sim] = result
+            if self.cache_dir:
+                path = self._cache_path( keys[uid] )
+                os.makedirs( os.path.dirname( path ), exist_ok=True )
+                with open( path + ".tmp", "wb" ) as cache_file:
+                    pickle.dump( result, cache_file )
+                os.replace( path + ".tmp", path )
+
+    def update( self ):
+        """
+        Map every simulation that is new or whose files changed since the last update, from the cache where
+        possible. Returns the list of simulations with new results.
+        """
+        updated = {}
+        pending = {}  # sim -> ( files, {uid: key}, analyzers to map )
+        for sim, files in self.find_sims().items():
+            for analyzer in self.analyzers:
+                key = self._key( analyzer, files )
+                if self._keys.get( ( analyzer.uid, sim ) ) == key:
+                    continue
+                updated[sim] = True
+                if self.cache_dir and os.path.isfile( self._cache_path( key ) ):
+                    with open( self._cache_path( key ), "rb" ) as cache_file:
+                        self.results[analyzer.uid][sim] = pickle.load( cache_file )
+                    self._keys[ ( analyzer.uid, sim ) ] = key
+                    continue
+                _, keys, analyzers = pending.setdefault( sim, ( files, {}, [] ) )
+                keys[analyzer.uid] = key
+                analyzers.append( analyzer )
+
+        if self.processes == 1 or len( pending ) < 2:
+            for sim, ( files, keys, analyzers ) in pending.items():
+                self._store( sim, keys, _map_sim( analyzers, sim, files ) )
+        else:
+            with ProcessPoolExecutor( max_workers=self.processes ) as pool:
+                futures = { sim: pool.submit( _map_sim, analyzers, sim, files )
+                            for sim, ( files, _, analyzers ) in pending.items() }
+                for sim, future in futures.items():
+                    self._store( sim, pending[sim][1], future.result() )
+
+        if self.cache_dir:
+            with open( os.path.join( self.cache_dir, "index.json" ), "w" ) as index_file:
+                json.dump( self._stats, index_file )
+        return list( updated )
+
+    def reduce( self ):
+        """
+        Return {analyzer uid: reduce result} over every simulation mapped so far.
+        """
+        return { analyzer.uid: analyzer.reduce( dict( sorted( self.results[analyzer.uid].items() ) ) )
+                 for analyzer in self.analyzers }
+
+    def run( self ):
+        """
+        Update and reduce.
+        """
+        self.update()
+        return self.reduce()
+
+    def watch( self, expected, interval=30, timeout=None ):
+        """
+        Yield a new reduction each time more simulations have finished, until expected simulations have been
+        mapped (or timeout seconds have passed), for looking at an experiment while it runs.
+        """
+        start = time.time()
+        while True:
+            if self.update():
+                yield self.reduce()
+            mapped = min( ( len( results ) for results in self.results.values() ), default=0 )
+            if mapped >= expected or ( timeout is not None and time.time() - start > timeout ):
+                return
+            time.sleep( interval )
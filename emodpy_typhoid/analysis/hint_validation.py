@@ -0,0 +1,214 @@
+"""
+Vectorized validation of HINT (heterogeneous intra-node transmission) results across all simulations of an
+experiment. Reports are loaded in a process pool and stacked into one (simulations x time) array per channel,
+and each expectation is evaluated for all simulations at once.
+
+Example::
+
+    channels = load_channels( glob( f"{exp_id}/**/PropertyReportTyphoid.json", recursive=True ) )
+    checks = hint_expectations( "Region", ["A", "B", "C", "D"], [[0, 1, 2, 5], [0] * 4, [0] * 4, [0] * 4],
+                                seeded_value="A" )
+    table = validate( channels, checks )
+    assert table.passed.all(), table[~table.passed]
+"""
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+def read_property_report( path ):
+    """
+    Read a PropertyReportTyphoid.json into {channel name: data list}.
+    """
+    with open( path ) as report_file:
+        report = json.load( report_file )
+    return { name: channel["Data"] for name, channel in report["Channels"].items() }
+
+
+def read_age_gender_report( path, columns=( "Newly Infected", "Infected", "Population" ) ):
+    """
+    Read a ReportTyphoidByAgeAndGender.csv into {"<column>/<HINT Group>": values per report time}, summing over
+    age and gender, so it can be validated like a property report.
+    """
+    df = pd.read_csv( path )
+    df.columns = [ column.strip() for column in df.columns ]
+    time_column = "Time Of Report (Year)"
+    grouped = df.groupby( [ "HINT Group", time_column ] )[ list( columns ) ].sum()
+    channels = {}
+    for group in grouped.index.get_level_values( 0 ).unique():
+        for column in columns:
+            channels[ f"{column}/{group.strip()}" ] = grouped.loc[group][column].tolist()
+    return channels
+
+
+def load_channels( paths, reader=read_property_report, processes=None ):
+    """
+    Read one report per simulation and stack every channel into a (simulations x time) array.
+
+    Args:
+        paths: Report paths, one per simulation. Rows of the arrays follow this order.
+        reader: Function reading one path into {channel: values}, e.g., read_property_report or
+            read_age_gender_report. Must be picklable (module-level) when processes != 1.
+        processes: Worker processes for reading. None uses all cores; 1 reads serially.
+
+    Returns:
+        Dict of channel name to numpy array. Channels missing from some simulation are dropped.
+    """
+    paths = list( paths )
+    if processes == 1 or len( paths ) < 2:
+        reports = [ reader( path ) for path in paths ]
+    else:
+        with ProcessPoolExecutor( max_workers=processes ) as pool:
+            reports = list( pool.map( reader, paths ) )
+    if not reports:
+        return {}
+
+    common = set( reports[0] ).intersection( *reports[1:] )
+    channels = {}
+    for name in sorted( common ):
+        lengths = { len( report[name] ) for report in reports }
+        if len( lengths ) > 1:
+            raise ValueError( f"Channel '{name}' has different lengths across simulations: {sorted( lengths )}." )
+        channels[name] = np.array( [ report[name] for report in reports ], dtype=float )
+    return channels
+
+
+def expect_zero( channel ):
+    """The channel is zero at every time step."""
+    return { "check": "zero", "channels": [ channel ] }
+
+
+def expect_positive( channel ):
+    """The channel sums to more than zero."""
+    return { "check": "positive", "channels": [ channel ] }
+
+
+def expect_nonnegative( channel ):
+    """The channel is never negative."""
+    return { "check": "nonnegative", "channels": [ channel ] }
+
+
+def expect_increasing( channels ):
+    """Channel totals are strictly increasing in the given order, e.g., new infections B < C < D."""
+    return { "check": "increasing", "channels": list( channels ) }
+
+
+def expect_route_split( contact_channel, environment_channel, contact_fraction, tolerance=0.05 ):
+    """The contact route's share of total contagion is within tolerance of contact_fraction."""
+    return { "check": "route_split", "channels": [ contact_channel, environment_channel ],
+             "expected": contact_fraction, "tolerance": tolerance }
+
+
+def hint_expectations( ip_key, ip_values, contact_matrix, enviro_matrix=None, seeded_value=None,
+                       contagion_name="Contagion: {route}", ordering_channel="Newly Infected", infected_values=() ):
+    """
+    Derive expectations from HINT transmission matrices as passed to AddIndividualPropertyAndHINT.
+
+    A group whose matrix column is all zero can't receive contagion by that route, so its contagion channel must
+    be zero. A group reached by the seeded group, or by one of infected_values, must see some; a group reached
+    only from groups that may have no infections must just not be negative. If seeded_value names the only
+    initially infected group, the destination groups it reaches with distinct positive rates must have
+    increasing totals of ordering_channel.
+
+    Args:
+        ip_key: Individual property used for HINT, e.g., "Region".
+        ip_values: Property values in matrix order, e.g., ["A", "B", "C", "D"].
+        contact_matrix: TransmissionMatrix (source rows, destination columns).
+        enviro_matrix: Optional EnviroTransmissionMatrix.
+        seeded_value: Property value where the outbreak was seeded.
+        contagion_name: Channel name template for contagion by route.
+        ordering_channel: Channel whose totals are ordered, e.g., "Newly Infected" from
+            ReportTyphoidByAgeAndGender or "New Infections" from the property report.
+        infected_values: Other property values known to have infections, e.g., groups with endemic infection.
+
+    Returns:
+        List of expectations for validate().
+    """
+    expectations = []
+    infected = np.isin( list( ip_values ), [ seeded_value, *infected_values ] )
+    for route, matrix in ( ( "Contact", contact_matrix ), ( "Environment", enviro_matrix ) ):
+        if matrix is None:
+            continue
+        matrix = np.asarray( matrix, dtype=float )
+        reaches = matrix.sum( axis=0 ) > 0
+        reaches_infected = matrix[infected].sum( axis=0 ) > 0
+        for value, reached, from_infected in zip( ip_values, reaches, reaches_infected ):
+            channel = f"{contagion_name.format( route=route )}/{ip_key}:{value}"
+            if from_infected:
+                expectations.append( expect_positive( channel ) )
+            elif reached:
+                expectations.append( expect_nonnegative( channel ) )
+            else:
+                expectations.append( expect_zero( channel ) )
+
+    if seeded_value is not None:
+        row = np.asarray( contact_matrix, dtype=float )[ list( ip_values ).index( seeded_value ) ]
+        ranked = sorted( ( rate, value ) for rate, value in zip( row, ip_values ) if rate > 0 and value != seeded_value )
+        rates = [ rate for rate, _ in ranked ]
+        if len( ranked ) > 1 and len( set( rates ) ) == len( rates ):
+            expectations.append( expect_increasing( [ f"{ordering_channel}/{ip_key}:{value}" for _, value in ranked ] ) )
+    return expectations
+
+
+def _evaluate( channels, expectation ):
+    arrays = [ channels[name] for name in expectation["channels"] ]
+    check = expectation["check"]
+    if check == "zero":
+        value = np.abs( arrays[0] ).max( axis=1 )
+        passed = value == 0
+    elif check == "positive":
+        value = arrays[0].sum( axis=1 )
+        passed = value > 0
+    elif check == "nonnegative":
+        value = arrays[0].min( axis=1 )
+        passed = value >= 0
+    elif check == "increasing":
+        totals = np.stack( [ array.sum( axis=1 ) for array in arrays ] )
+        value = np.diff( totals, axis=0 ).min( axis=0 )
+        passed = value > 0
+    elif check == "route_split":
+        contact = arrays[0].sum( axis=1 )
+        total = contact + arrays[1].sum( axis=1 )
+        with np.errstate( invalid="ignore", divide="ignore" ):
+            value = contact / total
+        passed = np.abs( value - expectation["expected"] ) <= expectation["tolerance"]
+    else:
+        raise ValueError( f"Unknown check '{check}'." )
+    return value, passed
+
+
+def validate( channels, expectations, sim_ids=None ):
+    """
+    Evaluate expectations against stacked channels from load_channels.
+
+    Args:
+        channels: Dict of channel name to (simulations x time) arrays.
+        expectations: List of expectations from the expect_* functions or hint_expectations.
+        sim_ids: Optional labels for the simulations, in row order. Defaults to row numbers.
+
+    Returns:
+        DataFrame with one row per simulation and expectation: sim, check, channels, value, passed.
+        A missing channel fails its expectation for every simulation.
+    """
+    n_sims = len( next( iter( channels.values() ) ) ) if channels else 0
+    sim_ids = list( range( n_sims ) ) if sim_ids is None else list( sim_ids )
+    frames = []
+    for expectation in expectations:
+        missing = [ name for name in expectation["channels"] if name not in channels ]
+        if missing:
+            value = np.full( n_sims, np.nan )
+            passed = np.zeros( n_sims, dtype=bool )
+        else:
+            value, passed = _evaluate( channels, expectation )
+        frames.append( pd.DataFrame( {
+            "sim": sim_ids,
+            "check": expectation["check"],
+            "channels": ", ".join( expectation["channels"] ),
+            "value": value,
+            "passed": passed
+        } ) )
+    if not frames:
+        return pd.DataFrame( columns=[ "sim", "check", "channels", "value", "passed" ] )
+    return pd.concat( frames, ignore_index=True )
@@ -0,0 +1,144 @@
+"""
+Paired differences between the arms of a common-random-numbers experiment (see
+emodpy_typhoid.sweeps.pairing). Each simulation's output (a number or a series, e.g., new infections by year) is
+stacked into an array, treatment and control are lined up by pair, and the differences and their confidence
+intervals are computed for all pairs and time points at once.
+
+Example::
+
+    # sim_arms: {sim: (tags["_arm"], tags["_pair"])} from the simulations' tags
+    analyzer = PairedDifferenceAnalyzer( "vax_effect", treatment="vax", control="no_vax", arms=sim_arms )
+    result = ExperimentAnalysis( experiment_dir, [ analyzer ] ).run()["vax_effect"]
+    result["mean"], result["ci_low"], result["ci_high"]
+"""
+import numpy as np
+import pandas as pd
+
+from emodpy_typhoid.analysis.analyzer import Analyzer
+
+REPORT = "ReportTyphoidByAgeAndGender.csv"
+
+
+def paired_differences( values, arms, pairs, treatment, control, z=1.96 ):
+    """
+    Compute treatment - control differences pair by pair.
+
+    Args:
+        values: Outputs, one row per simulation: an array of shape (sims,) or (sims, points).
+        arms: Arm of each simulation.
+        pairs: Pair (Run_Number) of each simulation.
+        treatment: Arm name of the treatment.
+        control: Arm name of the control.
+        z: Normal quantile of the confidence intervals.
+
+    Returns:
+        Dict with "pairs" (pair ids with both arms), "differences" (pairs x points), "mean", "se", "ci_low",
+        "ci_high", the "unpaired_se" an unpaired comparison of the same runs would have, and
+        "variance_reduction" (unpaired over paired variance, i.e., how many times fewer replicates the pairing
+        needs).
+    """
+    values = np.asarray( values, dtype=float )
+    scalar = values.ndim == 1
+    values = values.reshape( len( values ), -1 )
+    arms = np.asarray( arms )
+    pairs = np.asarray( pairs )
+    frames = {}
+    for arm in ( treatment, control ):
+        mask = arms == arm
+        if not mask.any():
+            raise ValueError( f"No simulations in arm '{arm}'." )
+        if len( np.unique( pairs[mask] ) ) != mask.sum():
+            raise ValueError( f"Arm '{arm}' has more than one simulation in some pair." )
+        frames[arm] = pd.DataFrame( values[mask], index=pairs[mask] )
+    common = frames[treatment].index.intersection( frames[control].index ).sort_values()
+    if len( common ) < 2:
+        raise ValueError( f"Need at least 2 complete pairs, got {len( common )}." )
+    treated = frames[treatment].loc[common].to_numpy()
+    untreated = frames[control].loc[common].to_numpy()
+    differences = treated - untreated
+    n = len( common )
+    mean = differences.mean( axis=0 )
+    se = differences.std( axis=0, ddof=1 ) / np.sqrt( n )
+    unpaired_se = np.sqrt( ( treated.var( axis=0, ddof=1 ) + untreated.var( axis=0, ddof=1 ) ) / n )
+    with np.errstate( divide="ignore", invalid="ignore" ):
+        reduction = unpaired_se ** 2 / se ** 2
+
+    def shape( array ):
+        return array[0] if scalar else array
+    return { "pairs": common.tolist(), "differences": differences[:, 0] if scalar else differences,
+             "mean": shape( mean ), "se": shape( se ), "ci_low": shape( mean - z * se ),
+             "ci_high": shape( mean + z * se ), "unpaired_se": shape( unpaired_se ),
+             "variance_reduction": shape( reduction ) }
+
+
+def replicates_needed( result, half_width, z=1.96 ):
+    """
+    Return the number of pairs needed for confidence intervals of +/- half_width, from a paired_differences
+    result.
+    """
+    sd = np.asarray( result["se"] ) * np.sqrt( len( result["pairs"] ) )
+    return np.ceil( ( z * sd / half_width ) ** 2 ).astype( int )
+
+
+def new_infections_by_year( files, sim, column="Newly Infected" ):
+    """
+    Map function: incidence by whole year, i.e., the new infections in ReportTyphoidByAgeAndGender.csv summed
+    over each year's reports (and all ages and genders). column picks another count to sum.
+    """
+    report = pd.read_csv( files[REPORT] )
+    report.columns = [ name.strip() for name in report.columns ]
+    years = report["Time Of Report (Year)"].astype( int )
+    return report.groupby( years )[column].sum()
+
+
+class PairedDifferenceAnalyzer( Analyzer ):
+    """
+    Analyzer of the paired differences between two arms.
+
+    Args:
+        name: Analyzer uid.
+        treatment: Treatment arm name.
+        control: Control arm name.
+        arms: {sim: (arm, pair)}, or a module-level function sim -> (arm, pair). Simulations without an arm
+            are skipped.
+        map_fn: Module-level function( files, sim ) returning a number or a pandas Series (e.g., by year).
+            Defaults to new_infections_by_year.
+        filenames: Files map_fn reads.
+    """
+    def __init__( self, name, treatment, control, arms, map_fn=new_infections_by_year, filenames=( REPORT, ), z=1.96 ):
+        self.name = name
+        self.treatment = treatment
+        self.control = control
+        self.arms = arms
+        self.map_fn = map_fn
+        self.filenames = list( filenames )
+        self.z = z
+
+    @property
+    def uid( self ):
+        return self.name
+
+    def map( self, files, sim ):
+        return self.map_fn( files, sim )
+
+    def _arm( self, sim ):
+        return self.arms( sim ) if callable( self.arms ) else self.arms.get( sim )
+
+    def reduce( self, results ):
+        sims = [ sim for sim in results if self._arm( sim ) is not None ]
+        outputs = [ results[sim] for sim in sims ]
+        index = None
+        if outputs and isinstance( outputs[0], pd.Series ):
+            index = outputs[0].index
+            # aligning series with different points (a simulation that stopped early) would only give NaNs
+            mismatched = [ sim for sim, output in zip( sims, outputs ) if not output.index.equals( index ) ]
+            if mismatched:
+                raise ValueError( f"{len( mismatched )} simulation(s), e.g., {mismatched[:5]}, have different points "
+                                  f"than {sims[0]} ({list( index )}); every simulation needs the same ones." )
+            outputs = np.array( [ output.to_numpy() for output in outputs ] )
+        arms, pairs = zip( *[ self._arm( sim ) for sim in sims ] ) if sims else ( (), () )
+        result = paired_differences( outputs, arms, pairs, self.treatment, self.control, self.z )
+        if index is not None:
+            for key in ( "mean", "se", "ci_low", "ci_high", "unpaired_se", "variance_reduction" ):
+                result[key] = pd.Series( result[key], index=index )
+        return result
@@ -0,0 +1,189 @@
+"""
+Global sensitivity analysis over config parameters (e.g., the Typhoid_* parameters of set_param_fn), for
+screening which ones drive an output without a full grid.
+
+morris_design and saltelli_design return sweep tables (see emodpy_typhoid.sweeps.table) with one row per
+simulation. Rows are grouped into blocks (a Morris trajectory, or one Saltelli sample with its k+2 points),
+tagged _block and _point. Once outputs come in, SensitivityAnalysis computes the indices from the blocks that
+are complete so far. It can be updated as batches of simulations finish. Everything is computed on stacked
+arrays: all blocks, bootstrap resamples and output points at once.
+
+Example::
+
+    ranges = { "Typhoid_Acute_Infectiousness": ( 2000, 6000 ), "Typhoid_Exposure_Lambda": ( 1, 10 ), ... }
+    design = morris_design( ranges, trajectories=20, seed=1 )
+    sweep = SweepTable( design, tags_path="gsa.csv" )
+    ...
+    analysis = SensitivityAnalysis( design, method="morris", ranges=ranges )
+    analysis.update( { sweep_row: infected } )  # as simulations finish
+    analysis.indices()  # mu_star, sigma and bootstrap confidence intervals per parameter
+"""
+import numpy as np
+import pandas as pd
+
+BLOCK = "_block"
+POINT = "_point"
+MORRIS = "morris"
+SOBOL = "sobol"
+
+
+def _scale( unit, ranges ):
+    low = np.array( [ bounds[0] for bounds in ranges.values() ], dtype=float )
+    high = np.array( [ bounds[1] for bounds in ranges.values() ], dtype=float )
+    if np.any( high <= low ):
+        raise ValueError( "Every range needs low < high." )
+    return pd.DataFrame( low + unit * ( high - low ), columns=list( ranges ) )
+
+
+def morris_design( ranges, trajectories, levels=4, seed=None ):
+    """
+    Return a Morris design: trajectories of k+1 points on a levels-level grid, each moving one parameter at a
+    time by levels / ( 2 * ( levels - 1 ) ) of its range.
+
+    Args:
+        ranges: {parameter: (low, high)}.
+        trajectories: Number of trajectories (10 to 50 is usual).
+        levels: Grid levels (even).
+        seed: Random seed.
+    """
+    if levels < 2 or levels % 2:
+        raise ValueError( f"levels must be even and at least 2, got {levels}." )
+    k = len( ranges )
+    rng = np.random.default_rng( seed )
+    delta = levels / ( 2 * ( levels - 1 ) )
+    base = rng.integers( 0, levels // 2, size=( trajectories, k ) ) / ( levels - 1 )
+    signs = rng.choice( [ -1.0, 1.0 ], size=( trajectories, k ) )
+    start = np.where( signs > 0, base, base + delta )
+    order = np.argsort( rng.random( ( trajectories, k ) ), axis=1 )  # parameter moved at each step
+    steps = np.zeros( ( trajectories, k + 1, k ) )
+    rows = np.arange( trajectories )[:, None]
+    steps[ rows, np.arange( 1, k + 1 )[None, :], order ] = signs[ rows, order ] * delta
+    unit = start[:, None, :] + np.cumsum( steps, axis=1 )
+    design = _scale( unit.reshape( -1, k ), ranges )
+    design[BLOCK] = np.repeat( np.arange( trajectories ), k + 1 )
+    design[POINT] = np.tile( np.arange( k + 1 ), trajectories )
+    return design
+
+
+def saltelli_design( ranges, samples, seed=None ):
+    """
+    Return a Saltelli design for first-order and total Sobol indices: for each of samples base points, A, B and
+    the k points AB_i (A with parameter i taken from B), so k + 2 simulations per sample. Uses a scrambled
+    Sobol sequence when scipy is installed, otherwise random sampling.
+    """
+    k = len( ranges )
+    try:
+        from scipy.stats import qmc
+        base = qmc.Sobol( d=2 * k, scramble=True, seed=seed ).random( samples )
+    except ImportError:
+        base = np.random.default_rng( seed ).random( ( samples, 2 * k ) )
+    a, b = base[:, :k], base[:, k:]
+    ab = np.repeat( a[:, None, :], k, axis=1 )
+    ab[ :, np.arange( k ), np.arange( k ) ] = b
+    unit = np.concatenate( [ a[:, None, :], b[:, None, :], ab ], axis=1 )
+    design = _scale( unit.reshape( -1, k ), ranges )
+    design[BLOCK] = np.repeat( np.arange( samples ), k + 2 )
+    design[POINT] = np.tile( np.arange( k + 2 ), samples )
+    return design
+
+
+def _morris( outputs, values, bootstrap, rng, z ):
+    # outputs: ( blocks, k+1, T ); values: ( blocks, k+1, k ), parameter values of each point
+    steps = np.diff( values, axis=1 )  # ( blocks, k, k ), one nonzero per step
+    moved = np.argmax( np.abs( steps ), axis=2 )
+    delta = np.take_along_axis( steps, moved[:, :, None], axis=2 )[:, :, 0]
+    effects = np.empty( ( outputs.shape[0], values.shape[2], outputs.shape[2] ) )
+    rows = np.arange( outputs.shape[0] )[:, None]
+    effects[ rows, moved ] = np.diff( outputs, axis=1 ) / delta[:, :, None]
+
+    def stats( ee ):  # ee: ( ..., blocks, k, T )
+        return np.abs( ee ).mean( axis=-3 ), ee.mean( axis=-3 ), ee.std( axis=-3, ddof=1 )
+    mu_star, mu, sigma = stats( effects )
+    resampled = effects[ rng.integers( 0, len( effects ), size=( bootstrap, len( effects ) ) ) ]
+    mu_star_boot = stats( resampled )[0]
+    return { "mu_star": mu_star, "mu_star_conf": z * mu_star_boot.std( axis=0, ddof=1 ), "mu": mu,
+             "sigma": sigma }
+
+
+def _sobol( outputs, bootstrap, rng, z ):
+    # outputs: ( samples, k+2, T ) as A, B, AB_1..AB_k
+    def indices( f ):  # f: ( ..., samples, k+2, T )
+        f_a, f_b, f_ab = f[..., 0:1, :], f[..., 1:2, :], f[..., 2:, :]
+        variance = np.concatenate( [ f_a, f_b ], axis=-2 ).var( axis=( -3, -2 ), ddof=1 )[..., None, :]
+        with np.errstate( divide="ignore", invalid="ignore" ):
+            first = ( f_b * ( f_ab - f_a ) ).mean( axis=-3 ) / variance
+            total = 0.5 * ( ( f_a - f_ab ) ** 2 ).mean( axis=-3 ) / variance
+        return first, total
+    s1, st = indices( outputs )
+    resampled = outputs[ rng.integers( 0, len( outputs ), size=( bootstrap, len( outputs ) ) ) ]
+    s1_boot, st_boot = indices( resampled )
+    return { "S1": s1, "S1_conf": z * s1_boot.std( axis=0, ddof=1 ), "ST": st,
+             "ST_conf": z * st_boot.std( axis=0, ddof=1 ) }
+
+
+class SensitivityAnalysis:
+    """
+    Sensitivity indices from the outputs of a morris_design or saltelli_design sweep.
+
+    Args:
+        design: The design DataFrame (its row number is the sweep_row).
+        method: "morris" or "sobol".
+        ranges: The design's {parameter: (low, high)}. With ranges, Morris effects are per full range of the
+            parameter, which makes parameters comparable; without, per unit of the parameter, and every column
+            not starting with "_" is taken to be a parameter.
+    """
+    def __init__( self, design, method=MORRIS, ranges=None ):
+        if method not in ( MORRIS, SOBOL ):
+            raise ValueError( f"method must be '{MORRIS}' or '{SOBOL}', got '{method}'." )
+        self.method = method
+        self.parameters = list( ranges ) if ranges else [ column for column in design.columns
+                                                          if not column.startswith( "_" ) ]
+        self.points = int( design[POINT].max() ) + 1
+        expected = len( self.parameters ) + ( 1 if method == MORRIS else 2 )
+        if self.points != expected:
+            raise ValueError( f"A {method} design of {len( self.parameters )} parameters has {expected} points per "
+                              f"block, this one has {self.points}." )
+        self.design = design.reset_index( drop=True )
+        self.ranges = ranges
+        self.outputs = {}  # sweep_row -> output
+
+    def update( self, outputs ):
+        """Add {sweep_row: output} for simulations that finished. Outputs are numbers or equal-length sequences."""
+        self.outputs.update( outputs )
+
+    def complete_blocks( self ):
+        """Return the blocks whose simulations all have outputs."""
+        done = self.design.loc[ list( self.outputs ), BLOCK ].value_counts()
+        return sorted( done.index[ done == self.points ] )
+
+    def indices( self, bootstrap=1000, seed=None, confidence=0.95 ):
+        """
+        Return the indices from the complete blocks as a DataFrame indexed by parameter. Morris gives mu_star
+        (mean absolute elementary effect), mu_star_conf, mu and sigma; Sobol gives S1,
+        S1_conf, ST and ST_conf. *_conf are half-widths of bootstrap confidence intervals. For sequence outputs,
+        columns are (index, point).
+        """
+        from statistics import NormalDist
+        blocks = self.complete_blocks()
+        if len( blocks ) < 2:
+            raise ValueError( f"Need at least 2 complete blocks, have {len( blocks )}." )
+        rows = self.design.index[ self.design[BLOCK].isin( blocks ) ]
+        rows = rows[ np.lexsort( ( self.design.loc[rows, POINT], self.design.loc[rows, BLOCK] ) ) ]
+        outputs = np.array( [ np.atleast_1d( np.asarray( self.outputs[row], dtype=float ) ) for row in rows ] )
+        width = outputs.shape[1]
+        outputs = outputs.reshape( len( blocks ), self.points, width )
+        rng = np.random.default_rng( seed )
+        z = NormalDist().inv_cdf( 0.5 + confidence / 2 )
+        if self.method == MORRIS:
+            values = self.design.loc[rows, self.parameters].to_numpy( dtype=float )
+            if self.ranges is not None:
+                low = np.array( [ self.ranges[name][0] for name in self.parameters ], dtype=float )
+                high = np.array( [ self.ranges[name][1] for name in self.parameters ], dtype=float )
+                values = ( values - low ) / ( high - low )
+            result = _morris( outputs, values.reshape( len( blocks ), self.points, -1 ), bootstrap, rng, z )
+        else:
+            result = _sobol( outputs, bootstrap, rng, z )
+        if width == 1:
+            return pd.DataFrame( { name: values[:, 0] for name, values in result.items() }, index=self.parameters )
+        return pd.concat( { name: pd.DataFrame( values, index=self.parameters ) for name, values in result.items() },
+                          axis=1 )
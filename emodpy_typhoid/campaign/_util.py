@@ -0,0 +1,23 @@
+"""
+Helpers for reading campaign rows from tables (DataFrames, CSV rows or dicts), shared by the table-driven
+planners (wash_rollout, seeding).
+"""
+
+
+def as_tuple( value, cast ):
+    """
+    Return a cell holding one or several values (a scalar, a list, or a ";"-separated string) as a tuple of
+    cast values, or None for an empty cell (None, "" or NaN).
+    """
+    if value is None or value == "" or value != value:  # NaN from a DataFrame
+        return None
+    if isinstance( value, str ):
+        return tuple( cast( item.strip() ) for item in value.split( ";" ) if item.strip() )
+    if isinstance( value, ( list, tuple ) ):
+        return tuple( cast( item ) for item in value )
+    return ( cast( value ), )
+
+
+def given( value ):
+    """Return whether a cell holds a value, i.e., isn't None or NaN."""
+    return value is not None and value == value
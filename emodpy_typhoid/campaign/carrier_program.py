@@ -0,0 +1,106 @@
+"""
+Test-and-treat programs for chronic carriers. Screening rounds distribute TyphoidCarrierDiagnostic, which
+broadcasts a positive-diagnosis event, and a single listener for that event distributes TyphoidCarrierClear.
+However many rounds there are, there is only one treatment listener, and periodic rounds fold into repeating
+events.
+
+Example::
+
+    from emodpy_typhoid.campaign.carrier_program import CarrierScreeningProgram
+
+    program = CarrierScreeningProgram( sensitivity=0.7, specificity=0.95, clearance_rate=0.9 )
+    program.add_rounds( days=[ 3650, 4015, 4380, 4745 ], coverage=0.3, age_min=30 )
+    program.compile( existing=camp ).extend_builder( camp )
+"""
+import re
+
+import emodpy_typhoid.interventions.compact as compact
+from emodpy_typhoid.campaign.compactor import campaign_events, fold_days
+from emodpy_typhoid.campaign.timeline import BUILTIN_EVENTS, broadcast_triggers, listened_triggers
+
+_EVENT_NAME = re.compile( r"^[A-Za-z][A-Za-z0-9_]*$" )
+
+
+class CarrierScreeningProgram:
+    """
+    Carrier screening and treatment program.
+
+    Args:
+        sensitivity: Base_Sensitivity of the diagnostic.
+        specificity: Base_Specificity of the diagnostic.
+        clearance_rate: Clearance_Rate of the treatment.
+        days_to_diag: Days_To_Diagnosis.
+        tx_fraction: Treatment_Fraction of the diagnostic.
+        treatment_coverage: Fraction of people who test positive who get treated.
+        pos_event: Event linking diagnosis to treatment. Must be unique to this program.
+        event_name: Event_Name of the treatment listener.
+    """
+    def __init__( self, sensitivity=1.0, specificity=1.0, clearance_rate=1.0, days_to_diag=1, tx_fraction=1.0,
+                  treatment_coverage=1.0, pos_event="TestedPositive", event_name="Carrier Treatment" ):
+        self.diagnostic = compact.TyphoidCarrierDiagnostic( sensitivity=sensitivity, specificity=specificity,
+                                                            days_to_diag=days_to_diag, pos_event=pos_event,
+                                                            tx_fraction=tx_fraction )
+        self.treatment = compact.TyphoidCarrierClear( rate=clearance_rate )
+        self.treatment_coverage = treatment_coverage
+        self.pos_event = pos_event
+        self.event_name = event_name
+        self.rounds = []
+
+    def add_round( self, start_day, coverage=1.0, age_min=None, age_max=None, node_ids=None,
+                   property_restrictions=(), repetitions=1, interval=365 ):
+        """
+        Add a screening round on start_day, optionally repeated every interval days. Ages are in years.
+        """
+        if not 0 <= coverage <= 1:
+            raise ValueError( f"coverage must be between 0 and 1, got {coverage}." )
+        if repetitions < 1:
+            raise ValueError( f"repetitions must be at least 1, got {repetitions}." )
+        self.rounds.append( compact.ScheduledEvent(
+            start_day, ( self.diagnostic, ), coverage=coverage, node_ids=node_ids,
+            property_restrictions=property_restrictions, target_age_min=age_min, target_age_max=age_max,
+            repetitions=repetitions, timesteps_between_repetitions=interval if repetitions > 1 else -1 ) )
+
+    def add_rounds( self, days, **targeting ):
+        """
+        Add screening rounds on each of days with the same targeting (see add_round). Evenly spaced days are
+        folded into repeating rounds.
+        """
+        for first_day, count, step in fold_days( sorted( days ) ):
+            self.add_round( first_day, repetitions=count, interval=step, **targeting )
+
+    def validate( self, existing=None ):
+        """
+        Raise ValueError if the program can't work as built: no rounds, a pos_event that isn't a valid event
+        name or is raised by the model itself, or one that events in existing (an emod_api.campaign module,
+        campaign dict or list of events) already broadcast or listen for.
+        """
+        if not self.rounds:
+            raise ValueError( "The program has no screening rounds." )
+        if not isinstance( self.pos_event, str ) or not _EVENT_NAME.match( self.pos_event ):
+            raise ValueError( f"pos_event '{self.pos_event}' isn't a valid event name." )
+        if self.pos_event in BUILTIN_EVENTS:
+            raise ValueError( f"pos_event '{self.pos_event}' is raised by the model itself; everyone it fires for "
+                              "would be treated." )
+        if existing is not None:
+            for idx, event in enumerate( campaign_events( existing ) ):
+                if self.pos_event in listened_triggers( event ) or self.pos_event in broadcast_triggers( event ):
+                    raise ValueError( f"Event {idx} of the campaign already uses '{self.pos_event}'. Pick a "
+                                      "different pos_event so treatment only follows this program's diagnoses." )
+
+    def compile( self, existing=None ):
+        """
+        Validate the program (see validate) and return it as a compact.CompactCampaign: the screening rounds
+        plus one treatment listener covering every screened node, starting with the first round.
+        """
+        self.validate( existing )
+        node_ids = set()
+        for screening in self.rounds:
+            if screening.node_ids is None:
+                node_ids = None
+                break
+            node_ids.update( screening.node_ids )
+        listener = compact.TriggeredEvent(
+            min( screening.start_day for screening in self.rounds ), ( self.treatment, ), triggers=( self.pos_event, ),
+            coverage=self.treatment_coverage, node_ids=None if node_ids is None else sorted( node_ids ),
+            event_name=self.event_name )
+        return compact.CompactCampaign( self.rounds + [ listener ] )
@@ -0,0 +1,224 @@
+"""
+Campaign optimizer pass. Folds runs of otherwise identical scheduled events into Number_Repetitions and
+Timesteps_Between_Repetitions and merges events that share timing, triggers and targeting into one event.
+Works on finalized campaign events (plain dicts), e.g., the contents of emod_api.campaign.campaign_dict.
+"""
+import json
+
+STANDARD_COORDINATOR = "StandardInterventionDistributionEventCoordinator"
+
+# Intervention_Config classes that are distributed to nodes rather than individuals. These can't go inside a
+# MultiInterventionDistributor and re-distributing a node-level listener on a schedule would stack listeners.
+NODE_LEVEL_CLASSES = {
+    "BirthTriggeredIV",
+    "BroadcastNodeEvent",
+    "MultiNodeInterventionDistributor",
+    "NodeLevelHealthTriggeredIV",
+    "NodePropertyValueChanger",
+    "Outbreak"
+}
+
+
+def _key( obj ):
+    return json.dumps( obj, sort_keys=True )
+
+
+def campaign_events( campaign ):
+    """
+    Return the list of events of a campaign given as a list of events, a campaign dict, or an
+    emod_api.campaign-like object with a campaign_dict.
+    """
+    if isinstance( campaign, list ):
+        return campaign
+    if isinstance( campaign, dict ):
+        return campaign["Events"]
+    return campaign.campaign_dict["Events"]  # emod_api.campaign module
+
+
+def _is_foldable( event ):
+    ecc = event.get( "Event_Coordinator_Config", {} )
+    return ( event.get( "class", "CampaignEvent" ) == "CampaignEvent"
+             and ecc.get( "class" ) == STANDARD_COORDINATOR
+             and ecc.get( "Number_Repetitions", 1 ) == 1
+             and ecc.get( "Intervention_Config", {} ).get( "class" ) != "NodeLevelHealthTriggeredIV" )
+
+
+def fold_days( days, day_tolerance=0 ):
+    """
+    Split sorted start days into runs of (first_day, count, step), i.e., Start_Day, Number_Repetitions and
+    Timesteps_Between_Repetitions (-1 for a single day). A run needs an integer step of at least one day and every
+    day within day_tolerance of first_day + n*step.
+    """
+    def longest_run( i ):
+        best = ( days[i], 1, -1 )
+        step = None
+        j = i + 1
+        while j < len( days ):
+            new_step = round( ( days[j] - days[i] ) / ( j - i ) )
+            # only re-check the whole run when the fitted step changes
+            check = range( j, j + 1 ) if new_step == step else range( i, j + 1 )
+            step = new_step
+            if step < 1 or any( abs( days[k] - ( days[i] + ( k - i ) * step ) ) > day_tolerance for k in check ):
+                break
+            best = ( days[i], j - i + 1, step )
+            j += 1
+        return best
+
+    runs = []
+    i = 0
+    while i < len( days ):
+        best = longest_run( i )
+        # leave a day on its own when the next day starts a longer run, rather than pairing a one-off day with
+        # the start of a series, e.g., 1, 730, 1095, 1460, ... (same number of events, but the series stays whole)
+        if best[1] > 1 and i + 1 < len( days ) and longest_run( i + 1 )[1] > best[1]:
+            best = ( days[i], 1, -1 )
+        runs.append( best )
+        i += best[1]
+    return runs
+
+
+def fold_repetitions( events, day_tolerance=0 ):
+    """
+    Fold scheduled events that differ only in Start_Day and are evenly spaced into single repeating events.
+
+    Args:
+        events: List of finalized campaign events.
+        day_tolerance: How far (in days) a Start_Day may be from the evenly spaced schedule and still get folded.
+            Use a small positive value for schedules built with np.linspace. Default 0 (exact).
+
+    Returns:
+        Tuple of the new event list and the number of events removed.
+    """
+    groups = {}
+    order = []
+    for idx, event in enumerate( events ):
+        if not _is_foldable( event ):
+            order.append( ( idx, None ) )
+            continue
+        template = dict( event )
+        template.pop( "Start_Day", None )
+        key = _key( template )
+        if key not in groups:
+            groups[key] = []
+            order.append( ( idx, key ) )
+        groups[key].append( event )
+
+    folded = []
+    for idx, key in order:
+        if key is None:
+            folded.append( events[idx] )
+            continue
+        group = groups[key]
+        days = sorted( event.get( "Start_Day", 1 ) for event in group )
+        for first_day, count, step in fold_days( days, day_tolerance ):
+            new_event = json.loads( _key( group[0] ) )
+            new_event["Start_Day"] = first_day
+            if count > 1:
+                new_event["Event_Coordinator_Config"]["Number_Repetitions"] = count
+                new_event["Event_Coordinator_Config"]["Timesteps_Between_Repetitions"] = step
+            folded.append( new_event )
+    return folded, len( events ) - len( folded )
+
+
+def _flatten( intervention ):
+    if intervention.get( "class" ) == "MultiInterventionDistributor":
+        return list( intervention["Intervention_List"] )
+    return [ intervention ]
+
+
+def _merge_slot( event ):
+    """
+    Return the dict holding the individual-level intervention of a mergeable event and the key under which
+    it lives, or None if the event can't be merged without changing who receives what.
+    """
+    ecc = event.get( "Event_Coordinator_Config", {} )
+    if ecc.get( "class" ) != STANDARD_COORDINATOR or ecc.get( "Demographic_Coverage", 1 ) != 1:
+        return None
+    iv = ecc.get( "Intervention_Config", {} )
+    if iv.get( "class" ) == "NodeLevelHealthTriggeredIV":
+        if iv.get( "Demographic_Coverage", 1 ) != 1 or "Actual_IndividualIntervention_Config" not in iv:
+            return None
+        return iv, "Actual_IndividualIntervention_Config"
+    if iv.get( "class" ) in NODE_LEVEL_CLASSES:
+        return None
+    return ecc, "Intervention_Config"
+
+
+def merge_interventions( events ):
+    """
+    Merge events that are identical apart from their individual-level interventions (same start, repetitions,
+    nodes, targeting and triggers) into one event carrying a MultiInterventionDistributor. Only events with
+    full coverage are merged since separate draws at partial coverage reach different people.
+
+    Args:
+        events: List of finalized campaign events.
+
+    Returns:
+        Tuple of the new event list and the number of events removed.
+    """
+    merged = []
+    by_key = {}
+    for event in events:
+        slot = _merge_slot( event )
+        if slot is None:
+            merged.append( event )
+            continue
+        holder, field = slot
+        intervention = holder.pop( field )
+        key = _key( event )
+        holder[field] = intervention
+        if key in by_key:
+            target_holder, target_field = _merge_slot( by_key[key] )
+            target = target_holder[target_field]
+            new_list = _flatten( target ) + _flatten( intervention )
+            if target.get( "class" ) != "MultiInterventionDistributor":
+                target_holder[target_field] = { "class": "MultiInterventionDistributor", "Intervention_List": new_list }
+            else:
+                target["Intervention_List"] = new_list
+        else:
+            event = json.loads( _key( event ) )
+            by_key[key] = event
+            merged.append( event )
+    return merged, len( events ) - len( merged )
+
+
+def compact_campaign( campaign, fold=True, merge=True, day_tolerance=0 ):
+    """
+    Compact a campaign by folding repetitions and merging equivalent events. The input is not modified.
+
+    Args:
+        campaign: A campaign dict with "Events", a list of events, or the emod_api.campaign module.
+        fold: Fold evenly spaced runs of identical scheduled events into repetitions.
+        merge: Merge events that share timing, triggers and targeting.
+        day_tolerance: Passed to fold_repetitions.
+
+    Returns:
+        Tuple of the compacted campaign dict and a report dict with event counts and JSON sizes before and after.
+    """
+    events = json.loads( _key( campaign_events( campaign ) ) )
+    report = { "events_before": len( events ), "bytes_before": len( _key( events ) ),
+               "events_folded": 0, "events_merged": 0 }
+    if fold:
+        events, report["events_folded"] = fold_repetitions( events, day_tolerance=day_tolerance )
+    if merge:
+        events, report["events_merged"] = merge_interventions( events )
+    report["events_after"] = len( events )
+    report["bytes_after"] = len( _key( events ) )
+
+    compacted = { "Events": events, "Use_Defaults": 1 }
+    if isinstance( campaign, dict ):
+        compacted = dict( campaign, Events=events )
+    return compacted, report
+
+
+def compact( camp, **kwargs ):
+    """
+    Compact the events accumulated in the emod_api.campaign builder in place, e.g., at the end of build_camp.
+    Takes the same keyword arguments as compact_campaign.
+
+    Returns:
+        The report dict from compact_campaign.
+    """
+    compacted, report = compact_campaign( camp, **kwargs )
+    camp.campaign_dict["Events"][:] = compacted["Events"]
+    return report
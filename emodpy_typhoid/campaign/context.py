@@ -0,0 +1,194 @@
+"""
+Campaign builders as objects. emod_api.campaign keeps one campaign in module globals, so two campaigns can't be
+built at the same time. CampaignContext has the same interface (schema_path, campaign_dict, add, save, the
+trigger registration functions, ...) but keeps its own schema handle, events and triggers, and can be passed as
+camp to every builder in emodpy_typhoid.interventions, to emod_api.interventions.common and to the compact
+campaigns' extend_builder.
+
+Example::
+
+    def build_camp( camp, coverage ):
+        camp.add( ty.new_scheduled_intervention( camp, start_day=365, coverage=coverage ) )
+        return camp
+
+    campaigns = build_campaigns( build_camp, [ { "coverage": c } for c in np.linspace( 0, 1, 64 ) ],
+                                 schema_path=manifest.schema_file )
+"""
+import json
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+_TRIGGER_LISTS = ( "custom_coordinator_events", "custom_node_events", "individual_events_listened",
+                   "individual_events_broadcast" )
+
+
+class CampaignContext:
+    """
+    One campaign under construction. Use it wherever a builder takes camp.
+
+    Args:
+        schema_path: Schema file for the interventions built into this campaign.
+    """
+    def __init__( self, schema_path=None ):
+        self._lock = threading.RLock()
+        self.schema_path = None
+        self.reset()
+        if schema_path is not None:
+            self.set_schema( schema_path )
+
+    @classmethod
+    def from_campaign( cls, camp ):
+        """
+        Return a CampaignContext holding a copy of camp's events and registered triggers, where camp is the
+        emod_api.campaign module (or another CampaignContext). Rebuilding into camp afterwards doesn't change the copy.
+        """
+        copy = cls()
+        copy.schema_path = camp.schema_path
+        copy.campaign_dict = json.loads( json.dumps( camp.campaign_dict ) )
+        for name in ( "implicits", ) + _TRIGGER_LISTS:
+            setattr( copy, name, list( getattr( camp, name, None ) or [] ) )
+        copy.event_map = dict( getattr( camp, "event_map", None ) or {} )
+        for name in ( "pubsub", "use_old_adhoc_handling", "unsafe", "trigger_list" ):
+            if hasattr( camp, name ):
+                setattr( copy, name, getattr( camp, name ) )
+        return copy
+
+    @classmethod
+    def from_dict( cls, campaign, schema_path=None, triggers=None ):
+        """
+        Return a CampaignContext holding the events of a campaign dict and, if given, the triggers returned by
+        another context's triggers(), e.g. a campaign built in another process.
+        """
+        camp = cls( schema_path )
+        for event in campaign["Events"]:
+            camp.add( event )
+        camp.add_triggers( triggers or {} )
+        return camp
+
+    def reset( self ):
+        """Drop every event and registered trigger."""
+        with self._lock:
+            self.campaign_dict = { "Events": [], "Use_Defaults": 1 }
+            self.implicits = []
+            self.pubsub = False
+            self.use_old_adhoc_handling = False
+            self.unsafe = False
+            self.trigger_list = None
+            self.event_map = {}
+            self.custom_coordinator_events = []
+            self.custom_node_events = []
+            self.individual_events_listened = []
+            self.individual_events_broadcast = []
+
+    def set_schema( self, schema_path ):
+        """Start a new campaign built against schema_path."""
+        with self._lock:
+            self.reset()
+            self.schema_path = schema_path
+
+    def add( self, event, name=None, first=False ):
+        """
+        Add a campaign event (schema-backed or a plain dict). name sets Event_Name; first puts the event at the
+        start of the campaign.
+        """
+        if hasattr( event, "finalize" ):
+            event.finalize()
+        if name is not None:
+            event["Event_Name"] = name
+        with self._lock:
+            if first:
+                self.campaign_dict["Events"].insert( 0, event )
+            else:
+                self.campaign_dict["Events"].append( event )
+
+    def get_recv_trigger( self, trigger, old=False ):
+        """Register trigger as listened for and return it."""
+        if not trigger:
+            raise ValueError( "Event name must not be None or empty." )
+        with self._lock:
+            self.individual_events_listened.append( trigger )
+        return trigger
+
+    def get_send_trigger( self, trigger, old=False ):
+        """Register trigger as broadcast and return it."""
+        if not trigger:
+            raise ValueError( "Event name must not be None or empty." )
+        with self._lock:
+            self.individual_events_broadcast.append( trigger )
+            self.event_map[trigger] = trigger
+        return trigger
+
+    def get_event( self, event, old=False ):
+        return self.get_send_trigger( event, old )
+
+    def get_adhocs( self ):
+        """Return {event: event} for every custom event broadcast in this campaign, like emod_api.campaign."""
+        return dict( self.event_map )
+
+    def get_adhoc_events( self ):
+        return self.get_adhocs()
+
+    def get_custom_coordinator_events( self ):
+        return list( self.custom_coordinator_events )
+
+    def get_custom_node_events( self ):
+        return list( self.custom_node_events )
+
+    def get_trigger_list( self ):
+        return self.trigger_list
+
+    def triggers( self ):
+        """Return the registered triggers and event_map as a JSON-ready dict, to pass to add_triggers."""
+        with self._lock:
+            triggers = { name: list( getattr( self, name ) ) for name in _TRIGGER_LISTS }
+            triggers["event_map"] = dict( self.event_map )
+        return triggers
+
+    def add_triggers( self, triggers ):
+        """Register the triggers in a dict returned by triggers()."""
+        with self._lock:
+            for name in _TRIGGER_LISTS:
+                getattr( self, name ).extend( triggers.get( name, [] ) )
+            self.event_map.update( triggers.get( "event_map", {} ) )
+
+    def to_dict( self ):
+        """Return the campaign as a plain dict (events are shared, not copied)."""
+        with self._lock:
+            return { "Events": list( self.campaign_dict["Events"] ), "Use_Defaults": self.campaign_dict["Use_Defaults"] }
+
+    def save( self, filename="campaign.json" ):
+        """Write the campaign file, formatted like emod_api.campaign.save, and return the filename."""
+        with open( filename, "w" ) as camp_file:
+            json.dump( self.to_dict(), camp_file, sort_keys=True, indent=4 )
+        return filename
+
+
+def _build( build_fn, schema_path, kwargs ):
+    camp = CampaignContext( schema_path )
+    build_fn( camp, **kwargs )
+    return json.loads( json.dumps( camp.to_dict() ) )
+
+
+def build_campaigns( build_fn, scenarios, schema_path, processes=None, threads=False ):
+    """
+    Build one campaign per scenario in parallel, each into its own CampaignContext.
+
+    Args:
+        build_fn: Function build_fn( camp, **scenario ) adding events to camp. Must be a module-level
+            function when using processes.
+        scenarios: List of keyword-argument dicts, one per campaign.
+        schema_path: Schema file.
+        processes: Worker count. None uses all cores; 1 builds serially.
+        threads: Use a thread pool instead of a process pool, for builders that mostly wait on I/O. Campaign
+            construction is CPU bound, so processes are what scale with cores.
+
+    Returns:
+        List of campaign dicts, in the order of scenarios.
+    """
+    scenarios = list( scenarios )
+    if processes == 1 or len( scenarios ) < 2:
+        return [ _build( build_fn, schema_path, kwargs ) for kwargs in scenarios ]
+    executor = ThreadPoolExecutor if threads else ProcessPoolExecutor
+    with executor( max_workers=processes ) as pool:
+        futures = [ pool.submit( _build, build_fn, schema_path, kwargs ) for kwargs in scenarios ]
+        return [ future.result() for future in futures ]
@@ -0,0 +1,151 @@
+"""
+Spatially heterogeneous vaccination campaigns from per-node coverage maps. The intervention builders take a
+single coverage and node list, so rather than one event per node, nodes are binned into coverage classes that
+are within a tolerance of each other and each class becomes one event. Campaign size then scales with the
+number of distinct coverage levels instead of the number of nodes.
+
+Example::
+
+    import emodpy_typhoid.interventions.typhoid_vaccine as ty
+    from emodpy_typhoid.campaign.coverage_map import coverage_from_raster, new_coverage_map_interventions
+
+    coverage = coverage_from_raster( demog.nodes, raster, lat_bounds=( 23.5, 37.1 ), lon_bounds=( 60.9, 77.8 ) )
+    for event in new_coverage_map_interventions( camp, coverage, nodes=demog.nodes, tolerance=0.025,
+                                                 builder=ty.new_scheduled_intervention, start_day=365 ):
+        camp.add( event )
+"""
+import numpy as np
+
+
+def _node_ids( nodes ):
+    return [ node.id for node in getattr( nodes, "nodes", nodes ) ]
+
+
+def _as_arrays( coverage, nodes=None ):
+    """
+    Return (node_ids, coverages) as arrays from a {node_id: coverage} dict or a sequence aligned with nodes.
+    """
+    if isinstance( coverage, dict ):
+        return np.array( list( coverage.keys() ) ), np.array( list( coverage.values() ), dtype=float )
+    if nodes is None:
+        raise ValueError( "A coverage array needs the nodes it is aligned with. Pass nodes or use a {node_id: coverage} dict." )
+    node_ids = _node_ids( nodes )
+    values = np.asarray( coverage, dtype=float ).ravel()
+    if len( values ) != len( node_ids ):
+        raise ValueError( f"Coverage array has {len( values )} values but there are {len( node_ids )} nodes." )
+    return np.array( node_ids ), values
+
+
+def coverage_from_raster( nodes, raster, lat_bounds, lon_bounds ):
+    """
+    Sample a coverage raster at each node's location.
+
+    Args:
+        nodes: Demographics nodes (or a TyphoidDemographics instance) with id, lat and lon.
+        raster: 2D array of coverages. Row 0 is the northern edge and column 0 the western edge, as in most
+            GeoTIFF exports. NaN cells mean no data.
+        lat_bounds: (south, north) latitude of the raster edges.
+        lon_bounds: (west, east) longitude of the raster edges.
+
+    Returns:
+        {node_id: coverage}. Nodes outside the raster or on a NaN cell get NaN and are skipped when binning.
+    """
+    raster = np.asarray( raster, dtype=float )
+    if raster.ndim != 2:
+        raise ValueError( f"raster must be 2D, got {raster.ndim} dimensions." )
+    nodes = list( getattr( nodes, "nodes", nodes ) )
+    lats = np.array( [ node.lat for node in nodes ], dtype=float )
+    lons = np.array( [ node.lon for node in nodes ], dtype=float )
+    rows, cols = raster.shape
+    south, north = lat_bounds
+    west, east = lon_bounds
+    row = np.floor( ( north - lats ) / ( north - south ) * rows ).astype( int )
+    col = np.floor( ( lons - west ) / ( east - west ) * cols ).astype( int )
+    # nodes exactly on the southern or eastern edge belong to the last cell
+    row[ lats == south ] = rows - 1
+    col[ lons == east ] = cols - 1
+    inside = ( row >= 0 ) & ( row < rows ) & ( col >= 0 ) & ( col < cols )
+    values = np.full( len( nodes ), np.nan )
+    values[inside] = raster[ row[inside], col[inside] ]
+    return { node.id: float( value ) for node, value in zip( nodes, values ) }
+
+
+def bin_coverage( coverage, nodes=None, tolerance=0.02, weights=None ):
+    """
+    Group nodes into as few coverage classes as possible such that every node's coverage is within tolerance
+    of its class level (greedy over the sorted coverages, which is optimal in one dimension). Nodes with NaN
+    or zero coverage get no class.
+
+    Args:
+        coverage: {node_id: coverage} or a sequence of coverages aligned with nodes.
+        nodes: Demographics nodes (or a TyphoidDemographics instance), needed when coverage is a sequence.
+        tolerance: Largest allowed absolute difference between a node's coverage and its class level.
+        weights: Optional {node_id: weight} (e.g., population). Levels are then the weighted mean of the
+            class, kept within tolerance, so the expected number of doses is preserved where possible.
+            Otherwise the level is the midpoint of the class.
+
+    Returns:
+        List of (level, [node_ids]) sorted by level.
+    """
+    if tolerance < 0:
+        raise ValueError( f"tolerance must be non-negative, got {tolerance}." )
+    node_ids, values = _as_arrays( coverage, nodes )
+    if np.any( values > 1 ) or np.any( values < 0 ):
+        raise ValueError( "Coverage values must be between 0 and 1." )
+    keep = ~np.isnan( values ) & ( values > 0 )
+    node_ids, values = node_ids[keep], values[keep]
+    order = np.argsort( values, kind="stable" )
+    node_ids, values = node_ids[order], values[order]
+    if weights is not None:
+        weights = np.array( [ weights.get( node_id, 0 ) for node_id in node_ids.tolist() ], dtype=float )
+
+    classes = []
+    start = 0
+    while start < len( values ):
+        stop = np.searchsorted( values, values[start] + 2 * tolerance, side="right" )
+        low, high = values[start], values[stop - 1]
+        if weights is not None and weights[start:stop].sum() > 0:
+            level = np.average( values[start:stop], weights=weights[start:stop] )
+            level = min( max( level, high - tolerance ), low + tolerance )
+        else:
+            level = ( low + high ) / 2
+        classes.append( ( float( level ), sorted( node_ids[start:stop].tolist() ) ) )
+        start = stop
+    return classes
+
+
+def new_coverage_map_interventions( camp, coverage, builder=None, nodes=None, tolerance=0.02, population_weighted=True,
+                                    **kwargs ):
+    """
+    Create one event per coverage class of a per-node coverage map. Does not add to campaign.
+
+    Args:
+        camp: The emod_api.campaign module.
+        coverage: {node_id: coverage} or a sequence of coverages aligned with nodes.
+        builder: Event builder taking coverage and node_ids keyword arguments. Default is
+            typhoid_vaccine.new_scheduled_intervention.
+        nodes: Demographics nodes (or a TyphoidDemographics instance). Needed when coverage is a sequence and
+            for population weighting.
+        tolerance: Largest allowed absolute difference between a node's coverage and the coverage of its event.
+        population_weighted: Use node initial populations to pick the coverage of each class (see
+            bin_coverage). Ignored without nodes.
+        **kwargs: Passed to builder (e.g., start_day, efficacy).
+
+    Returns:
+        List of campaign events, one per coverage class.
+    """
+    if builder is None:
+        import emodpy_typhoid.interventions.typhoid_vaccine as typhoid_vaccine
+        builder = typhoid_vaccine.new_scheduled_intervention
+    weights = None
+    if population_weighted and nodes is not None:
+        weights = { node.id: node.node_attributes.initial_population for node in getattr( nodes, "nodes", nodes ) }
+
+    events = []
+    for level, node_ids in bin_coverage( coverage, nodes=nodes, tolerance=tolerance, weights=weights ):
+        event = builder( camp, coverage=level, node_ids=node_ids, **kwargs )
+        # some builders (e.g., new_routine_immunization) don't pass node_ids on to the event
+        if event["Nodeset_Config"].get( "class" ) == "NodeSetAll":
+            event["Nodeset_Config"] = { "class": "NodeSetNodeList", "Node_List": node_ids }
+        events.append( event )
+    return events
@@ -0,0 +1,139 @@
+"""
+Outbreak seeding plans. Collect seeding rows (node, day, coverage or number of cases, property restrictions)
+from a table, from code, or drawn from an importation rate, and emit the fewest events that reproduce them:
+rows repeating at a fixed interval in a node fold into Number_Repetitions, and identical schedules in different
+nodes share one event.
+
+Example (initial seeding plus ten yearly 0.5% importations, as in the Blantyre examples)::
+
+    from emodpy_typhoid.campaign.seeding import SeedingPlan
+
+    plan = SeedingPlan()
+    plan.add( day=1, coverage=0.005 )
+    plan.add_rows( { "day": 730 + 365 * year, "coverage": 0.005 } for year in range( 10 ) )
+    plan.add_importations( rate=lambda days, nodes: 1e-3 * ( 1 + np.sin( 2 * np.pi * days / 365 ) ),
+                           node_ids=range( 1, 1001 ), start_day=1, end_day=3650, seed=42 )
+    plan.compile().extend_builder( camp )
+"""
+import numpy as np
+
+import emodpy_typhoid.interventions.compact as compact
+from emodpy_typhoid.campaign._util import as_tuple, given
+from emodpy_typhoid.campaign.compactor import fold_days
+
+COLUMNS = { "node_ids", "day", "coverage", "cases", "property_restrictions", "ignore_immunity" }
+
+
+class SeedingPlan:
+    """
+    Set of outbreak seeding rows compiled into a minimal set of scheduled events.
+    """
+    def __init__( self ):
+        self.rows = {}  # ( kind, amount, restrictions, ignore_immunity, node_id ) -> [ days ]
+
+    def add( self, day, coverage=None, cases=None, node_ids=None, property_restrictions=(), ignore_immunity=True ):
+        """
+        Seed infections on day, either in a fraction coverage of the (restricted) population with
+        OutbreakIndividual or as cases new infections per node with a node-level Outbreak.
+
+        Args:
+            day: Day of the seeding.
+            coverage: Fraction of people infected.
+            cases: Number of people infected per node. Can't be combined with property_restrictions.
+            node_ids: Node ids, or None for all nodes.
+            property_restrictions: "Key:Value" individual property restrictions (coverage seeding only).
+            ignore_immunity: Infect people regardless of immunity (coverage seeding only).
+        """
+        if ( coverage is None ) == ( cases is None ):
+            raise ValueError( "Give exactly one of coverage and cases." )
+        if coverage is not None and not 0 < coverage <= 1:
+            raise ValueError( f"coverage must be in (0, 1], got {coverage}." )
+        if cases is not None:
+            if property_restrictions:
+                raise ValueError( "Node-level outbreaks (cases) can't be restricted by individual properties; "
+                                  "use coverage instead." )
+            key = ( "cases", int( cases ), (), True )
+        else:
+            key = ( "coverage", float( coverage ), tuple( property_restrictions ), bool( ignore_immunity ) )
+        for node_id in ( None, ) if node_ids is None else node_ids:
+            self.rows.setdefault( key + ( node_id, ), [] ).append( day )
+
+    def add_rows( self, rows ):
+        """
+        Add seeding rows from a pandas DataFrame or an iterable of dicts with add() arguments as columns.
+        node_ids and property_restrictions can be lists or ";"-separated strings; a single node id is fine too.
+        """
+        if hasattr( rows, "to_dict" ):
+            rows = rows.to_dict( "records" )
+        for row in rows:
+            unknown = set( row ) - COLUMNS
+            if unknown:
+                raise ValueError( f"Unknown seeding column(s) {sorted( unknown )}. Expected some of {sorted( COLUMNS )}." )
+            row = { key: value for key, value in row.items() if given( value ) }
+            if "node_ids" in row:
+                row["node_ids"] = as_tuple( row["node_ids"], lambda node_id: int( float( node_id ) ) )
+            if "property_restrictions" in row:
+                row["property_restrictions"] = as_tuple( row["property_restrictions"], str ) or ()
+            self.add( **row )
+
+    def add_importations( self, rate, node_ids, start_day, end_day, step=1, seed=None ):
+        """
+        Draw stochastic importations and add them as cases. The number of importations into each node in each
+        step is Poisson with mean rate * step, drawn for all nodes and days at once.
+
+        Args:
+            rate: Importations per node per day. A number, an array of shape (days, nodes), or a function
+                rate( days, node_ids ) called once with days as a column and node_ids as a row array, which
+                should broadcast to (days, nodes).
+            node_ids: Node ids to import into.
+            start_day: First day of importations.
+            end_day: Last possible day of importations.
+            step: Days between draws.
+            seed: Seed for the draws, for reproducible plans.
+
+        Returns:
+            Number of importations drawn.
+        """
+        days = np.arange( start_day, end_day + 1, step )
+        node_ids = np.asarray( list( node_ids ) )
+        if callable( rate ):
+            rate = rate( days[:, None], node_ids[None, :] )
+        mean = np.broadcast_to( np.asarray( rate, dtype=float ) * step, ( len( days ), len( node_ids ) ) )
+        if np.any( mean < 0 ):
+            raise ValueError( "Importation rates must be non-negative." )
+        counts = np.random.default_rng( seed ).poisson( mean )
+        day_idx, node_idx = np.nonzero( counts )
+        for day, node_id, cases in zip( days[day_idx].tolist(), node_ids[node_idx].tolist(),
+                                        counts[day_idx, node_idx].tolist() ):
+            self.rows.setdefault( ( "cases", cases, (), True, node_id ), [] ).append( day )
+        return int( counts.sum() )
+
+    def events( self ):
+        """
+        Return the plan as compact.ScheduledEvent objects: each node's days are folded into evenly spaced runs,
+        then nodes with the same run, amount and targeting share an event.
+        """
+        runs = {}
+        for ( kind, amount, restrictions, ignore_immunity, node_id ), days in self.rows.items():
+            # seeding all nodes stays separate from seeding listed nodes, which would otherwise be seeded once
+            for run in fold_days( sorted( days ) ):
+                key = ( kind, amount, restrictions, ignore_immunity, node_id is None ) + run
+                runs.setdefault( key, [] ).append( node_id )
+
+        events = []
+        for ( kind, amount, restrictions, ignore_immunity, all_nodes, day, count, step ), node_ids in runs.items():
+            if kind == "cases":
+                intervention, coverage = compact.Outbreak( amount ), 1.0
+            else:
+                intervention, coverage = compact.OutbreakIndividual( ignore_immunity ), amount
+            events.append( compact.ScheduledEvent(
+                day, ( intervention, ), coverage=coverage,
+                node_ids=None if all_nodes else sorted( node_ids ), property_restrictions=restrictions,
+                repetitions=count, timesteps_between_repetitions=step if count > 1 else -1 ) )
+        return sorted( events, key=lambda event: event.start_day )
+
+    def compile( self ):
+        """
+        Return the plan as a compact.CompactCampaign.
+        """
+        return compact.CompactCampaign( self.events() )
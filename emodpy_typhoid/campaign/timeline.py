@@ -0,0 +1,238 @@
+"""
+Static analysis of a built campaign. CampaignTimeline indexes events by the days on which they are active and
+maps event triggers to the events broadcasting and listening for them, so questions like "what fires between
+day X and Y for Region:Urban" and "which listeners will never hear their trigger" can be answered before the
+campaign is submitted.
+"""
+import bisect
+import json
+import math
+from collections import namedtuple
+
+# Individual-level events the typhoid model raises itself (the Built-in events of a TYPHOID_SIM schema), so they
+# never need a campaign broadcaster. Pass builtin_events to CampaignTimeline for other binaries.
+BUILTIN_EVENTS = {
+    "Births", "EveryUpdate", "NewInfectionEvent", "HappyBirthday", "Emigrating", "Immigrating", "PropertyChange",
+    "NonDiseaseDeaths", "DiseaseDeaths"
+}
+
+# Interventions whose *_Event parameters are node events, which individual-level listeners never hear.
+NODE_EVENT_CLASSES = { "BroadcastNodeEvent" }
+
+TimelineEntry = namedtuple( "TimelineEntry", [ "index", "start", "stop", "event" ] )
+
+
+def _active_interval( event ):
+    """
+    Return the (start, stop) days during which an event can distribute anything. Repeating events end at their
+    last repetition, triggered listeners at the end of their Duration; -1 means forever.
+    """
+    start = float( event.get( "Start_Day", 1 ) )
+    ecc = event.get( "Event_Coordinator_Config", {} )
+    reps = ecc.get( "Number_Repetitions", 1 )
+    if reps == -1:
+        stop = math.inf
+    else:
+        stop = start + max( reps - 1, 0 ) * max( ecc.get( "Timesteps_Between_Repetitions", 0 ), 0 )
+    iv = ecc.get( "Intervention_Config", {} )
+    if iv.get( "class" ) == "NodeLevelHealthTriggeredIV":
+        duration = iv.get( "Duration", -1 )
+        stop = math.inf if duration < 0 else stop + duration
+    return start, stop
+
+
+def _walk( obj ):
+    if isinstance( obj, dict ):
+        for key, value in obj.items():
+            yield key, value
+            yield from _walk( value )
+    elif isinstance( obj, list ):
+        for item in obj:
+            yield from _walk( item )
+
+
+def listened_triggers( event ):
+    """Return the set of triggers an event listens for (any *Trigger_Condition_List in it)."""
+    triggers = set()
+    for key, value in _walk( event ):
+        if key.endswith( "Trigger_Condition_List" ) and isinstance( value, list ):
+            triggers.update( value )
+    return triggers
+
+
+def broadcast_triggers( event ):
+    """
+    Return the set of individual triggers an event can broadcast: string values of keys ending in _Event or
+    _Event_Trigger and strings listed under keys ending in _Events, without "" and NoTrigger. Other values under
+    such keys (numbers, e.g.) and the node events of NODE_EVENT_CLASSES are not triggers.
+    """
+    triggers = set()
+
+    def walk( obj ):
+        if isinstance( obj, dict ):
+            if obj.get( "class" ) in NODE_EVENT_CLASSES:
+                return
+            for key, value in obj.items():
+                if ( key.endswith( "_Event" ) or key.endswith( "_Event_Trigger" ) ) and isinstance( value, str ):
+                    triggers.add( value )
+                elif key.endswith( "_Events" ) and isinstance( value, list ):
+                    triggers.update( v for v in value if isinstance( v, str ) )
+                walk( value )
+        elif isinstance( obj, list ):
+            for item in obj:
+                walk( item )
+    walk( event )
+    triggers.discard( "" )
+    triggers.discard( "NoTrigger" )
+    return triggers
+
+
+def _restriction_levels( event ):
+    """
+    Return the property restrictions found at each level of an event (coordinator, node-level listener, ...).
+    Each level is a list of {key: value} clauses that are OR-ed together; all levels have to pass.
+    """
+    levels = []
+    for key, value in _walk( event ):
+        if key == "Property_Restrictions_Within_Node" and value:
+            levels.append( [ dict( clause ) for clause in value ] )
+        elif key == "Property_Restrictions" and value:
+            if isinstance( value, str ):
+                value = [ value ]
+            levels.append( [ dict( kv.split( ":", 1 ) for kv in value ) ] )
+    return levels
+
+
+def _may_target( levels, ip ):
+    key, value = ip.split( ":", 1 )
+    return all( any( clause.get( key, value ) == value for clause in level ) for level in levels )
+
+
+class _IntervalNode:
+    __slots__ = ( "center", "left", "right", "by_start", "by_stop" )
+
+
+def _build_tree( entries ):
+    if not entries:
+        return None
+    node = _IntervalNode()
+    starts = sorted( e.start for e in entries )
+    node.center = starts[ len( starts ) // 2 ]
+    here = [ e for e in entries if e.start <= node.center <= e.stop ]
+    node.by_start = sorted( here, key=lambda e: e.start )
+    node.by_stop = sorted( here, key=lambda e: e.stop, reverse=True )
+    node.left = _build_tree( [ e for e in entries if e.stop < node.center ] )
+    node.right = _build_tree( [ e for e in entries if e.start > node.center ] )
+    return node
+
+
+def _query_tree( node, lo, hi, found ):
+    while node is not None:
+        if hi < node.center:
+            for e in node.by_start:
+                if e.start > hi:
+                    break
+                found.append( e )
+            node = node.left
+        elif lo > node.center:
+            for e in node.by_stop:
+                if e.stop < lo:
+                    break
+                found.append( e )
+            node = node.right
+        else:
+            found.extend( node.by_start )
+            _query_tree( node.left, lo, hi, found )
+            node = node.right
+
+
+class CampaignTimeline:
+    """
+    Interval-tree index over the active periods of a campaign's events plus trigger maps. Queries return entries,
+    and the maps event indices, in campaign order (by event index).
+
+    Args:
+        campaign: A campaign dict with "Events", a list of events, or the emod_api.campaign module.
+        builtin_events: Events raised by the model itself. Defaults to BUILTIN_EVENTS.
+    """
+    def __init__( self, campaign, builtin_events=None ):
+        if isinstance( campaign, list ):
+            events = campaign
+        elif isinstance( campaign, dict ):
+            events = campaign["Events"]
+        else:
+            events = campaign.campaign_dict["Events"]
+        self.builtin_events = set( BUILTIN_EVENTS if builtin_events is None else builtin_events )
+        self.entries = [ TimelineEntry( idx, *_active_interval( event ), event ) for idx, event in enumerate( events ) ]
+        self._tree = _build_tree( self.entries )
+        self._starts = sorted( ( e.start, e.index ) for e in self.entries )
+        self._restrictions = [ _restriction_levels( e.event ) for e in self.entries ]
+
+        self.listeners = {}
+        self.broadcasters = {}
+        for entry in self.entries:
+            for trigger in listened_triggers( entry.event ):
+                self.listeners.setdefault( trigger, [] ).append( entry.index )
+            for trigger in broadcast_triggers( entry.event ):
+                self.broadcasters.setdefault( trigger, [] ).append( entry.index )
+
+    @classmethod
+    def from_file( cls, filename, builtin_events=None ):
+        with open( filename ) as campaign_file:
+            return cls( json.load( campaign_file ), builtin_events=builtin_events )
+
+    def active_between( self, start_day, stop_day, ip=None ):
+        """
+        Return the events that are active at any point in [start_day, stop_day], ordered by event index.
+
+        Args:
+            start_day: First day of the window.
+            stop_day: Last day of the window.
+            ip: Optional individual property as "Key:Value", e.g., "Region:Urban". Events whose property
+                restrictions exclude it are dropped.
+        """
+        found = []
+        _query_tree( self._tree, start_day, stop_day, found )
+        if ip is not None:
+            found = [ e for e in found if _may_target( self._restrictions[e.index], ip ) ]
+        return sorted( found, key=lambda e: e.index )
+
+    def starting_between( self, start_day, stop_day ):
+        """
+        Return the events whose Start_Day falls in [start_day, stop_day], ordered by event index.
+        """
+        lo = bisect.bisect_left( self._starts, ( start_day, -1 ) )
+        hi = bisect.bisect_right( self._starts, ( stop_day, math.inf ) )
+        return [ self.entries[idx] for idx in sorted( idx for _, idx in self._starts[lo:hi] ) ]
+
+    def orphan_listeners( self ):
+        """
+        Return {trigger: [event indices]} for listeners whose trigger is neither built in nor broadcast by any
+        event. These interventions will never be distributed.
+        """
+        return { trigger: idxs for trigger, idxs in self.listeners.items()
+                 if trigger not in self.broadcasters and trigger not in self.builtin_events }
+
+    def unheard_broadcasts( self, reported_events=None ):
+        """
+        Return {trigger: [event indices]} for broadcast events that no campaign event listens for.
+
+        Args:
+            reported_events: Events that are fine to broadcast without listeners, e.g., the config's
+                Report_Event_Recorder_Events.
+        """
+        reported = set( reported_events or [] )
+        return { trigger: idxs for trigger, idxs in self.broadcasters.items()
+                 if trigger not in self.listeners and trigger not in reported }
+
+    def validate( self, reported_events=None ):
+        """
+        Raise ValueError if any listener is orphaned or any broadcast is unheard and unreported.
+        """
+        problems = []
+        for trigger, idxs in self.orphan_listeners().items():
+            problems.append( f"Events {idxs} listen for '{trigger}' but nothing broadcasts it." )
+        for trigger, idxs in self.unheard_broadcasts( reported_events ).items():
+            problems.append( f"Events {idxs} broadcast '{trigger}' but nothing listens for or reports it." )
+        if problems:
+            raise ValueError( "\n".join( problems ) )
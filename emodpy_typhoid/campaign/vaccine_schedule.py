@@ -0,0 +1,201 @@
+"""
+Declarative vaccine schedules. Describe routine doses, boosters and catch-up campaigns once and compile them into
+the smallest set of campaign events: one birth- or dose-triggered delayed event per routine dose or booster and
+one scheduled event per catch-up campaign. Every event shares the same intervention objects (see
+emodpy_typhoid.interventions.compact), so national schedules with many regions compile in milliseconds.
+
+Later doses are conditional on earlier ones: a dose that something else follows on from broadcasts an event
+named after the dose, and the follow-up listens for it. Add broadcast_events() to the config's custom
+individual events where the model version needs them declared.
+
+Example::
+
+    from emodpy_typhoid.campaign.vaccine_schedule import VaccineSchedule
+    import emodpy_typhoid.interventions.compact as compact
+
+    schedule = VaccineSchedule( vaccine=compact.SimpleVaccine(), name="TCV", start_day=5840 )
+    first = schedule.routine( age=270, coverage=0.85 )
+    schedule.routine( age=450, window=14, coverage=0.9 )   # only children who got the first dose
+    catch_up = schedule.catch_up( start_day=5840, age_min=0.75, age_max=15, coverage=0.72 )
+    schedule.booster( after=catch_up, interval=5 * 365, window=30, coverage=0.5 )
+    schedule.compile().extend_builder( camp )
+"""
+import functools
+
+import emodpy_typhoid.interventions.compact as compact
+
+_DEFAULT_VACCINE = compact.SimpleVaccine()
+
+
+@functools.lru_cache( maxsize=None )
+def _broadcast( event ):
+    return compact.BroadcastEvent( event )
+
+
+class _Dose:
+    __slots__ = ( "name", "kind", "vaccine", "coverage", "age", "window", "after", "interval", "start_day", "age_min",
+                  "age_max", "repetitions" )
+
+    def __init__( self, name, kind, vaccine, coverage, age=None, window=None, after=None, interval=None,
+                  start_day=None, age_min=None, age_max=None, repetitions=1 ):
+        self.name = name
+        self.kind = kind
+        self.vaccine = vaccine
+        self.coverage = coverage
+        self.age = age
+        self.window = window
+        self.after = after
+        self.interval = interval
+        self.start_day = start_day
+        self.age_min = age_min
+        self.age_max = age_max
+        self.repetitions = repetitions
+
+    def distribution_days( self ):
+        return { self.start_day + rep * self.interval for rep in range( self.repetitions ) }
+
+
+class VaccineSchedule:
+    """
+    Multi-dose, multi-cohort vaccine schedule.
+
+    Args:
+        vaccine: Default intervention object for every dose, e.g., compact.SimpleVaccine(). Defaults to a
+            SimpleVaccine like typhoid_vaccine.new_vax.
+        name: Prefix for dose names (and the events broadcast between doses).
+        start_day: Day the routine and booster listeners start.
+        node_ids: Nodes the schedule applies to, or None for all nodes.
+        property_restrictions: "Key:Value" individual property restrictions for every dose.
+        notify: Optional event (e.g., "VaccineDistributed") broadcast with every dose.
+    """
+    def __init__( self, vaccine=None, name="Vax", start_day=1, node_ids=None, property_restrictions=(), notify=None ):
+        self.vaccine = vaccine or _DEFAULT_VACCINE
+        self.name = name
+        self.start_day = start_day
+        self.node_ids = node_ids
+        self.property_restrictions = tuple( property_restrictions )
+        self.notify = notify
+        self.doses = []
+
+    def _add( self, kind, coverage, vaccine, **fields ):
+        if not 0 <= coverage <= 1:
+            raise ValueError( f"coverage must be between 0 and 1, got {coverage}." )
+        dose = _Dose( f"{self.name}_{kind}_{len( self.doses ) + 1}", kind, vaccine or self.vaccine, coverage, **fields )
+        self.doses.append( dose )
+        return dose.name
+
+    def _dose( self, name ):
+        for dose in self.doses:
+            if dose.name == name:
+                return dose
+        raise ValueError( f"Unknown dose {name}. Use the name returned by routine(), booster() or catch_up()." )
+
+    def routine( self, age, window=7, coverage=1.0, vaccine=None, conditional=True ):
+        """
+        Add a routine dose given at age +/- window days.
+
+        Args:
+            age: Age in days.
+            window: Half-width of the uniform delivery window in days.
+            coverage: Fraction of eligible children who get the dose.
+            vaccine: Intervention object, if not the schedule's default.
+            conditional: Give the dose only to children who got the previous routine dose (default). Otherwise
+                every birth is eligible, as with typhoid_vaccine.new_routine_immunization.
+
+        Returns:
+            The dose name.
+        """
+        previous = [ dose for dose in self.doses if dose.kind == "Routine" ]
+        after = previous[-1].name if previous and conditional else None
+        return self._add( "Routine", coverage, vaccine, age=age, window=window, after=after )
+
+    def booster( self, after, interval, window=7, coverage=1.0, vaccine=None ):
+        """
+        Add a dose given interval +/- window days after the dose named after.
+
+        Returns:
+            The dose name.
+        """
+        self._dose( after )
+        return self._add( "Booster", coverage, vaccine, after=after, interval=interval, window=window )
+
+    def catch_up( self, start_day, age_min, age_max, coverage=1.0, vaccine=None, repetitions=1, interval=365 ):
+        """
+        Add a catch-up campaign reaching everyone aged age_min to age_max (in years) on start_day, optionally
+        repeated every interval days.
+
+        Returns:
+            The dose name.
+        """
+        if age_min >= age_max:
+            raise ValueError( f"age_min ({age_min}) must be less than age_max ({age_max})." )
+        if repetitions < 1:
+            raise ValueError( f"repetitions must be at least 1, got {repetitions}." )
+        return self._add( "CatchUp", coverage, vaccine, start_day=start_day, age_min=age_min, age_max=age_max,
+                          repetitions=repetitions, interval=interval )
+
+    def _delay( self, dose ):
+        if dose.kind == "Booster":
+            center = dose.interval
+        elif dose.after is None:
+            center = dose.age
+        else:
+            center = dose.age - self._dose( dose.after ).age
+        return ( max( 0, center - dose.window ), center + dose.window )
+
+    def validate( self ):
+        """
+        Raise ValueError if doses overlap: routine delivery windows must be in increasing, disjoint age order,
+        boosters must come strictly after the dose they follow, and catch-up campaigns must not reach the same
+        ages on the same day.
+        """
+        routine = [ dose for dose in self.doses if dose.kind == "Routine" ]
+        for earlier, later in zip( routine, routine[1:] ):
+            if earlier.age + earlier.window >= later.age - later.window:
+                raise ValueError( f"{later.name} (age {later.age} +/- {later.window}) overlaps {earlier.name} "
+                                  f"(age {earlier.age} +/- {earlier.window})." )
+        for dose in self.doses:
+            if dose.kind == "Booster" and dose.interval - dose.window <= 0:
+                raise ValueError( f"{dose.name} could be given before {dose.after}: interval {dose.interval} must "
+                                  f"exceed window {dose.window}." )
+        catch_ups = [ dose for dose in self.doses if dose.kind == "CatchUp" ]
+        for idx, first in enumerate( catch_ups ):
+            for second in catch_ups[idx + 1:]:
+                same_days = first.distribution_days() & second.distribution_days()
+                if same_days and first.age_min < second.age_max and second.age_min < first.age_max:
+                    raise ValueError( f"{first.name} and {second.name} both reach ages "
+                                      f"{max( first.age_min, second.age_min )}-{min( first.age_max, second.age_max )} "
+                                      f"on day {min( same_days )}." )
+
+    def broadcast_events( self ):
+        """
+        Return the names of the events the compiled campaign broadcasts.
+        """
+        names = sorted( { dose.after for dose in self.doses if dose.after is not None } )
+        return names + [ self.notify ] if self.notify else names
+
+    def compile( self ):
+        """
+        Validate the schedule and return it as a compact.CompactCampaign.
+        """
+        self.validate()
+        followed = { dose.after for dose in self.doses }
+        node_ids = None if self.node_ids is None else tuple( self.node_ids )
+        notify = ( _broadcast( self.notify ), ) if self.notify else ()
+        campaign = compact.CompactCampaign()
+        for dose in self.doses:
+            interventions = ( dose.vaccine, ) + notify
+            if dose.name in followed:
+                interventions += ( _broadcast( dose.name ), )
+            if dose.kind == "CatchUp":
+                campaign.add( compact.ScheduledEvent(
+                    dose.start_day, interventions, coverage=dose.coverage, node_ids=node_ids,
+                    property_restrictions=self.property_restrictions, target_age_min=dose.age_min,
+                    target_age_max=dose.age_max, repetitions=dose.repetitions,
+                    timesteps_between_repetitions=dose.interval if dose.repetitions > 1 else -1 ) )
+            else:
+                campaign.add( compact.TriggeredEvent(
+                    self.start_day, interventions, triggers=( dose.after or "Births", ), coverage=dose.coverage,
+                    node_ids=node_ids, property_restrictions=self.property_restrictions, delay=self._delay( dose ),
+                    event_name=dose.name ) )
+        return campaign
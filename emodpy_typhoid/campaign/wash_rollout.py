@@ -0,0 +1,166 @@
+"""
+WASH (water, sanitation and hygiene) rollouts built from a table of phases. Each phase ramps TyphoidWASH
+coverage in a set of nodes, optionally restricted by individual properties, from one level to another over a
+number of steps. Phases with the same timing, coverage, targeting and intervention are merged across nodes, so
+a city-wide scale-up compiles into a compact campaign of a few events per step instead of one per node.
+
+Coverage is cumulative: each step distributes TyphoidWASH with Dont_Allow_Duplicates to the fraction of people
+not yet covered that brings the expected covered fraction up to the phase's target at that step. Later phases
+in the same nodes carry on from where earlier ones left off. The model checks duplicates by Intervention_Name,
+so coverage is tracked per intervention name: phases with different efficacies but the same name (by default
+every phase is named TyphoidWASH) share one coverage, and a phase only starts a separate coverage if it has its
+own intervention_name.
+
+Example::
+
+    from emodpy_typhoid.campaign.wash_rollout import WashRollout
+
+    rows = pd.read_csv( "wash_scale_up.csv" )   # node_ids, start_year, end_year, coverage, steps, ...
+    rollout = WashRollout.from_table( rows, base_year=1917, efficacy=0.6, decay_time_constant=3650 )
+    rollout.compile().extend_builder( camp )
+"""
+import functools
+
+import emodpy_typhoid.interventions.compact as compact
+from emodpy_typhoid.campaign._util import as_tuple, given
+
+COLUMNS = { "node_ids", "start_day", "end_day", "start_year", "end_year", "coverage", "start_coverage", "steps",
+            "property_restrictions", "efficacy", "mode", "box_duration", "decay_time_constant", "intervention_name" }
+
+
+def ramp( start_day, end_day, start_coverage, end_coverage, steps ):
+    """
+    Return [(day, coverage), ...] for a linear ramp in steps equal steps. The first step is at
+    start_day + (end_day - start_day) / steps and the last reaches end_coverage on end_day.
+    """
+    if steps < 1:
+        raise ValueError( f"steps must be at least 1, got {steps}." )
+    return [ ( start_day + ( end_day - start_day ) * step / steps,
+               start_coverage + ( end_coverage - start_coverage ) * step / steps ) for step in range( 1, steps + 1 ) ]
+
+
+@functools.lru_cache( maxsize=None )
+def _wash( efficacy, mode, box_duration, decay_time_constant, intervention_name ):
+    return compact.TyphoidWASH( efficacy=efficacy, mode=mode,
+                                waning=compact.waning_box_exponential( efficacy, box_duration, decay_time_constant ),
+                                dont_allow_duplicates=True, intervention_name=intervention_name )
+
+
+class WashRollout:
+    """
+    Phased TyphoidWASH rollout. Keyword arguments are the defaults for every phase.
+
+    Args:
+        efficacy: Initial effect of TyphoidWASH.
+        mode: "Shedding", "Dose" or "Exposures".
+        box_duration: Days the effect stays at efficacy before decaying.
+        decay_time_constant: Exponential decay time constant, in days, after the box.
+        intervention_name: Intervention_Name, or None for the model's default (TyphoidWASH). Coverage builds up
+            per name.
+    """
+    def __init__( self, efficacy=1.0, mode="Shedding", box_duration=36500, decay_time_constant=0,
+                  intervention_name=None ):
+        self.defaults = { "efficacy": efficacy, "mode": mode, "box_duration": box_duration,
+                          "decay_time_constant": decay_time_constant, "intervention_name": intervention_name }
+        self.phases = []
+
+    def add_phase( self, start_day, coverage, node_ids=None, end_day=None, start_coverage=None, steps=1,
+                   property_restrictions=(), **intervention ):
+        """
+        Add a phase ramping coverage up to coverage by end_day (or all at once on start_day).
+
+        Args:
+            start_day: Day the phase starts. With end_day, the first step comes one step after start_day.
+            coverage: Cumulative coverage at the end of the phase.
+            node_ids: Nodes in the phase, or None for all nodes.
+            end_day: Day the phase reaches coverage. Defaults to start_day.
+            start_coverage: Coverage already in place when the phase starts. Defaults to wherever earlier
+                phases with the same intervention name left these nodes, or 0.
+            steps: Number of distributions along the ramp.
+            property_restrictions: "Key:Value" individual property restrictions, e.g., ["Region:Urban"].
+            **intervention: efficacy, mode, box_duration, decay_time_constant or intervention_name overriding the
+                defaults.
+        """
+        unknown = set( intervention ) - set( self.defaults )
+        if unknown:
+            raise ValueError( f"Unknown intervention parameter(s) {sorted( unknown )}." )
+        if not 0 <= coverage <= 1:
+            raise ValueError( f"coverage must be between 0 and 1, got {coverage}." )
+        if end_day is not None and end_day < start_day:
+            raise ValueError( f"end_day ({end_day}) is before start_day ({start_day})." )
+        params = dict( self.defaults, **intervention )
+        self.phases.append( { "start_day": start_day, "end_day": start_day if end_day is None else end_day,
+                              "coverage": coverage, "start_coverage": start_coverage, "steps": int( steps ),
+                              "node_ids": None if node_ids is None else tuple( node_ids ),
+                              "property_restrictions": tuple( property_restrictions ),
+                              "intervention": _wash( params["efficacy"], params["mode"], params["box_duration"],
+                                                     params["decay_time_constant"], params["intervention_name"] ) } )
+
+    @classmethod
+    def from_table( cls, rows, base_year=None, **defaults ):
+        """
+        Build a rollout from a table with one phase per row: a pandas DataFrame or a list of dicts.
+
+        Columns are the add_phase arguments. node_ids and property_restrictions can be lists or ";"-separated
+        strings; a single node id is fine too. Phases can be given in years (start_year, end_year) instead of
+        days when base_year is set. Empty cells fall back to the defaults.
+        """
+        if hasattr( rows, "to_dict" ):
+            rows = rows.to_dict( "records" )
+        rollout = cls( **defaults )
+        for row in rows:
+            unknown = set( row ) - COLUMNS
+            if unknown:
+                raise ValueError( f"Unknown rollout column(s) {sorted( unknown )}. Expected some of {sorted( COLUMNS )}." )
+            row = { key: value for key, value in row.items() if given( value ) }
+            for key in ( "start", "end" ):
+                if f"{key}_year" in row:
+                    if base_year is None:
+                        raise ValueError( f"{key}_year needs base_year." )
+                    row[f"{key}_day"] = ( row.pop( f"{key}_year" ) - base_year ) * 365
+            if "node_ids" in row:
+                row["node_ids"] = as_tuple( row["node_ids"], lambda node_id: int( float( node_id ) ) )
+            if "property_restrictions" in row:
+                row["property_restrictions"] = as_tuple( row["property_restrictions"], str ) or ()
+            rollout.add_phase( **row )
+        return rollout
+
+    def steps( self ):
+        """
+        Return the rollout as [(day, node_ids, property_restrictions, intervention, coverage), ...] where coverage
+        is the fraction of not-yet-covered people to reach on that day, one entry per distinct step.
+        """
+        current = {}
+        grouped = {}
+        for phase in sorted( self.phases, key=lambda phase: ( phase["start_day"], phase["end_day"] ) ):
+            nodes = ( None, ) if phase["node_ids"] is None else phase["node_ids"]
+            for node_id in nodes:
+                # the model blocks duplicates by Intervention_Name, whatever the efficacy
+                key = ( node_id, phase["property_restrictions"], phase["intervention"].intervention_name )
+                covered = current.get( key, 0.0 ) if phase["start_coverage"] is None else phase["start_coverage"]
+                if phase["coverage"] < covered:
+                    raise ValueError( f"Phase starting day {phase['start_day']} lowers coverage in node {node_id} "
+                                      f"from {covered} to {phase['coverage']}; WASH can't be taken away." )
+                for day, target in ramp( phase["start_day"], phase["end_day"], covered, phase["coverage"],
+                                         phase["steps"] ):
+                    if target > covered:
+                        increment = 1.0 if covered >= 1 else round( ( target - covered ) / ( 1 - covered ), 9 )
+                        group = ( day, phase["property_restrictions"], phase["intervention"], increment )
+                        grouped.setdefault( group, [] ).append( node_id )
+                    covered = target
+                current[key] = covered
+
+        result = []
+        for ( day, restrictions, intervention, increment ), node_ids in grouped.items():
+            node_ids = None if None in node_ids else tuple( sorted( set( node_ids ) ) )
+            result.append( ( day, node_ids, restrictions, intervention, increment ) )
+        return sorted( result, key=lambda step: ( step[0], step[1] or (), step[2] ) )
+
+    def compile( self ):
+        """
+        Return the rollout as a compact.CompactCampaign with one scheduled event per distinct step.
+        """
+        return compact.CompactCampaign(
+            compact.ScheduledEvent( day, ( intervention, ), coverage=increment, node_ids=node_ids,
+                                    property_restrictions=restrictions )
+            for day, node_ids, restrictions, intervention, increment in self.steps() )
@@ -1,11 +1,224 @@
+import math
+import numbers
+import statistics
+import time
+
+# Config translations between model generations, as (op, parameter, value) rules: "drop" removes a parameter,
+# "set" sets it (adding it if missing) and "rename" moves its value to the parameter named by value.
+TRANSLATIONS = {
+    ( "current", "2018" ): [
+        ( "drop", "Serialized_Population_Filenames", None ),
+        ( "drop", "Serialization_Time_Steps", None ),
+        ( "drop", "Demographics_Filename", None ),
+        ( "set", "Incubation_Period_Distribution", "FIXED_DURATION" ),  # hack
+        ( "set", "Infectious_Period_Distribution", "FIXED_DURATION" ),  # hack
+        ( "set", "Base_Incubation_Period", 1 ),
+        ( "set", "Base_Infectious_Period", 1 ),
+    ]
+}
+
+# Campaign translations, as (op, class, field, value) rules: "drop" removes the field from every intervention of
+# the class, "set" sets it, "rename" renames it to value and "rename_class" renames the class to value.
+CAMPAIGN_TRANSLATIONS = {
+    ( "current", "2018" ): []
+}
+
+
+def _plan( table, source, target ):
+    if ( source, target ) not in table:
+        raise ValueError( f"No translation from '{source}' to '{target}'. Known: {sorted( table )}." )
+    return table[ ( source, target ) ]
+
+
+def _config_plan( source, target, index=None, keep=() ):
+    # fold the rules into one drop set, one rename map and one dict of values to set
+    drop, rename, values = set(), {}, {}
+    for op, name, value in _plan( TRANSLATIONS, source, target ):
+        if op == "drop":
+            drop.add( name )
+        elif op == "set":
+            values[name] = value
+        elif op == "rename":
+            rename[name] = value
+        else:
+            raise ValueError( f"Unknown config translation op '{op}'." )
+    keep = set( keep ) | { "schema", "explicits", "implicits" }
+
+    def dropped( name ):
+        return name in drop or ( index is not None and name not in keep and not index.has_param( name, target ) )
+    return dropped, rename, values
+
+
+def translate_configs( configs, source, target, index=None, keep=() ):
+    """
+    Translate a batch of configs from one model generation to another with the rules in TRANSLATIONS. The rules
+    are resolved once for the whole batch.
+
+    Args:
+        configs: Configs (objects with parameters, like in set_param_fn) or parameter dicts. Changed in place.
+        source: Generation the configs were built for, e.g., "current".
+        target: Generation to translate to, e.g., "2018".
+        index: Optional ParameterIndex (emodpy_typhoid.utils.schema_index) with the target version; every
+            parameter the target schema doesn't have is dropped as well.
+        keep: Parameters never dropped because of index.
+
+    Returns:
+        The configs.
+    """
+    dropped, rename, values = _config_plan( source, target, index, keep )
+    for config in configs:
+        parameters = config.parameters if hasattr( config, "parameters" ) else config
+        for name in [ name for name in parameters if dropped( name ) ]:
+            parameters.pop( name )
+        for old, new in rename.items():
+            if old in parameters:
+                _assign( parameters, new, parameters.pop( old ) )
+        for name, value in values.items():
+            _assign( parameters, name, value )
+    return configs
+
+
+def _assign( parameters, name, value ):
+    # a schema-backed config (emod_api's ReadOnlyDict) is set by attribute, which checks the value against the
+    # schema, records it in explicits and applies depends-on implicits; plain dicts are set by item
+    if type( parameters ) is not dict:
+        from emod_api.schema_to_class import ReadOnlyDict
+        if isinstance( parameters, ReadOnlyDict ):
+            setattr( parameters, name, value )
+            return
+    parameters[name] = value
+
+
+def translate_table( table, source, target, index=None, keep=() ):
+    """
+    Translate a sweep table (a pandas DataFrame with one row per simulation and parameters as columns) from one
+    model generation to another, column-wise. Returns the translated DataFrame.
+    """
+    dropped, rename, values = _config_plan( source, target, index, keep )
+    table = table.drop( columns=[ column for column in table.columns if dropped( column ) ] ).rename( columns=rename )
+    return table.assign( **values )
+
+
+def translate_campaign( campaign, source, target ):
+    """
+    Translate a campaign dict (or an emod_api.campaign-like object) from one model generation to another with
+    the rules in CAMPAIGN_TRANSLATIONS. The campaign is changed in place and returned.
+    """
+    rules = {}
+    for op, classname, field, value in _plan( CAMPAIGN_TRANSLATIONS, source, target ):
+        if op not in ( "drop", "set", "rename", "rename_class" ):
+            raise ValueError( f"Unknown campaign translation op '{op}'." )
+        rules.setdefault( classname, [] ).append( ( op, field, value ) )
+
+    def walk( node ):
+        if isinstance( node, list ):
+            for item in node:
+                walk( item )
+        elif isinstance( node, dict ):
+            for op, field, value in rules.get( node.get( "class" ), () ):
+                if op == "drop":
+                    node.pop( field, None )
+                elif op == "set":
+                    node[field] = value
+                elif op == "rename" and field in node:
+                    node[value] = node.pop( field )
+                elif op == "rename_class":
+                    node["class"] = value
+            for value in node.values():
+                walk( value )
+
+    walk( campaign.campaign_dict if hasattr( campaign, "campaign_dict" ) else campaign )
+    return campaign
+
+
 def cleanup_for_2018_mode( config ):
     # when using 2018 binary
-    config.parameters.pop( "Serialized_Population_Filenames" )
-    config.parameters.pop( "Serialization_Time_Steps" )
-    config.parameters.pop( "Demographics_Filename" )
+    translate_configs( [ config ], "current", "2018" )
+
+
+def plan_sample_rate( run_pilot, rates=(0.05, 0.1, 0.2, 0.5, 1.0), replicates=3, target_cv=0.1, summary=sum ):
+    """
+    Run a short pilot at several values of Base_Individual_Sample_Rate and recommend the lowest one whose
+    run-to-run variability meets a target precision.
+
+    Args:
+        run_pilot: Callable taking (sample_rate, run_number) that runs a short simulation and returns its output,
+            either a number or a sequence such as an InsetChart channel.
+        rates: Candidate sample rates to try, each in (0, 1].
+        replicates: Number of pilot runs (Run_Numbers 0..replicates-1) per rate. Needs to be at least 2.
+        target_cv: Target coefficient of variation (stdev/mean) of the summarized output across replicates.
+        summary: Function that reduces a sequence output to a single number. Defaults to sum.
+
+    Returns:
+        Dict with the per-rate "rows" (rate, mean runtime in seconds, mean, cv, meets_target), the
+        "recommended_rate" (None if no rate meets the target) and the "config_changes" to apply.
+    """
+    if replicates < 2:
+        raise ValueError( f"Need at least 2 replicates per rate to measure variance, got {replicates}." )
+    for rate in rates:
+        if not 0 < rate <= 1:
+            raise ValueError( f"Sample rate {rate} is not in (0, 1]." )
+
+    rows = []
+    for rate in sorted( rates ):
+        values = []
+        runtimes = []
+        for run_number in range( replicates ):
+            start = time.perf_counter()
+            output = run_pilot( rate, run_number )
+            runtimes.append( time.perf_counter() - start )
+            # numpy scalars become floats, so the plan stays JSON-serializable like the rest of the config
+            values.append( float( output if isinstance( output, numbers.Real ) else summary( output ) ) )
+
+        mean = statistics.mean( values )
+        stdev = statistics.stdev( values )
+        cv = stdev / abs( mean ) if mean else math.inf
+        rows.append( {
+            "rate": float( rate ),
+            "runtime": statistics.mean( runtimes ),
+            "mean": mean,
+            "cv": cv,
+            "meets_target": bool( cv <= target_cv )
+        } )
+
+    recommended = next( ( row["rate"] for row in rows if row["meets_target"] ), None )
+    config_changes = {}
+    if recommended is not None:
+        config_changes = {
+            "Individual_Sampling_Type": "FIXED_SAMPLING",
+            "Base_Individual_Sample_Rate": recommended
+        }
+    return { "target_cv": float( target_cv ), "rows": rows, "recommended_rate": recommended, "config_changes": config_changes }
+
+
+def apply_sample_rate_plan( config, plan ):
+    """
+    Apply the config changes of a plan from plan_sample_rate to a config, e.g., from inside set_param_fn.
+
+    Args:
+        config: The config object whose parameters get updated.
+        plan: Dict returned by plan_sample_rate.
+
+    Returns:
+        The updated config.
+    """
+    if plan["recommended_rate"] is None:
+        raise ValueError( f"No sample rate met the target cv of {plan['target_cv']}; nothing to apply." )
+    for key, value in plan["config_changes"].items():
+        _assign( config.parameters, key, value )
+    return config
 
-    config.parameters.Incubation_Period_Distribution = "FIXED_DURATION" # hack
-    config.parameters.Infectious_Period_Distribution = "FIXED_DURATION" # hack
-    config.parameters.Base_Incubation_Period = 1
-    config.parameters.Base_Infectious_Period = 1
 
+def format_sample_rate_report( plan ):
+    """
+    Render a plan from plan_sample_rate as a plain-text table, one row per sample rate.
+    """
+    # speedup is relative to the highest (slowest) rate tried
+    baseline = plan["rows"][-1]["runtime"] if plan["rows"] else 0
+    lines = [ f"{'Rate':>8} {'Runtime (s)':>12} {'Speedup':>8} {'Mean':>12} {'CV':>8}  Meets {plan['target_cv']}" ]
+    for row in plan["rows"]:
+        speedup = baseline / row["runtime"] if row["runtime"] else math.inf
+        lines.append( f"{row['rate']:>8.3f} {row['runtime']:>12.3f} {speedup:>8.2f} {row['mean']:>12.4g} "
+                      f"{row['cv']:>8.4f}  {'yes' if row['meets_target'] else 'no'}" )
+    lines.append( f"Recommended Base_Individual_Sample_Rate: {plan['recommended_rate']}" )
+    return "\n".join( lines )
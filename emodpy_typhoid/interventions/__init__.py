@@ -1,2 +1,7 @@
-from emod_api.campaign import *
-
+def __getattr__( name ):
+    # Lazily re-export emod_api.campaign so importing a single builder module doesn't load it.
+    import emod_api.campaign
+    try:
+        return getattr( emod_api.campaign, name )
+    except AttributeError:
+        raise AttributeError( f"module '{__name__}' has no attribute '{name}'" ) from None
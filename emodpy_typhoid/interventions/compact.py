@@ -0,0 +1,384 @@
+"""
+Lightweight, immutable stand-ins for the schema-backed typhoid interventions and campaign events, for campaigns
+with tens of thousands of events (per-node or per-year schedules). Objects use __slots__, intern their strings
+and are meant to be shared: one TyphoidVaccine can be referenced by every event that distributes it, instead of
+each event carrying its own deep copy of the waning config and targeting.
+
+They serialize to the same campaign JSON as the builders in this package. By default only the parameters that
+are set are written, relying on "Use_Defaults": 1; pass schema_path to to_dict() to fill in every schema default.
+
+Example::
+
+    vax = compact.TyphoidVaccine( efficacy=0.82, waning=compact.waning_box_exponential( 0.82, 0, 6935 ) )
+    campaign = compact.CompactCampaign()
+    for node_id in node_ids:
+        campaign.add( compact.ScheduledEvent( start_day=365, interventions=( vax, ), node_ids=( node_id, ) ) )
+    campaign.save( "campaign.json" )
+"""
+import abc
+import functools
+import json
+import sys
+
+
+def _intern( value ):
+    return sys.intern( value ) if isinstance( value, str ) else value
+
+
+def _strings( values ):
+    return None if values is None else tuple( _intern( value ) for value in values )
+
+
+class _Frozen( abc.ABC ):
+    __slots__ = ()
+
+    def __init__( self, **fields ):
+        for name in self.__slots__:
+            object.__setattr__( self, name, _intern( fields[name] ) )
+
+    def __setattr__( self, name, value ):
+        raise AttributeError( f"{type( self ).__name__} is immutable; create a new one instead." )
+
+    def _key( self ):
+        return tuple( getattr( self, name ) for name in self.__slots__ )
+
+    def __eq__( self, other ):
+        return type( self ) is type( other ) and self._key() == other._key()
+
+    def __hash__( self ):
+        return hash( ( type( self ), self._key() ) )
+
+    def __repr__( self ):
+        fields = ", ".join( f"{name}={getattr( self, name )!r}" for name in self.__slots__ )
+        return f"{type( self ).__name__}({fields})"
+
+    @abc.abstractmethod
+    def to_dict( self, schema_path=None ):
+        """
+        Return the campaign JSON for this object. With schema_path, schema defaults are filled in as well.
+        """
+
+
+class _Parameterized( _Frozen ):
+    # an object whose campaign JSON is its own parameters, with nested objects serialized in place
+    __slots__ = ()
+
+    @abc.abstractmethod
+    def _params( self ):
+        """Return the object's campaign parameters, "class" included."""
+
+    def to_dict( self, schema_path=None ):
+        params = { key: _serialize( value, schema_path ) for key, value in self._params().items() }
+        if schema_path is None:
+            return params
+        full = _defaults( params["class"], schema_path )
+        full.update( params )
+        return full
+
+
+@functools.lru_cache( maxsize=None )
+def _default_template( classname, schema_path ):
+    import emodpy_typhoid.utils.schema_snapshot as s2c
+    template = s2c.get_class_with_defaults( classname, schema_path )
+    template.finalize()
+    return json.dumps( template )
+
+
+def _defaults( classname, schema_path ):
+    return json.loads( _default_template( classname, schema_path ) )
+
+
+def _serialize( value, schema_path ):
+    if isinstance( value, _Frozen ):
+        return value.to_dict( schema_path )
+    if isinstance( value, tuple ):
+        return [ _serialize( item, schema_path ) for item in value ]
+    return value
+
+
+class WaningBoxExponential( _Parameterized ):
+    """WaningEffectBoxExponential. Use waning_box_exponential() to get shared instances."""
+    __slots__ = ( "initial_effect", "box_duration", "decay_time_constant" )
+
+    def __init__( self, initial_effect=1.0, box_duration=0, decay_time_constant=6935.0 ):
+        super().__init__( initial_effect=initial_effect, box_duration=box_duration,
+                          decay_time_constant=decay_time_constant )
+
+    def _params( self ):
+        return { "class": "WaningEffectBoxExponential", "Initial_Effect": self.initial_effect,
+                 "Box_Duration": self.box_duration, "Decay_Time_Constant": self.decay_time_constant }
+
+
+@functools.lru_cache( maxsize=None )
+def waning_box_exponential( initial_effect=1.0, box_duration=0, decay_time_constant=6935.0 ):
+    """
+    Return the shared WaningBoxExponential for these parameters.
+    """
+    return WaningBoxExponential( initial_effect, box_duration, decay_time_constant )
+
+
+class TyphoidVaccine( _Parameterized ):
+    """TyphoidVaccine, as built by typhoid_vaccine.new_intervention."""
+    __slots__ = ( "efficacy", "mode", "waning" )
+
+    def __init__( self, efficacy=0.82, mode="Shedding", waning=None ):
+        super().__init__( efficacy=efficacy, mode=mode,
+                          waning=waning or waning_box_exponential( efficacy, 0, 6935.0 ) )
+
+    def _params( self ):
+        return { "class": "TyphoidVaccine", "Effect": self.efficacy, "Mode": self.mode, "Changing_Effect": self.waning }
+
+
+_VACCINE_TYPES = { "Acquisition": "AcquisitionBlocking", "Transmission": "TransmissionBlocking", "All": "General" }
+
+
+class SimpleVaccine( _Parameterized ):
+    """SimpleVaccine, as built by typhoid_vaccine.new_vax. mode is "Acquisition", "Transmission" or "All"."""
+    __slots__ = ( "mode", "waning" )
+
+    def __init__( self, mode="Acquisition", waning=None ):
+        if mode not in _VACCINE_TYPES:
+            raise ValueError( f"mode {mode} not recognized. Options are: 'Acquisition', 'Transmission', or 'All'." )
+        super().__init__( mode=mode, waning=waning or waning_box_exponential( 0.82, 0, 6935.0 ) )
+
+    def _params( self ):
+        return { "class": "SimpleVaccine", "Vaccine_Type": _VACCINE_TYPES[self.mode], "Waning_Config": self.waning }
+
+
+class TyphoidWASH( _Parameterized ):
+    """
+    TyphoidWASH, as built by typhoid_wash.new_intervention. With dont_allow_duplicates, people who already have
+    an intervention of the same Intervention_Name are skipped, which is what lets repeated distributions ramp
+    coverage up. intervention_name defaults to the model's default, the class name.
+    """
+    __slots__ = ( "efficacy", "mode", "waning", "dont_allow_duplicates", "intervention_name" )
+
+    def __init__( self, efficacy=1.0, mode="Shedding", waning=None, dont_allow_duplicates=False,
+                  intervention_name=None ):
+        super().__init__( efficacy=efficacy, mode=mode, waning=waning or waning_box_exponential( efficacy, 36500, 0 ),
+                          dont_allow_duplicates=dont_allow_duplicates, intervention_name=intervention_name )
+
+    def _params( self ):
+        params = { "class": "TyphoidWASH", "Effect": self.efficacy, "Mode": self.mode, "Changing_Effect": self.waning }
+        if self.intervention_name is not None:
+            params["Intervention_Name"] = self.intervention_name
+        if self.dont_allow_duplicates:
+            params["Dont_Allow_Duplicates"] = 1
+        return params
+
+
+class TyphoidCarrierClear( _Parameterized ):
+    """TyphoidCarrierClear, as built by tcc.new_intervention."""
+    __slots__ = ( "rate", )
+
+    def __init__( self, rate ):
+        super().__init__( rate=rate )
+
+    def _params( self ):
+        return { "class": "TyphoidCarrierClear", "Clearance_Rate": self.rate }
+
+
+class TyphoidCarrierDiagnostic( _Parameterized ):
+    """TyphoidCarrierDiagnostic, as built by tcd.new_intervention."""
+    __slots__ = ( "sensitivity", "specificity", "days_to_diag", "pos_event", "tx_fraction" )
+
+    def __init__( self, sensitivity=1.0, specificity=1.0, days_to_diag=1, pos_event="TestedPositive", tx_fraction=1.0 ):
+        super().__init__( sensitivity=sensitivity, specificity=specificity, days_to_diag=days_to_diag,
+                          pos_event=pos_event, tx_fraction=tx_fraction )
+
+    def _params( self ):
+        return { "class": "TyphoidCarrierDiagnostic", "Base_Sensitivity": self.sensitivity,
+                 "Base_Specificity": self.specificity, "Days_To_Diagnosis": self.days_to_diag,
+                 "Positive_Diagnosis_Event": self.pos_event, "Treatment_Fraction": self.tx_fraction }
+
+
+class OutbreakIndividual( _Parameterized ):
+    """OutbreakIndividual, as built by emod_api.interventions.outbreak.seed_by_coverage."""
+    __slots__ = ( "ignore_immunity", )
+
+    def __init__( self, ignore_immunity=True ):
+        super().__init__( ignore_immunity=ignore_immunity )
+
+    def _params( self ):
+        return { "class": "OutbreakIndividual", "Ignore_Immunity": int( self.ignore_immunity ) }
+
+
+class Outbreak( _Parameterized ):
+    """Node-level Outbreak infecting cases people per node, as built by emod_api.interventions.outbreak.new_intervention."""
+    __slots__ = ( "cases", )
+
+    def __init__( self, cases=1 ):
+        super().__init__( cases=cases )
+
+    def _params( self ):
+        return { "class": "Outbreak", "Number_Cases_Per_Node": self.cases }
+
+
+class BroadcastEvent( _Parameterized ):
+    """BroadcastEvent, e.g., "VaccineDistributed"."""
+    __slots__ = ( "event", )
+
+    def __init__( self, event ):
+        super().__init__( event=event )
+
+    def _params( self ):
+        return { "class": "BroadcastEvent", "Broadcast_Event": self.event }
+
+
+def _intervention_config( interventions, schema_path ):
+    if len( interventions ) == 1:
+        return interventions[0].to_dict( schema_path )
+    mid = { "class": "MultiInterventionDistributor" }
+    if schema_path is not None:
+        mid = _defaults( "MultiInterventionDistributor", schema_path )
+    mid["Intervention_List"] = [ iv.to_dict( schema_path ) for iv in interventions ]
+    return mid
+
+
+def _nodeset( node_ids ):
+    if node_ids is None:
+        return { "class": "NodeSetAll" }
+    return { "class": "NodeSetNodeList", "Node_List": list( node_ids ) }
+
+
+def _targeting( params, coverage, property_restrictions, target_age_min, target_age_max ):
+    params["Demographic_Coverage"] = coverage
+    if property_restrictions:
+        params["Property_Restrictions"] = list( property_restrictions )
+    if target_age_min is not None or target_age_max is not None:
+        params["Target_Demographic"] = "ExplicitAgeRanges"
+        params["Target_Age_Min"] = target_age_min or 0
+        params["Target_Age_Max"] = 125 if target_age_max is None else target_age_max
+    return params
+
+
+def _with_defaults( classname, params, schema_path ):
+    if schema_path is None:
+        return params
+    full = _defaults( classname, schema_path )
+    full.update( params )
+    return full
+
+
+class ScheduledEvent( _Frozen ):
+    """
+    Scheduled campaign event distributing interventions once (or repeatedly) to the targeted individuals.
+
+    Args:
+        start_day: Day of the (first) distribution.
+        interventions: Tuple of intervention objects; more than one gets a MultiInterventionDistributor.
+        coverage: Demographic coverage.
+        node_ids: Tuple of node ids, or None for all nodes.
+        property_restrictions: Tuple of "Key:Value" individual property restrictions.
+        target_age_min: Minimum age in years, or None.
+        target_age_max: Maximum age in years, or None.
+        repetitions: Number_Repetitions.
+        timesteps_between_repetitions: Timesteps_Between_Repetitions.
+    """
+    __slots__ = ( "start_day", "interventions", "coverage", "node_ids", "property_restrictions",
+                  "target_age_min", "target_age_max", "repetitions", "timesteps_between_repetitions" )
+
+    def __init__( self, start_day, interventions, coverage=1.0, node_ids=None, property_restrictions=(),
+                  target_age_min=None, target_age_max=None, repetitions=1, timesteps_between_repetitions=-1 ):
+        super().__init__( start_day=start_day, interventions=tuple( interventions ), coverage=coverage,
+                          node_ids=None if node_ids is None else tuple( node_ids ),
+                          property_restrictions=_strings( property_restrictions ), target_age_min=target_age_min,
+                          target_age_max=target_age_max, repetitions=repetitions,
+                          timesteps_between_repetitions=timesteps_between_repetitions )
+
+    def to_dict( self, schema_path=None ):
+        ecc = _targeting( { "class": "StandardInterventionDistributionEventCoordinator",
+                            "Number_Repetitions": self.repetitions,
+                            "Timesteps_Between_Repetitions": self.timesteps_between_repetitions },
+                          self.coverage, self.property_restrictions, self.target_age_min, self.target_age_max )
+        ecc["Intervention_Config"] = _intervention_config( self.interventions, schema_path )
+        event = { "class": "CampaignEvent", "Start_Day": self.start_day, "Nodeset_Config": _nodeset( self.node_ids ),
+                  "Event_Coordinator_Config": _with_defaults( "StandardEventCoordinator", ecc, schema_path ) }
+        return _with_defaults( "CampaignEvent", event, schema_path )
+
+
+class TriggeredEvent( _Frozen ):
+    """
+    Campaign event that listens for triggers and distributes interventions, optionally after a uniform delay
+    (like typhoid_vaccine.new_routine_immunization).
+
+    Args:
+        start_day: Day the listener starts.
+        interventions: Tuple of intervention objects.
+        triggers: Tuple of trigger names, e.g., ("Births",).
+        coverage: Demographic coverage.
+        node_ids: Tuple of node ids, or None for all nodes.
+        property_restrictions: Tuple of "Key:Value" individual property restrictions.
+        delay: Optional (min_days, max_days) uniform delay between trigger and distribution.
+        event_name: Event_Name of the campaign event.
+    """
+    __slots__ = ( "start_day", "interventions", "triggers", "coverage", "node_ids", "property_restrictions",
+                  "delay", "event_name" )
+
+    def __init__( self, start_day, interventions, triggers=( "Births", ), coverage=1.0, node_ids=None,
+                  property_restrictions=(), delay=None, event_name="Triggered Typhoid Vax" ):
+        super().__init__( start_day=start_day, interventions=tuple( interventions ), triggers=_strings( triggers ),
+                          coverage=coverage, node_ids=None if node_ids is None else tuple( node_ids ),
+                          property_restrictions=_strings( property_restrictions ),
+                          delay=None if delay is None else tuple( delay ), event_name=event_name )
+
+    def to_dict( self, schema_path=None ):
+        if self.delay is None:
+            actual = _intervention_config( self.interventions, schema_path )
+        else:
+            actual = _with_defaults( "DelayedIntervention", {
+                "class": "DelayedIntervention",
+                "Delay_Distribution": "UNIFORM_DURATION",
+                "Delay_Period_Min": self.delay[0],
+                "Delay_Period_Max": self.delay[1],
+                "Actual_IndividualIntervention_Configs": [ iv.to_dict( schema_path ) for iv in self.interventions ]
+            }, schema_path )
+        nlhtiv = _targeting( { "class": "NodeLevelHealthTriggeredIV", "Trigger_Condition_List": list( self.triggers ) },
+                             self.coverage, self.property_restrictions, None, None )
+        nlhtiv["Actual_IndividualIntervention_Config"] = actual
+        if schema_path is not None:
+            nlhtiv = _with_defaults( "NodeLevelHealthTriggeredIV", nlhtiv, schema_path )
+            nlhtiv.pop( "Actual_NodeIntervention_Config", None )
+        ecc = _with_defaults( "StandardEventCoordinator", {
+            "class": "StandardInterventionDistributionEventCoordinator", "Intervention_Config": nlhtiv }, schema_path )
+        event = { "class": "CampaignEvent", "Start_Day": self.start_day, "Nodeset_Config": _nodeset( self.node_ids ),
+                  "Event_Name": self.event_name, "Event_Coordinator_Config": ecc }
+        return _with_defaults( "CampaignEvent", event, schema_path )
+
+
+class CompactCampaign:
+    """
+    List of compact events that serializes to a campaign file.
+    """
+    __slots__ = ( "events", )
+
+    def __init__( self, events=None ):
+        self.events = list( events or [] )
+
+    def add( self, event ):
+        self.events.append( event )
+
+    def __len__( self ):
+        return len( self.events )
+
+    def to_dict( self, schema_path=None ):
+        return { "Events": [ event.to_dict( schema_path ) for event in self.events ], "Use_Defaults": 1 }
+
+    def save( self, filename="campaign.json", schema_path=None ):
+        """
+        Write the campaign file, serializing one event at a time so the full dict never has to exist in memory.
+        """
+        with open( filename, "w" ) as campaign_file:
+            campaign_file.write( '{"Use_Defaults": 1, "Events": [' )
+            for idx, event in enumerate( self.events ):
+                if idx:
+                    campaign_file.write( "," )
+                json.dump( event.to_dict( schema_path ), campaign_file )
+            campaign_file.write( "]}" )
+        return filename
+
+    def extend_builder( self, camp, schema_path=None ):
+        """
+        Append the events, as plain dicts, to the emod_api.campaign builder's event list.
+        """
+        camp.campaign_dict["Events"].extend( event.to_dict( schema_path ) for event in self.events )
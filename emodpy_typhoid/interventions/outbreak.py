@@ -1,26 +1,35 @@
-from emod_api import schema_to_class as s2c
-from emod_api.interventions import utils
-from emod_api.interventions import common
+from emodpy_typhoid.utils.lazy import LazyModule
 import json
 
+# emod_api is imported on first use so that importing the builders stays cheap.
+s2c = LazyModule( "emodpy_typhoid.utils.schema_snapshot" )
+utils = LazyModule( "emod_api.interventions.utils" )
+common = LazyModule( "emod_api.interventions.common" )
+
 def add_outbreak_individual(start_day: int = 1,
                             demographic_coverage: float = 1.0,
                             node_ids: list = None,
                             repetitions: int = 1,
                             timesteps_between_repetitions: int = 365,
-                            ind_property_restrictions: list = None):
-    import emod_api.campaign as campaign
+                            ind_property_restrictions: list = None,
+                            camp=None):
+    """
+    Create a scheduled OutbreakIndividual event infecting demographic_coverage of the targeted population.
+    Does not add to campaign. camp is the campaign to build for; defaults to the emod_api.campaign module.
+    """
+    if camp is None:
+        import emod_api.campaign as camp
     import emod_api.interventions.outbreak as ob
     from emod_api.interventions.common import ScheduledCampaignEvent
 
     outbreak = ob.seed_by_coverage(
         timestep=start_day,
-        campaign_builder=campaign,
+        campaign_builder=camp,
         coverage=demographic_coverage,
         intervention_only=True
     )
 
-    outbreak_event = ScheduledCampaignEvent(camp=campaign,
+    outbreak_event = ScheduledCampaignEvent(camp=camp,
                                             Start_Day=start_day,
                                             Node_Ids=node_ids,
                                             Number_Repetitions=repetitions,
@@ -1,8 +1,12 @@
-from emod_api import schema_to_class as s2c
-from emod_api.interventions import utils
-from emod_api.interventions import common
+from emodpy_typhoid.utils.lazy import LazyModule
 import json
 
+# emod_api is imported on first use so that importing the builders stays cheap. Classes are looked up in the
+# schema's indexed snapshot, which has the same get_class_with_defaults as emod_api.schema_to_class.
+s2c = LazyModule( "emodpy_typhoid.utils.schema_snapshot" )
+utils = LazyModule( "emod_api.interventions.utils" )
+common = LazyModule( "emod_api.interventions.common" )
+
 def new_intervention( camp, rate ):
     """
     TyphoidCarrierClear intervention wrapper.
@@ -34,6 +38,7 @@ def new_triggered_intervention(
 
 def new_scheduled_intervention( 
         camp, 
+        rate,
         start_day=1, 
         coverage=1.0, 
         node_ids=None,
@@ -41,10 +46,9 @@ def new_scheduled_intervention(
         co_event=None # expansion slot
     ):
     """
-    Distribute TyphoidCarrierClear when something happens as determined by a signal published from the
-    model or another campaign event.
+    Distribute TyphoidCarrierClear with clearance rate rate on start_day.
     """
-    iv = new_intervention( camp )
+    iv = new_intervention( camp, rate )
 
     #event = common.ScheduledCampaignEvent( camp, Start_Day=start_day, Demographic_Coverage=coverage, Intervention_List=[ act_intervention, bcast_intervention ], Node_Ids=nodeIDs, Property_Restrictions=property_restrictions_list )
     event = common.ScheduledCampaignEvent( camp, Start_Day=start_day, Demographic_Coverage=coverage, Intervention_List=[ iv ], Node_Ids=node_ids, Property_Restrictions=property_restrictions_list )
@@ -52,7 +56,6 @@ def new_scheduled_intervention(
     return event
 
 def new_intervention_as_file( camp, start_day, filename=None ):
-    import emod_api.campaign as camp
     camp.add( new_triggered_intervention( camp, start_day=start_day, rate=0.567 ), first=True )
     if filename is None:
         filename = "TyphoidCarrierClear.json"
@@ -1,8 +1,12 @@
-from emod_api import schema_to_class as s2c
-from emod_api.interventions import utils
-from emod_api.interventions import common
+from emodpy_typhoid.utils.lazy import LazyModule
 import json
 
+# emod_api is imported on first use so that importing the builders stays cheap. Classes are looked up in the
+# schema's indexed snapshot, which has the same get_class_with_defaults as emod_api.schema_to_class.
+s2c = LazyModule( "emodpy_typhoid.utils.schema_snapshot" )
+utils = LazyModule( "emod_api.interventions.utils" )
+common = LazyModule( "emod_api.interventions.common" )
+
 def new_intervention( camp, sensitivity=1.0, specificity=1.0, days_to_diag = 1, pos_event="TestedPositive", tx_fraction=1.0 ):
     """
     TyphoidCarrierDiagnostic intervention wrapper. Just the intervention. No configuration yet.
@@ -56,7 +60,6 @@ def new_scheduled_intervention(
     return event
 
 def new_intervention_as_file( camp, start_day, filename=None ):
-    import emod_api.campaign as camp
     camp.add( new_triggered_intervention( camp, start_day ), first=True )
     if filename is None:
         filename = "TyphoidCarrierDiagnostic.json"
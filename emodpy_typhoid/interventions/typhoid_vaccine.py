@@ -1,8 +1,12 @@
-from emod_api import schema_to_class as s2c
-from emod_api.interventions import utils
-from emod_api.interventions import common
+from emodpy_typhoid.utils.lazy import LazyModule
 import json
 
+# emod_api is imported on first use so that importing the builders stays cheap. Classes are looked up in the
+# schema's indexed snapshot, which has the same get_class_with_defaults as emod_api.schema_to_class.
+s2c = LazyModule( "emodpy_typhoid.utils.schema_snapshot" )
+utils = LazyModule( "emod_api.interventions.utils" )
+common = LazyModule( "emod_api.interventions.common" )
+
 def new_intervention( camp, efficacy=0.82, mode="Shedding", constant_period=0, decay_constant=6935.0 ):
     """
      Create a new TyphoidVaccine intervention with specified parameters. If you use this function directly, you'll need to distribute the intervention with a function like ScheduledCampaignEvent or TriggeredCampaignEvent from emod_api.interventions.common.
@@ -21,7 +25,7 @@ def new_intervention( camp, efficacy=0.82, mode="Shedding", constant_period=0, d
     intervention = s2c.get_class_with_defaults( "TyphoidVaccine", camp.schema_path )
     intervention.Effect = efficacy
     intervention.Mode = mode
-    intervention.Changing_Effect = s2c.get_class_with_defaults( "WaningEffectBoxExponential" )
+    intervention.Changing_Effect = s2c.get_class_with_defaults( "WaningEffectBoxExponential", camp.schema_path )
     intervention.Changing_Effect.Initial_Effect = efficacy
     intervention.Changing_Effect.Box_Duration = constant_period
     intervention.Changing_Effect.Decay_Time_Constant = decay_constant
@@ -52,7 +56,7 @@ def new_vax( camp, efficacy=0.82, mode="Acquisition", constant_period=0, decay_c
     else:
         raise ValueError( f"mode {mode} not recognized. Options are: 'Acquisition', 'Transmission', or 'All'." )
 
-    intervention.Waning_Config = s2c.get_class_with_defaults( "WaningEffectBoxExponential" )
+    intervention.Waning_Config = s2c.get_class_with_defaults( "WaningEffectBoxExponential", camp.schema_path )
     intervention.Waning_Config.Initial_Effect = efficacy
     intervention.Waning_Config.Box_Duration = constant_period
     intervention.Waning_Config.Decay_Time_Constant = decay_constant
@@ -178,7 +182,6 @@ def new_scheduled_intervention(
     return event
 
 def new_intervention_as_file( camp, start_day, filename=None ):
-    import emod_api.campaign as camp
     camp.add( new_triggered_intervention( camp, start_day=start_day ), first=True )
     if filename is None:
         filename = "TyphoidVaccine.json"
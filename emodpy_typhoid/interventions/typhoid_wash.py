@@ -1,15 +1,33 @@
-from emod_api import schema_to_class as s2c
-from emod_api.interventions import utils
-from emod_api.interventions import common
+from emodpy_typhoid.utils.lazy import LazyModule
 import json
 
-def new_intervention( camp, efficacy=1.0 ):
+# emod_api is imported on first use so that importing the builders stays cheap. Classes are looked up in the
+# schema's indexed snapshot, which has the same get_class_with_defaults as emod_api.schema_to_class.
+s2c = LazyModule( "emodpy_typhoid.utils.schema_snapshot" )
+utils = LazyModule( "emod_api.interventions.utils" )
+common = LazyModule( "emod_api.interventions.common" )
+
+def new_intervention( camp, efficacy=1.0, mode="Shedding", constant_period=36500, decay_constant=0 ):
     """
-    TyphoidWASH intervention wrapper. Just the intervention. No configuration yet.
+    Create a new TyphoidWASH intervention. If you use this function directly, you'll need to distribute the intervention with a function like ScheduledCampaignEvent or TriggeredCampaignEvent from emod_api.interventions.common.
+
+    Args:
+        camp (Camp): The camp to which the intervention is applied.
+        efficacy (float, optional): The initial efficacy of the WASH intervention. Default is 1.0.
+        mode (str, optional): What the intervention reduces: "Shedding", "Dose" or "Exposures". Default is "Shedding".
+        constant_period (float, optional): The constant period of the waning effect in days. Default is 36500, i.e., no waning.
+        decay_constant (float, optional): The decay time constant for the waning effect after the constant period. Default is 0.
+
+    Returns:
+        TyphoidWASH: A fully configured instance of the TyphoidWASH intervention with the specified parameters.
     """
     intervention = s2c.get_class_with_defaults( "TyphoidWASH", camp.schema_path )
     intervention.Effect = efficacy
-    # WaningEffect is TBD.
+    intervention.Mode = mode
+    intervention.Changing_Effect = s2c.get_class_with_defaults( "WaningEffectBoxExponential", camp.schema_path )
+    intervention.Changing_Effect.Initial_Effect = efficacy
+    intervention.Changing_Effect.Box_Duration = constant_period
+    intervention.Changing_Effect.Decay_Time_Constant = decay_constant
     return intervention
 
 def new_triggered_intervention( 
@@ -19,16 +37,20 @@ def new_triggered_intervention(
         coverage=1.0, 
         node_ids=None,
         property_restrictions_list=[],
-        co_event=None # expansion slot
+        co_event=None, # expansion slot
+        efficacy=1.0,
+        mode="Shedding",
+        constant_period=36500,
+        decay_constant=0
     ):
     """
     Distribute TyphoidWASH when something happens as determined by a signal published from the
-    model or another campaign event.
+    model or another campaign event. Efficacy, mode and waning are as in new_intervention.
     """
-    iv = new_intervention( camp )
+    iv = new_intervention( camp, efficacy=efficacy, mode=mode, constant_period=constant_period, decay_constant=decay_constant )
 
     #event = common.ScheduledCampaignEvent( camp, Start_Day=start_day, Demographic_Coverage=coverage, Intervention_List=[ act_intervention, bcast_intervention ], Node_Ids=nodeIDs, Property_Restrictions=property_restrictions_list )
-    event = common.TriggeredCampaignEvent( camp, Start_Day=start_day, Triggers=triggers, Demographic_Coverage=coverage, Intervention_List=[ iv ], Node_Ids=node_ids, Property_Restrictions=property_restrictions_list, Event_Name="Triggered Typhoid Vax" )
+    event = common.TriggeredCampaignEvent( camp, Start_Day=start_day, Triggers=triggers, Demographic_Coverage=coverage, Intervention_List=[ iv ], Node_Ids=node_ids, Property_Restrictions=property_restrictions_list, Event_Name="Triggered Typhoid WASH" )
 
     return event
 
@@ -38,13 +60,16 @@ def new_scheduled_intervention(
         coverage=1.0, 
         node_ids=None,
         property_restrictions_list=[],
-        co_event=None # expansion slot
+        co_event=None, # expansion slot
+        efficacy=1.0,
+        mode="Shedding",
+        constant_period=36500,
+        decay_constant=0
     ):
     """
-    Distribute TyphoidWASH when something happens as determined by a signal published from the
-    model or another campaign event.
+    Distribute TyphoidWASH on start_day. Efficacy, mode and waning are as in new_intervention.
     """
-    iv = new_intervention( camp )
+    iv = new_intervention( camp, efficacy=efficacy, mode=mode, constant_period=constant_period, decay_constant=decay_constant )
 
     #event = common.ScheduledCampaignEvent( camp, Start_Day=start_day, Demographic_Coverage=coverage, Intervention_List=[ act_intervention, bcast_intervention ], Node_Ids=nodeIDs, Property_Restrictions=property_restrictions_list )
     event = common.ScheduledCampaignEvent( camp, Start_Day=start_day, Demographic_Coverage=coverage, Intervention_List=[ iv ], Node_Ids=node_ids, Property_Restrictions=property_restrictions_list )
@@ -52,8 +77,7 @@ def new_scheduled_intervention(
     return event
 
 def new_intervention_as_file( camp, start_day, filename=None ):
-    import emod_api.campaign as camp
-    camp.add( new_triggered_intervention( camp, start_day ), first=True )
+    camp.add( new_triggered_intervention( camp, start_day=start_day ), first=True )
     if filename is None:
         filename = "TyphoidWASH.json"
     camp.save( filename )
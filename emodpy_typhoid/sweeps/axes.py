@@ -0,0 +1,214 @@
+"""
+Sweeps that build each campaign and demographics once. With SimulationBuilder, every simulation runs every sweep
+callback, so crossing a campaign axis with a seed axis rebuilds the same campaign once per seed. SweepPlan takes
+the same callbacks, but runs them against a recording task. It notes what each axis touches (config,
+campaign, demographics) and only calls a campaign or demographics builder the first time its own axes take a
+given combination of values. Later simulations with that combination reuse the built artifact (each campaign
+simulation gets its own copy, since emodpy resets the campaign it is given). Config-only axes like the random
+seed never cause a rebuild.
+
+Example (the HINTy sweep: 3 campaigns built instead of 15)::
+
+    plan = SweepPlan()
+    plan.add_sweep_definition( update_campaign_efficacy, np.linspace( 0, 1.0, 3 ) )
+    plan.add_sweep_definition( update_sim_random_seed, range( 5 ) )
+    experiment = Experiment.from_builder( plan, task )
+
+When several campaign axes each pass a functools.partial of the same builder (update_campaign_efficacy with
+update_campaign_start), their keyword arguments are combined, rather than the last one replacing the others.
+"""
+import itertools
+import json
+from functools import partial
+from types import SimpleNamespace
+
+from emodpy_typhoid.campaign.context import CampaignContext
+
+CONFIG = "config"
+CAMPAIGN = "campaign"
+DEMOGRAPHICS = "demographics"
+
+
+class _Parameters:
+    # writes go through to the real parameters and are noted
+    def __init__( self, parameters, touched ):
+        object.__setattr__( self, "_parameters", parameters )
+        object.__setattr__( self, "_touched", touched )
+
+    def __getattr__( self, name ):
+        return getattr( self._parameters, name )
+
+    def __setattr__( self, name, value ):
+        self._touched.add( CONFIG )
+        setattr( self._parameters, name, value )
+
+    def __getitem__( self, name ):
+        return self._parameters[name]
+
+    def __setitem__( self, name, value ):
+        self._touched.add( CONFIG )
+        self._parameters[name] = value
+
+
+class _Config:
+    def __init__( self, config, touched ):
+        self._config = config
+        self.parameters = _Parameters( config.parameters if config is not None else SimpleNamespace(), touched )
+
+    def __getattr__( self, name ):
+        return getattr( self._config, name )
+
+
+class _Task:
+    # records campaign and demographics requests instead of building them
+    def __init__( self, task, touched, requests ):
+        self._task = task
+        self._touched = touched
+        self._requests = requests
+        self.config = _Config( getattr( task, "config", None ), touched )
+
+    def create_campaign_from_callback( self, builder, *args, **kwargs ):
+        self._touched.add( CAMPAIGN )
+        self._requests.setdefault( CAMPAIGN, [] ).append( ( builder, args, kwargs ) )
+
+    def create_demog_from_callback( self, builder, *args, **kwargs ):
+        self._touched.add( DEMOGRAPHICS )
+        self._requests.setdefault( DEMOGRAPHICS, [] ).append( ( builder, args, kwargs ) )
+
+    def __getattr__( self, name ):
+        return getattr( self._task, name )
+
+    def __setattr__( self, name, value ):
+        if name.startswith( "_" ) or name == "config":
+            object.__setattr__( self, name, value )
+        else:
+            setattr( self._task, name, value )
+
+
+class _Simulation:
+    def __init__( self, simulation, task ):
+        object.__setattr__( self, "_simulation", simulation )
+        object.__setattr__( self, "task", task )
+
+    def __getattr__( self, name ):
+        return getattr( self._simulation, name )
+
+    def __setattr__( self, name, value ):
+        setattr( self._simulation, name, value )
+
+
+def _record( callback, value, simulation ):
+    touched, requests = set(), {}
+    task = _Task( getattr( simulation, "task", None ), touched, requests )
+    tags = callback( _Simulation( simulation, task ), value )
+    return tags, touched, requests
+
+
+def classify( callback, value, simulation=None ):
+    """
+    Return what callback( simulation, value ) touches: a set of "config", "campaign" and "demographics".
+    Without a simulation, it is run against a stand-in with empty parameters.
+    """
+    return _record( callback, value, simulation )[1]
+
+
+def _combine( requests ):
+    # partials of one builder from several axes become one partial with all their keywords
+    builders = [ builder for builder, _, _ in requests ]
+    if len( builders ) > 1 and all( isinstance( builder, partial ) for builder in builders ) \
+            and len( { ( builder.func, builder.args ) for builder in builders } ) == 1:
+        keywords = {}
+        for builder in builders:
+            keywords.update( builder.keywords )
+        _, args, kwargs = requests[-1]
+        return partial( builders[0].func, *builders[0].args, **keywords ), args, kwargs
+    return requests[-1]
+
+
+def _params( kind, args, kwargs ):
+    # builder arguments as emodpy passes them: create_campaign_from_callback( builder, params ) and
+    # create_demog_from_callback( builder, from_sweep, params )
+    position = 0 if kind == CAMPAIGN else 1
+    return kwargs.get( "params", args[position] if len( args ) > position else None )
+
+
+def _call( builder, params ):
+    # and call the builder the way emodpy does
+    return builder() if params is None else builder( params=params )
+
+
+def _key( value ):
+    try:
+        return json.dumps( value, sort_keys=True )
+    except TypeError:
+        return repr( value )
+
+
+class SweepPlan:
+    """
+    Cartesian sweep over axes added with add_sweep_definition, usable wherever idmtools takes a builder.
+
+    Attributes:
+        kinds: {axis index: set of what the axis touched}, filled in as simulations are created.
+        builds: Number of campaign and demographics builds so far.
+    """
+    def __init__( self ):
+        self.axes = []
+        self.kinds = {}
+        self.builds = { CAMPAIGN: 0, DEMOGRAPHICS: 0 }
+        self._artifacts = {}
+
+    def add_sweep_definition( self, callback, values ):
+        """Add an axis: callback( simulation, value ) is called with each of values, like SimulationBuilder."""
+        self.axes.append( ( callback, list( values ) ) )
+
+    @property
+    def count( self ):
+        count = 1
+        for _, values in self.axes:
+            count *= len( values )
+        return count
+
+    def __len__( self ):
+        return self.count
+
+    def __iter__( self ):
+        for combination in itertools.product( *[ values for _, values in self.axes ] ):
+            yield [ partial( self._apply, combination=combination ) ]
+
+    def _artifact( self, kind, key, request ):
+        if ( kind, key ) not in self._artifacts:
+            builder, args, kwargs = request
+            artifact = _call( builder, _params( kind, args, kwargs ) )
+            if kind == CAMPAIGN and hasattr( artifact, "campaign_dict" ):
+                # emod_api.campaign is rebuilt in place by the next build, so keep a copy
+                artifact = CampaignContext.from_campaign( artifact )
+            self._artifacts[ ( kind, key ) ] = artifact
+            self.builds[kind] += 1
+        artifact = self._artifacts[ ( kind, key ) ]
+        if isinstance( artifact, CampaignContext ):
+            # emodpy resets the campaign once it has read it, so every simulation gets its own copy
+            artifact = CampaignContext.from_campaign( artifact )
+        return artifact
+
+    def _apply( self, simulation, combination ):
+        tags = {}
+        requests = {}
+        axes_by_kind = {}
+        for idx, ( ( callback, _ ), value ) in enumerate( zip( self.axes, combination ) ):
+            axis_tags, touched, axis_requests = _record( callback, value, simulation )
+            self.kinds.setdefault( idx, set() ).update( touched )
+            tags.update( axis_tags or {} )
+            for kind, kind_requests in axis_requests.items():
+                requests.setdefault( kind, [] ).extend( kind_requests )
+                axes_by_kind.setdefault( kind, [] ).append( ( idx, _key( value ) ) )
+
+        for kind, create in ( ( CAMPAIGN, "create_campaign_from_callback" ),
+                              ( DEMOGRAPHICS, "create_demog_from_callback" ) ):
+            if kind in requests:
+                request = _combine( requests[kind] )
+                _, args, kwargs = request
+                key = ( tuple( axes_by_kind[kind] ), _key( _params( kind, args, kwargs ) ) )
+                artifact = self._artifact( kind, key, request )
+                getattr( simulation.task, create )( lambda *_, artifact=artifact, **__: artifact, *args, **kwargs )
+        return tags
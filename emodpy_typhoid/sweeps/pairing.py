@@ -0,0 +1,46 @@
+"""
+Common random numbers. Simulations with the same Run_Number follow the same trajectory until an intervention
+makes them differ, which is what test_typhoid_vaccine's compare_infected_before_vax relies on. Comparing arms
+run by run, rather than arm mean against arm mean, cancels most of the run-to-run noise. paired_design lays out
+such a comparison: every arm is run with the same Run_Numbers. emodpy_typhoid.analysis.paired computes the
+paired differences from the results.
+
+Example::
+
+    design = paired_design( { "no_vax": { "vax_eff": 0.0 }, "vax": { "vax_eff": 0.82 } }, replicates=20 )
+    sweep = SweepTable( design, campaign_builder=build_camp, campaign_columns=[ "vax_eff" ], tags_path="sweep.csv" )
+"""
+import pandas as pd
+
+ARM = "_arm"
+PAIR = "_pair"
+
+
+def paired_design( arms, replicates, first_run_number=0, run_number="Run_Number" ):
+    """
+    Return a sweep table (see emodpy_typhoid.sweeps.table) running every arm with the same Run_Numbers.
+
+    Args:
+        arms: {arm name: {column: value}}, the columns being config parameters or campaign builder arguments.
+            Every arm needs the same columns.
+        replicates: Number of pairs (Run_Numbers) per arm.
+        first_run_number: Run_Number of the first pair.
+        run_number: Name of the seed parameter.
+
+    Returns:
+        DataFrame with one row per simulation: the arm's columns, the seed, and _arm and _pair tag columns.
+        The rows of one pair are next to each other, so pairs finish together.
+    """
+    if not arms:
+        raise ValueError( "Give at least one arm." )
+    columns = { name: sorted( values ) for name, values in arms.items() }
+    first = next( iter( columns.values() ) )
+    for name, arm_columns in columns.items():
+        if arm_columns != first:
+            raise ValueError( f"Arm '{name}' sets {arm_columns} but the first arm sets {first}; every arm needs "
+                              "the same columns." )
+        if run_number in arm_columns:
+            raise ValueError( f"Arm '{name}' sets {run_number}, which the pairing sets." )
+    rows = [ dict( values, **{ run_number: first_run_number + pair, ARM: name, PAIR: pair } )
+             for pair in range( replicates ) for name, values in arms.items() ]
+    return pd.DataFrame( rows )
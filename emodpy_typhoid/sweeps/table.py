@@ -0,0 +1,157 @@
+"""
+Sweeps defined as tables. Instead of one callback per swept parameter, multiplied out by SimulationBuilder, a
+SweepTable takes a pandas DataFrame with one row per simulation. Columns are config parameters, except those
+named in campaign_columns, which are passed to the campaign builder, and columns starting with "_", which are
+only recorded. The table is an idmtools builder: each row is applied to its simulation in one step.
+
+Large designs (Latin hypercube, Sobol) can be streamed as chunks of rows, so the whole design never has to be
+in memory. Each simulation is only tagged with its row number (and any "_" columns); the full table is written
+columnar to tags_path as it streams, to join with results later.
+
+Example::
+
+    design = latin_hypercube( { "Typhoid_Acute_Infectiousness": ( 2000, 6000 ),
+                                "Typhoid_Environmental_Exposure_Rate": ( 0.1, 0.5 ),
+                                "vax_eff": ( 0.4, 0.9 ) }, samples=5000, seed=1 )
+    design["Run_Number"] = range( len( design ) )
+    sweep = SweepTable( design, campaign_builder=build_camp, campaign_columns=[ "vax_eff" ],
+                        tags_path="sweep.csv" )
+    experiment = Experiment.from_builder( sweep, task )
+"""
+import os
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+ROW = "sweep_row"
+
+
+def _apply_row( simulation, row, parameters, campaign_builder, campaign_kwargs, tags ):
+    config = simulation.task.config.parameters
+    for name, value in parameters.items():
+        setattr( config, name, value )
+    if campaign_builder is not None:
+        simulation.task.create_campaign_from_callback( partial( campaign_builder, **campaign_kwargs ) )
+    return dict( tags, **{ ROW: row } )
+
+
+class SweepTable:
+    """
+    Sweep over the rows of a table, usable wherever idmtools takes a builder.
+
+    Args:
+        design: A DataFrame, an iterable of DataFrame chunks, or a function returning such an iterable (which
+            lets the sweep be iterated more than once).
+        campaign_builder: Campaign builder called with the campaign columns of a row as keyword arguments.
+        campaign_columns: Columns passed to campaign_builder rather than set in the config.
+        tags_path: CSV file the rows are written to (with their sweep_row) as they are swept.
+        count: Number of rows, for streamed designs whose size is known.
+    """
+    def __init__( self, design, campaign_builder=None, campaign_columns=(), tags_path=None, count=None ):
+        self.design = design
+        self.campaign_builder = campaign_builder
+        self.campaign_columns = list( campaign_columns )
+        self.tags_path = tags_path
+        if campaign_columns and campaign_builder is None:
+            raise ValueError( f"campaign_columns {self.campaign_columns} need a campaign_builder." )
+        self._count = len( design ) if isinstance( design, pd.DataFrame ) else count
+        self._consumed = False
+
+    @property
+    def count( self ):
+        return self._count
+
+    def __len__( self ):
+        if self._count is None:
+            raise TypeError( "The size of a streamed design isn't known; pass count." )
+        return self._count
+
+    def chunks( self ):
+        """Yield the design as DataFrame chunks."""
+        if isinstance( self.design, pd.DataFrame ):
+            yield self.design
+            return
+        if callable( self.design ):
+            yield from self.design()
+            return
+        if self._consumed:
+            raise ValueError( "This streamed design has already been swept; pass a function returning the chunks "
+                              "to sweep it again." )
+        self._consumed = True
+        yield from self.design
+
+    def _split( self, columns ):
+        missing = [ column for column in self.campaign_columns if column not in columns ]
+        if missing:
+            raise ValueError( f"Campaign column(s) {missing} aren't in the design." )
+        config = [ column for column in columns if column not in self.campaign_columns and not column.startswith( "_" ) ]
+        tags = [ column for column in columns if column.startswith( "_" ) ]
+        return config, tags
+
+    def __iter__( self ):
+        """Yield, for each row, the list of callbacks idmtools applies to its simulation."""
+        if self.tags_path and os.path.exists( self.tags_path ):
+            os.remove( self.tags_path )
+        row = 0
+        for chunk in self.chunks():
+            config, tags = self._split( list( chunk.columns ) )
+            records = chunk.to_dict( "records" )  # python scalars, for the config and campaign JSON
+            if self.tags_path:
+                chunk.assign( **{ ROW: np.arange( row, row + len( chunk ) ) } ).to_csv(
+                    self.tags_path, mode="a", header=row == 0, index=False )
+            for record in records:
+                yield [ partial( _apply_row, row=row, parameters={ name: record[name] for name in config },
+                                 campaign_builder=self.campaign_builder,
+                                 campaign_kwargs={ name: record[name] for name in self.campaign_columns },
+                                 tags={ name: record[name] for name in tags } ) ]
+                row += 1
+        if self._count is None:
+            self._count = row
+
+
+def load_tags( path ):
+    """Return the rows written by a SweepTable's tags_path, indexed by sweep_row."""
+    return pd.read_csv( path ).set_index( ROW )
+
+
+def _chunked( table, chunk_size ):
+    if chunk_size is None:
+        return table
+    return ( table.iloc[ start:start + chunk_size ] for start in range( 0, len( table ), chunk_size ) )
+
+
+def _scale( unit, ranges ):
+    low = np.array( [ bounds[0] for bounds in ranges.values() ], dtype=float )
+    high = np.array( [ bounds[1] for bounds in ranges.values() ], dtype=float )
+    return pd.DataFrame( low + unit * ( high - low ), columns=list( ranges ) )
+
+
+def grid( **axes ):
+    """Return the full factorial design of the given axes (name=values) as a DataFrame."""
+    index = pd.MultiIndex.from_product( list( axes.values() ), names=list( axes ) )
+    return index.to_frame( index=False )
+
+
+def latin_hypercube( ranges, samples, seed=None, chunk_size=None ):
+    """
+    Return a Latin hypercube design over {column: (low, high)} with samples rows, or a generator of chunks of
+    chunk_size rows.
+    """
+    rng = np.random.default_rng( seed )
+    strata = np.argsort( rng.random( ( samples, len( ranges ) ) ), axis=0 )
+    unit = ( strata + rng.random( ( samples, len( ranges ) ) ) ) / samples
+    return _chunked( _scale( unit, ranges ), chunk_size )
+
+
+def sobol( ranges, samples, seed=None, chunk_size=None ):
+    """
+    Return a scrambled Sobol design over {column: (low, high)} with samples rows (a power of two keeps its
+    balance properties), or a generator of chunks of chunk_size rows. Needs scipy.
+    """
+    try:
+        from scipy.stats import qmc
+    except ImportError:
+        raise ImportError( "Sobol designs need scipy; install it or use latin_hypercube." ) from None
+    unit = qmc.Sobol( d=len( ranges ), scramble=True, seed=seed ).random( samples )
+    return _chunked( _scale( unit, ranges ), chunk_size )
@@ -0,0 +1,338 @@
+"""
+Optional local build daemon. Submission scripts are short-lived, so each one pays for importing emod_api and
+parsing the schema before it builds a single campaign. The daemon is a long-running process that keeps the
+schema, parameter profiles and recently built demographics loaded and builds campaigns, configs and demographics on
+request over a Unix socket; BuildClient is the client side.
+
+Start it once (it serves until shut down)::
+
+    python -m emodpy_typhoid.utils.build_daemon --socket /tmp/typhoid_build.sock --schema schema.json \\
+        --profile blantyre=blantyre_params.json
+
+then, in each script::
+
+    from emodpy_typhoid.utils.build_daemon import BuildClient
+
+    client = BuildClient( "/tmp/typhoid_build.sock" )
+    camp = client.campaign( "my_project.campaigns:build_camp", coverage=0.8 )
+    task.create_campaign_from_callback( lambda: camp )
+    demog = client.demographics( "emodpy_typhoid.demographics.TyphoidDemographics:from_csv",
+                                 pop_filename_in="nodes.csv" )
+    parameters = client.config( "blantyre", Run_Number=3 )
+
+Builders are named "module:function". Campaign builders are called as build_fn( camp, **kwargs ) with a fresh
+CampaignContext, and the client gets back a CampaignContext holding the built events and the triggers the builder
+registered; demographics builders return a Demographics object or dict. Requests and replies are one line of JSON
+each. The socket is only accessible to the user running the daemon, since it runs any builder it is asked to.
+"""
+import argparse
+import fcntl
+import importlib
+import json
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from emodpy_typhoid.campaign.context import CampaignContext
+from emodpy_typhoid.utils import schema_snapshot
+
+
+def _resolve( name ):
+    module, _, attr = name.partition( ":" )
+    if not module or not attr:
+        raise ValueError( f"Builder '{name}' must be given as 'module:function'." )
+    fn = importlib.import_module( module )
+    for part in attr.split( "." ):
+        fn = getattr( fn, part )
+    return fn
+
+
+def _file_stamps( kwargs ):
+    # files named in the arguments are part of the cache key, so editing an input rebuilds
+    stamps = {}
+    for key, value in kwargs.items():
+        if isinstance( value, str ) and os.path.isfile( value ):
+            stat = os.stat( value )
+            stamps[key] = ( stat.st_size, stat.st_mtime_ns )
+    return stamps
+
+
+def _demographics_dict( demog ):
+    if isinstance( demog, dict ):
+        return demog
+    if hasattr( demog, "to_dict" ):
+        return demog.to_dict()
+    return demog.raw
+
+
+class BuildServer:
+    """
+    State kept resident by the daemon.
+
+    Args:
+        schema_path: Schema file campaigns are built against.
+        profiles: {name: parameters dict or JSON file with a "parameters" section}.
+        max_demographics: Number of built demographics kept; the least recently used is dropped beyond that.
+    """
+    def __init__( self, schema_path=None, profiles=None, max_demographics=32 ):
+        self.schema_path = schema_path
+        if schema_path:
+            schema_snapshot.load( schema_path )
+        self.profiles = {}
+        for name, profile in ( profiles or {} ).items():
+            self.add_profile( name, profile )
+        self.builders = {}
+        self.demographics_cache = OrderedDict()
+        self.max_demographics = max_demographics
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def add_profile( self, name, profile ):
+        if isinstance( profile, str ):
+            with open( profile ) as profile_file:
+                profile = json.load( profile_file )
+        self.profiles[name] = dict( profile.get( "parameters", profile ) )
+
+    def _builder( self, name ):
+        if name not in self.builders:
+            self.builders[name] = _resolve( name )
+        return self.builders[name]
+
+    def campaign( self, builder, kwargs ):
+        camp = CampaignContext( self.schema_path )
+        self._builder( builder )( camp, **kwargs )
+        return { "campaign": camp.to_dict(), "triggers": camp.triggers() }
+
+    def demographics( self, builder, kwargs ):
+        key = json.dumps( [ builder, kwargs, _file_stamps( kwargs ) ], sort_keys=True, default=repr )
+        with self._lock:
+            cached = self.demographics_cache.get( key )
+            if cached is not None:
+                self.demographics_cache.move_to_end( key )
+        if cached is None:
+            cached = json.dumps( _demographics_dict( self._builder( builder )( **kwargs ) ) )
+            with self._lock:
+                self.demographics_cache[key] = cached
+                while len( self.demographics_cache ) > self.max_demographics:
+                    self.demographics_cache.popitem( last=False )
+        return json.loads( cached )
+
+    def config( self, profile, overrides ):
+        if profile not in self.profiles:
+            raise ValueError( f"Unknown profile '{profile}'. Loaded profiles: {sorted( self.profiles )}." )
+        return dict( self.profiles[profile], **overrides )
+
+    def status( self ):
+        return { "pid": os.getpid(), "schema_path": self.schema_path, "profiles": sorted( self.profiles ),
+                 "builders": sorted( self.builders ), "demographics_cached": len( self.demographics_cache ),
+                 "requests": self.requests }
+
+    def handle( self, request ):
+        """
+        Serve one request dict and return the reply dict: {"ok": True, "result": ...} or {"ok": False,
+        "error": ...}.
+        """
+        with self._lock:
+            self.requests += 1
+        op = request.get( "op" )
+        try:
+            if op == "campaign":
+                result = self.campaign( request["builder"], request.get( "kwargs", {} ) )
+            elif op == "demographics":
+                result = self.demographics( request["builder"], request.get( "kwargs", {} ) )
+            elif op == "config":
+                result = self.config( request["profile"], request.get( "overrides", {} ) )
+            elif op == "status":
+                result = self.status()
+            else:
+                raise ValueError( f"Unknown op '{op}'." )
+        except Exception as ex:
+            return { "ok": False, "error": f"{type( ex ).__name__}: {ex}" }
+        return { "ok": True, "result": result }
+
+
+class _Handler( socketserver.StreamRequestHandler ):
+    def handle( self ):
+        for line in self.rfile:
+            request = json.loads( line )
+            if request.get( "op" ) == "shutdown":
+                self.wfile.write( b'{"ok": true, "result": null}\n' )
+                threading.Thread( target=self.server.shutdown, daemon=True ).start()
+                return
+            self.wfile.write( json.dumps( self.server.build_server.handle( request ) ).encode() + b"\n" )
+
+
+class _UnixServer( socketserver.ThreadingMixIn, socketserver.UnixStreamServer ):
+    daemon_threads = True
+
+
+def _remove_stale( socket_path ):
+    # a socket file nobody accepts on was left by a daemon that died; one that answers belongs to a live daemon
+    probe = socket.socket( socket.AF_UNIX, socket.SOCK_STREAM )
+    try:
+        probe.connect( socket_path )
+    except FileNotFoundError:
+        return
+    except ConnectionRefusedError:
+        os.remove( socket_path )
+        return
+    finally:
+        probe.close()
+    raise FileExistsError( f"A build daemon is already serving on {socket_path}." )
+
+
+def serve( socket_path, schema_path=None, profiles=None, ready=None, max_demographics=32 ):
+    """
+    Run the daemon on socket_path until a client sends shutdown. ready, if given, is a threading.Event set
+    once the socket accepts connections. Raises FileExistsError if another daemon is serving on socket_path;
+    a socket left by a daemon that died is replaced. <socket_path>.lock serializes daemons starting at once.
+    """
+    build_server = BuildServer( schema_path, profiles, max_demographics )
+    with open( socket_path + ".lock", "a" ) as lock_file:
+        fcntl.flock( lock_file, fcntl.LOCK_EX )
+        _remove_stale( socket_path )
+        umask = os.umask( 0o177 )
+        try:
+            server = _UnixServer( socket_path, _Handler )
+        finally:
+            os.umask( umask )
+    server.build_server = build_server
+    if ready is not None:
+        ready.set()
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists( socket_path ):
+            os.remove( socket_path )
+
+
+class BuildClient:
+    """
+    Client for a running build daemon. Keeps one connection open for all its requests.
+
+    Args:
+        socket_path: The daemon's socket.
+        timeout: Seconds to wait for a reply.
+    """
+    def __init__( self, socket_path, timeout=60 ):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._sock = None
+        self._file = None
+
+    def _connect( self ):
+        if self._sock is None:
+            sock = socket.socket( socket.AF_UNIX, socket.SOCK_STREAM )
+            sock.settimeout( self.timeout )
+            try:
+                sock.connect( self.socket_path )
+            except OSError:
+                sock.close()
+                raise
+            self._sock, self._file = sock, sock.makefile( "rb" )
+
+    def request( self, op, **fields ):
+        """Send one request and return its result. Raises ValueError with the daemon's error if it failed."""
+        self._connect()
+        self._sock.sendall( json.dumps( dict( fields, op=op ) ).encode() + b"\n" )
+        line = self._file.readline()
+        if not line:
+            self.close()
+            raise ConnectionError( f"The build daemon at {self.socket_path} closed the connection." )
+        reply = json.loads( line )
+        if not reply["ok"]:
+            raise ValueError( reply["error"] )
+        return reply["result"]
+
+    def campaign( self, builder, **kwargs ):
+        """
+        Return a CampaignContext holding the events built by builder( camp, **kwargs ) and the triggers it
+        registered, ready for task.create_campaign_from_callback.
+        """
+        built = self.request( "campaign", builder=builder, kwargs=kwargs )
+        return CampaignContext.from_dict( built["campaign"], triggers=built["triggers"] )
+
+    def demographics( self, builder, **kwargs ):
+        """Return the demographics dict built by builder( **kwargs ), cached by the daemon."""
+        return self.request( "demographics", builder=builder, kwargs=kwargs )
+
+    def config( self, profile, **overrides ):
+        """Return the parameters of a loaded profile with overrides applied."""
+        return self.request( "config", profile=profile, overrides=overrides )
+
+    def status( self ):
+        return self.request( "status" )
+
+    def shutdown( self ):
+        """Stop the daemon."""
+        self.request( "shutdown" )
+        self.close()
+
+    def close( self ):
+        if self._sock is not None:
+            self._file.close()
+            self._sock.close()
+            self._sock = self._file = None
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, *exc ):
+        self.close()
+
+
+def ensure_daemon( socket_path, schema_path=None, profiles=None, timeout=60 ):
+    """
+    Return a BuildClient for the daemon on socket_path, starting the daemon in the background first if none is
+    running.
+
+    Args:
+        socket_path: Socket of the daemon.
+        schema_path: Schema file, used if the daemon has to be started.
+        profiles: {name: parameters JSON file}, used if the daemon has to be started.
+        timeout: Seconds to wait for a new daemon to come up.
+    """
+    client = BuildClient( socket_path )
+    try:
+        client.status()
+        return client
+    except OSError:
+        client.close()
+    command = [ sys.executable, "-m", "emodpy_typhoid.utils.build_daemon", "--socket", socket_path ]
+    if schema_path:
+        command += [ "--schema", schema_path ]
+    for name, path in ( profiles or {} ).items():
+        command += [ "--profile", f"{name}={path}" ]
+    subprocess.Popen( command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, start_new_session=True )
+    start = time.time()
+    while time.time() - start < timeout:
+        try:
+            client.status()
+            return client
+        except OSError:
+            client.close()
+            time.sleep( 0.1 )
+    raise TimeoutError( f"The build daemon didn't start on {socket_path} within {timeout} seconds." )
+
+
+def main( argv=None ):
+    parser = argparse.ArgumentParser( description="Local build daemon for typhoid campaigns and demographics." )
+    parser.add_argument( "--socket", required=True, help="Unix socket to serve on." )
+    parser.add_argument( "--schema", help="Schema file campaigns are built against." )
+    parser.add_argument( "--profile", action="append", default=[], metavar="NAME=FILE",
+                         help="Parameter profile to keep loaded (repeatable)." )
+    parser.add_argument( "--max-demographics", type=int, default=32,
+                         help="Number of built demographics to keep (least recently used are dropped)." )
+    args = parser.parse_args( argv )
+    profiles = dict( profile.split( "=", 1 ) for profile in args.profile )
+    serve( args.socket, args.schema, profiles, max_demographics=args.max_demographics )
+
+
+if __name__ == "__main__":
+    main()
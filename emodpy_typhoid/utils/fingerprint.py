@@ -0,0 +1,182 @@
+"""
+Canonical hashing of a simulation's full input bundle (config, campaign, demographics files and model binary)
+and a local cache of simulation outputs keyed by that hash, so identical simulations aren't run twice.
+"""
+import hashlib
+import json
+import os
+import shutil
+
+# Bookkeeping keys emod_api's schema-backed objects carry around that are not part of the model input.
+_NON_INPUT_KEYS = { "schema", "implicits", "explicits" }
+
+
+def _strip( obj ):
+    if isinstance( obj, dict ):
+        return { key: _strip( value ) for key, value in obj.items() if key not in _NON_INPUT_KEYS }
+    if isinstance( obj, ( list, tuple ) ):
+        return [ _strip( item ) for item in obj ]
+    if isinstance( obj, float ) and obj.is_integer():
+        return int( obj )  # 1 and 1.0 are the same input to the model
+    return obj
+
+
+def canonical_json( obj ):
+    """
+    Serialize obj to a canonical JSON string: sorted keys, no whitespace, integral floats as ints and
+    emod_api bookkeeping keys dropped.
+    """
+    return json.dumps( _strip( obj ), sort_keys=True, separators=( ",", ":" ) )
+
+
+def hash_file( path, chunk_size=1 << 20 ):
+    """
+    Return the sha256 of a file. JSON files are hashed in canonical form so formatting differences
+    don't change the hash; other files (e.g., the Eradication binary) are hashed byte for byte.
+    """
+    digest = hashlib.sha256()
+    if path.endswith( ".json" ):
+        with open( path ) as json_file:
+            digest.update( canonical_json( json.load( json_file ) ).encode() )
+    else:
+        with open( path, "rb" ) as raw_file:
+            for chunk in iter( lambda: raw_file.read( chunk_size ), b"" ):
+                digest.update( chunk )
+    return digest.hexdigest()
+
+
+def _config_dict( config ):
+    if isinstance( config, str ):
+        with open( config ) as config_file:
+            config = json.load( config_file )
+    if hasattr( config, "parameters" ):
+        config = { "parameters": config.parameters }
+    return config
+
+
+def _campaign_dict( campaign ):
+    if isinstance( campaign, str ):
+        with open( campaign ) as campaign_file:
+            return json.load( campaign_file )
+    if hasattr( campaign, "campaign_dict" ):
+        return campaign.campaign_dict  # emod_api.campaign module
+    return campaign
+
+
+def bundle_fingerprint( config, campaign=None, demographics_files=(), binary=None ):
+    """
+    Compute a canonical hash of a simulation's complete input.
+
+    Args:
+        config: The config after set_param_fn, as an object with parameters, a dict, or a config.json path.
+            Run_Number is part of the config, so replicates get distinct fingerprints.
+        campaign: The campaign as a dict, the emod_api.campaign module, or a campaign.json path.
+        demographics_files: Paths of all demographics files, including overlays such as
+            TestDemographics_pak_updated.json. Order matters since later files overlay earlier ones.
+        binary: Path to the model binary, or any string identifying it (e.g., the contents of a .id file).
+
+    Returns:
+        Tuple of the hex fingerprint and a dict with the hash of each component.
+    """
+    components = {
+        "config": hashlib.sha256( canonical_json( _config_dict( config ) ).encode() ).hexdigest(),
+        "campaign": hashlib.sha256( canonical_json( _campaign_dict( campaign ) ).encode() ).hexdigest(),
+        "demographics": [ hash_file( path ) for path in demographics_files ]
+    }
+    if binary is not None:
+        components["binary"] = hash_file( binary ) if os.path.isfile( binary ) else binary
+    fingerprint = hashlib.sha256( canonical_json( components ).encode() ).hexdigest()
+    return fingerprint, components
+
+
+class ResultCache:
+    """
+    Local store of simulation output files keyed by bundle fingerprint, with per-experiment hit counts.
+
+    Args:
+        root: Directory holding the cache. Created if needed.
+    """
+    def __init__( self, root ):
+        self.root = root
+        self.stats = {}
+        os.makedirs( root, exist_ok=True )
+
+    def _dir( self, fingerprint ):
+        return os.path.join( self.root, fingerprint[:2], fingerprint )
+
+    def __contains__( self, fingerprint ):
+        return os.path.isfile( os.path.join( self._dir( fingerprint ), "meta.json" ) )
+
+    def _count( self, experiment, hit ):
+        counts = self.stats.setdefault( experiment, { "hits": 0, "misses": 0 } )
+        counts["hits" if hit else "misses"] += 1
+
+    def get( self, fingerprint, experiment=None ):
+        """
+        Return the directory holding the cached outputs for fingerprint, or None, and count the hit or miss
+        against experiment.
+        """
+        hit = fingerprint in self
+        self._count( experiment, hit )
+        return self._dir( fingerprint ) if hit else None
+
+    def put( self, fingerprint, output_files, components=None ):
+        """
+        Copy output files into the cache under fingerprint.
+
+        Args:
+            fingerprint: Fingerprint from bundle_fingerprint.
+            output_files: Paths of the simulation outputs, e.g., InsetChart.json.
+            components: Optional component hashes to record alongside, for debugging misses.
+
+        Returns:
+            The cache directory for fingerprint.
+        """
+        target = self._dir( fingerprint )
+        os.makedirs( target, exist_ok=True )
+        for path in output_files:
+            shutil.copy2( path, os.path.join( target, os.path.basename( path ) ) )
+        # meta.json goes last so a partially copied entry never counts as a hit
+        with open( os.path.join( target, "meta.json" ), "w" ) as meta_file:
+            json.dump( { "fingerprint": fingerprint, "components": components,
+                         "files": [ os.path.basename( path ) for path in output_files ] }, meta_file, indent=4 )
+        return target
+
+    def partition( self, fingerprints, experiment=None ):
+        """
+        Split simulations into those with cached outputs and those that still need to run.
+
+        Args:
+            fingerprints: Dict of simulation key (e.g., its tags) to fingerprint.
+            experiment: Name the hits and misses are counted under.
+
+        Returns:
+            Tuple of {key: cache directory} for hits and a list of keys to submit.
+        """
+        cached = {}
+        to_run = []
+        for key, fingerprint in fingerprints.items():
+            path = self.get( fingerprint, experiment )
+            if path is None:
+                to_run.append( key )
+            else:
+                cached[key] = path
+        return cached, to_run
+
+    def hit_rate( self, experiment=None ):
+        """
+        Return the fraction of lookups for experiment that were served from the cache.
+        """
+        counts = self.stats.get( experiment, { "hits": 0, "misses": 0 } )
+        total = counts["hits"] + counts["misses"]
+        return counts["hits"] / total if total else 0.0
+
+    def report( self ):
+        """
+        Return a plain-text table of hits, misses and hit rate per experiment.
+        """
+        lines = [ f"{'Experiment':<40} {'Hits':>6} {'Misses':>7} {'Hit rate':>9}" ]
+        for experiment, counts in self.stats.items():
+            lines.append( f"{str( experiment ):<40} {counts['hits']:>6} {counts['misses']:>7} "
+                          f"{self.hit_rate( experiment ):>9.1%}" )
+        return "\n".join( lines )
@@ -0,0 +1,30 @@
+import importlib
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is only imported the first time one of its attributes is used. Lets the
+    intervention modules keep their usual module-level names (s2c, common, ...) without paying for the
+    emod_api imports until a builder actually runs.
+
+    Args:
+        name: Fully qualified module name, e.g., "emod_api.interventions.common".
+    """
+    def __init__( self, name ):
+        object.__setattr__( self, "_name", name )
+        object.__setattr__( self, "_module", None )
+
+    def _load( self ):
+        if self._module is None:
+            object.__setattr__( self, "_module", importlib.import_module( self._name ) )
+        return self._module
+
+    def __getattr__( self, attr ):
+        return getattr( self._load(), attr )
+
+    def __setattr__( self, attr, value ):
+        setattr( self._load(), attr, value )
+
+    def __repr__( self ):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
@@ -0,0 +1,207 @@
+"""
+Timing instrumentation for experiment creation. Wrap builder callbacks (set_param_fn, build_camp, build_demog,
+sweep callbacks) with profiled() or phase(), call enable(), create the experiment, then look at summary() or
+export_chrome_trace() (open in chrome://tracing or Perfetto). Everything is a no-op while disabled.
+
+Example::
+
+    import emodpy_typhoid.utils.profiling as prof
+    prof.enable()
+    task = EMODTask.from_default2( ..., campaign_builder=prof.profiled( "build_camp" )( build_camp ),
+                                   param_custom_cb=prof.profiled( "set_param_fn" )( set_param_fn ) )
+    ...
+    print( prof.format_summary() )
+    prof.export_chrome_trace( "creation_trace.json" )
+"""
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+enabled = False
+trace_allocations = False
+records = []
+_lock = threading.Lock()
+_null = nullcontext()
+
+
+def enable( allocations=False ):
+    """
+    Start recording. With allocations=True, tracemalloc also records net bytes allocated per phase, which slows
+    Python down noticeably, so only use it when looking for memory.
+    """
+    global enabled, trace_allocations
+    enabled = True
+    trace_allocations = allocations
+    if allocations and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    global enabled, trace_allocations
+    enabled = False
+    if trace_allocations and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    trace_allocations = False
+
+
+def reset():
+    with _lock:
+        records.clear()
+
+
+@contextmanager
+def _phase( name, args ):
+    allocated = tracemalloc.get_traced_memory()[0] if trace_allocations else None
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        record = { "name": name, "start": start, "duration": duration, "pid": os.getpid(),
+                   "tid": threading.get_ident(), "args": args }
+        if allocated is not None:
+            record["allocated"] = tracemalloc.get_traced_memory()[0] - allocated
+        with _lock:
+            records.append( record )
+
+
+def phase( name, **args ):
+    """
+    Context manager timing the enclosed block as phase name. Keyword args (e.g., sim=...) are kept with the
+    record and show up in the trace.
+    """
+    if not enabled:
+        return _null
+    return _phase( name, args )
+
+
+def profiled( name=None ):
+    """
+    Decorator timing every call of the function as phase name (defaults to the function's name).
+    """
+    def decorator( fn ):
+        phase_name = name or fn.__name__
+
+        @functools.wraps( fn )
+        def wrapper( *args, **kwargs ):
+            if not enabled:
+                return fn( *args, **kwargs )
+            with _phase( phase_name, {} ):
+                return fn( *args, **kwargs )
+        return wrapper
+    return decorator
+
+
+_active = threading.local()
+
+
+def _profiled_outermost( name ):
+    # like profiled, but a call made while the phase is already running on this thread isn't recorded again
+    # (schema_snapshot falls back to emod_api's lookup, and both are wrapped)
+    def decorator( fn ):
+        @functools.wraps( fn )
+        def wrapper( *args, **kwargs ):
+            running = getattr( _active, "phases", None )
+            if running is None:
+                running = _active.phases = set()
+            if not enabled or name in running:
+                return fn( *args, **kwargs )
+            running.add( name )
+            try:
+                with _phase( name, {} ):
+                    return fn( *args, **kwargs )
+            finally:
+                running.discard( name )
+        return wrapper
+    return decorator
+
+
+def profile_emod_api():
+    """
+    Time schema lookups (get_class_with_defaults, in emod_api.schema_to_class and in
+    emodpy_typhoid.utils.schema_snapshot, which the builders use), schema loading (campaign.set_schema) and
+    serialization (campaign.save) by wrapping them. Returns a function that undoes the wrapping.
+    """
+    import emod_api.campaign as campaign
+    import emod_api.schema_to_class as s2c
+    import emodpy_typhoid.utils.schema_snapshot as schema_snapshot
+
+    targets = [ ( s2c, "get_class_with_defaults", "schema_lookup" ),
+                ( schema_snapshot, "get_class_with_defaults", "schema_lookup" ),
+                ( campaign, "set_schema", "set_schema" ),
+                ( campaign, "save", "serialization" ) ]
+    originals = [ ( module, attr, getattr( module, attr ) ) for module, attr, _ in targets ]
+    for module, attr, phase_name in targets:
+        setattr( module, attr, _profiled_outermost( phase_name )( getattr( module, attr ) ) )
+
+    def undo():
+        for module, attr, original in originals:
+            setattr( module, attr, original )
+    return undo
+
+
+def summary():
+    """
+    Return {phase name: {"calls", "total", "mean", "max", "allocated"}} with times in seconds and allocated in
+    bytes (None unless allocations were traced). Nested phases are counted in their parents' totals too.
+    """
+    result = {}
+    with _lock:
+        snapshot = list( records )
+    for record in snapshot:
+        stats = result.setdefault( record["name"], { "calls": 0, "total": 0.0, "max": 0.0, "allocated": None } )
+        stats["calls"] += 1
+        stats["total"] += record["duration"]
+        stats["max"] = max( stats["max"], record["duration"] )
+        if "allocated" in record:
+            stats["allocated"] = ( stats["allocated"] or 0 ) + record["allocated"]
+    for stats in result.values():
+        stats["mean"] = stats["total"] / stats["calls"]
+    return result
+
+
+def format_summary():
+    """
+    Return summary() as a plain-text table sorted by total time.
+    """
+    lines = [ f"{'Phase':<30} {'Calls':>7} {'Total (s)':>10} {'Mean (ms)':>10} {'Max (ms)':>10} {'Alloc (KB)':>11}" ]
+    for name, stats in sorted( summary().items(), key=lambda item: -item[1]["total"] ):
+        alloc = "" if stats["allocated"] is None else f"{stats['allocated'] / 1024:.1f}"
+        lines.append( f"{name:<30} {stats['calls']:>7} {stats['total']:>10.3f} {stats['mean'] * 1e3:>10.2f} "
+                      f"{stats['max'] * 1e3:>10.2f} {alloc:>11}" )
+    return "\n".join( lines )
+
+
+def export_chrome_trace( filename ):
+    """
+    Write the recorded phases in Chrome trace event format and return the filename.
+    """
+    with _lock:
+        snapshot = list( records )
+    origin = min( ( record["start"] for record in snapshot ), default=0 )
+    events = []
+    for record in snapshot:
+        args = dict( record["args"] )
+        if "allocated" in record:
+            args["allocated"] = record["allocated"]
+        events.append( { "name": record["name"], "ph": "X", "ts": ( record["start"] - origin ) * 1e6,
+                         "dur": record["duration"] * 1e6, "pid": record["pid"], "tid": record["tid"],
+                         "args": { key: str( value ) for key, value in args.items() } } )
+    with open( filename, "w" ) as trace_file:
+        json.dump( { "traceEvents": events, "displayTimeUnit": "ms" }, trace_file )
+    return filename
+
+
+def export_json( filename ):
+    """
+    Write the summary and raw records as JSON and return the filename.
+    """
+    with _lock:
+        snapshot = list( records )
+    with open( filename, "w" ) as json_file:
+        json.dump( { "summary": summary(), "records": snapshot }, json_file, indent=4, default=str )
+    return filename
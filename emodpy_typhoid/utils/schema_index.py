@@ -0,0 +1,176 @@
+"""
+Which config parameters, campaign classes and class fields exist in which schema. Different model binaries
+take different parameters (Typhoid_Carrier_Removal_Year and Environmental_Cutoff_Days aren't in every schema),
+and a config or campaign built for one binary fails on another only once the simulation starts. A
+ParameterIndex is built once from the schemas of the binaries you use and saved as a small JSON file. Each name
+maps to a bitmask of the schema versions that have it, so every query is a dict lookup. Use it to drop what a
+binary doesn't take (adapt_config) or to fail before submission (check_config, check_campaign).
+
+Example::
+
+    index = ParameterIndex.build( { "2018": "schema_2018.json", "current": manifest.schema_file } )
+    index.save( "schema_index.json" )
+    ...
+    index = ParameterIndex.load( "schema_index.json" )
+
+    def set_param_fn( config ):
+        ...
+        index.adapt_config( config, "2018" )
+        return config
+
+    index.check_campaign( camp, "2018" )
+"""
+import json
+
+from emodpy_typhoid.utils.schema_snapshot import class_blobs
+
+_META_KEYS = { "schema", "explicits", "implicits" }
+# keys EMOD takes on any campaign object without them being schema fields
+_GENERIC_KEYS = { "class", "Sim_Types", "Event_Name", "Note", "Notes", "Comment", "Description" }
+
+
+def _config_params( config_schema ):
+    for name, spec in config_schema.items():
+        if isinstance( spec, dict ) and ( "type" in spec or "default" in spec ):
+            yield name
+        elif isinstance( spec, dict ):
+            yield from _config_params( spec )  # a group of parameters
+
+
+def _parameters( config ):
+    if hasattr( config, "parameters" ):
+        config = config.parameters
+    return config
+
+
+class ParameterIndex:
+    """
+    Availability of config parameters, classes and class fields across schema versions. Build one with build()
+    or load() a saved one.
+    """
+    def __init__( self, versions=(), params=None, classes=None, fields=None ):
+        self.versions = list( versions )
+        self._bits = { version: 1 << idx for idx, version in enumerate( self.versions ) }
+        self.params = dict( params or {} )
+        self.classes = dict( classes or {} )
+        self.fields = dict( fields or {} )  # "Class.Field" -> mask
+
+    @classmethod
+    def build( cls, schemas ):
+        """
+        Index {version label: schema path or dict}.
+        """
+        index = cls()
+        for version, schema in schemas.items():
+            index.add_schema( version, schema )
+        return index
+
+    def add_schema( self, version, schema ):
+        """Add one schema version (a path or the loaded schema)."""
+        if version in self._bits:
+            raise ValueError( f"Schema version '{version}' is already indexed." )
+        if isinstance( schema, str ):
+            with open( schema ) as schema_file:
+                schema = json.load( schema_file )
+        bit = 1 << len( self.versions )
+        self.versions.append( version )
+        self._bits[version] = bit
+        for name in _config_params( schema.get( "config", {} ) ):
+            self.params[name] = self.params.get( name, 0 ) | bit
+        for classname, blob in class_blobs( schema.get( "idmTypes", {} ) ):
+            self.classes[classname] = self.classes.get( classname, 0 ) | bit
+            for field in blob:
+                if field not in ( "class", "Sim_Types" ):
+                    key = f"{classname}.{field}"
+                    self.fields[key] = self.fields.get( key, 0 ) | bit
+
+    def save( self, path ):
+        with open( path, "w" ) as index_file:
+            json.dump( { "versions": self.versions, "params": self.params, "classes": self.classes,
+                         "fields": self.fields }, index_file, sort_keys=True )
+        return path
+
+    @classmethod
+    def load( cls, path ):
+        with open( path ) as index_file:
+            return cls( **json.load( index_file ) )
+
+    def _bit( self, version ):
+        if version not in self._bits:
+            raise ValueError( f"Unknown schema version '{version}'. Indexed versions: {self.versions}." )
+        return self._bits[version]
+
+    def _versions( self, mask ):
+        return [ version for version, bit in self._bits.items() if mask & bit ]
+
+    def has_param( self, name, version ):
+        return bool( self.params.get( name, 0 ) & self._bit( version ) )
+
+    def has_class( self, classname, version ):
+        return bool( self.classes.get( classname, 0 ) & self._bit( version ) )
+
+    def has_field( self, classname, field, version ):
+        return bool( self.fields.get( f"{classname}.{field}", 0 ) & self._bit( version ) )
+
+    def versions_with( self, name ):
+        """Return the versions that have a config parameter, class, or "Class.Field"."""
+        return self._versions( self.params.get( name, 0 ) | self.classes.get( name, 0 ) | self.fields.get( name, 0 ) )
+
+    def missing_params( self, config, version ):
+        """Return the parameters of config (a config, its parameters, or a list of names) version doesn't have."""
+        bit = self._bit( version )
+        return [ name for name in _parameters( config )
+                 if name not in _META_KEYS and not self.params.get( name, 0 ) & bit ]
+
+    def check_config( self, config, version ):
+        """Raise ValueError if config sets parameters the version doesn't have."""
+        missing = self.missing_params( config, version )
+        if missing:
+            details = ", ".join( f"{name} (in {self.versions_with( name ) or 'no indexed schema'})" for name in missing )
+            raise ValueError( f"Schema '{version}' has no parameter(s) {details}." )
+
+    def adapt_config( self, config, version, keep=() ):
+        """
+        Remove the parameters version doesn't have from config (a config or its parameters dict), except those
+        in keep. Returns the removed names.
+        """
+        parameters = _parameters( config )
+        removed = [ name for name in self.missing_params( parameters, version ) if name not in keep ]
+        for name in removed:
+            parameters.pop( name )
+        return removed
+
+    def campaign_problems( self, campaign, version ):
+        """
+        Return a list of (path, problem) for every class or field in campaign (an emod_api.campaign-like
+        module, a campaign dict, or a list of events) that version doesn't have.
+        """
+        bit = self._bit( version )
+        if hasattr( campaign, "campaign_dict" ):
+            campaign = campaign.campaign_dict
+        problems = []
+
+        def walk( node, path ):
+            if isinstance( node, list ):
+                for idx, item in enumerate( node ):
+                    walk( item, f"{path}[{idx}]" )
+            elif isinstance( node, dict ):
+                classname = node.get( "class" )
+                if classname is not None and not self.classes.get( classname, 0 ) & bit:
+                    problems.append( ( path, f"class {classname} isn't in schema '{version}'" ) )
+                    classname = None
+                for key, value in node.items():
+                    if classname is not None and key not in _GENERIC_KEYS and key not in _META_KEYS \
+                            and not self.fields.get( f"{classname}.{key}", 0 ) & bit:
+                        problems.append( ( f"{path}.{key}", f"{classname} has no {key} in schema '{version}'" ) )
+                    walk( value, f"{path}.{key}" )
+
+        walk( campaign, "campaign" )
+        return problems
+
+    def check_campaign( self, campaign, version ):
+        """Raise ValueError listing every class or field in campaign that version doesn't have."""
+        problems = self.campaign_problems( campaign, version )
+        if problems:
+            raise ValueError( "Campaign doesn't fit schema '{}':\n{}".format(
+                version, "\n".join( f"  {path}: {problem}" for path, problem in problems ) ) )
@@ -0,0 +1,227 @@
+"""
+Indexed snapshot of a schema. The builders look classes up by name with get_class_with_defaults, which parses
+the multi-megabyte schema.json (again, whenever the schema path changes) and walks it for every lookup. The
+snapshot is compiled once per schema and stored next to it as <schema>.snapshot: a small JSON header indexing
+every class name to the offset of its defaults, followed by the defaults as JSON. Loading it reads the header
+only; each class is decoded from a memory map when it's used. The snapshot is rebuilt when the schema's sha256
+changes (the hash is only recomputed when the file's size or mtime does).
+
+The file is data only (no pickle), so a snapshot written by someone else into a shared schema directory can at
+worst give wrong defaults, like an edited schema would, and never runs code.
+
+get_class_with_defaults here is a drop-in for emod_api.schema_to_class.get_class_with_defaults and is what the
+builders in emodpy_typhoid.interventions use.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict
+
+FORMAT = 3  # bumped when what a snapshot holds changes, so older files are rebuilt
+_HEADER = struct.Struct( "<Q" )
+# idmTypes groups holding classes by name, besides idmAbstractType:Intervention (grouped by intervention type)
+ABSTRACT_GROUPS = ( "idmAbstractType:CampaignEvent", "idmAbstractType:EventCoordinator",
+                    "idmAbstractType:IndividualIntervention", "idmAbstractType:NodeIntervention",
+                    "idmAbstractType:IReport", "idmType:IReport", "idmAbstractType:NodeSet",
+                    "idmAbstractType:WaningEffect", "idmType:WaningEffect", "idmAbstractType:AdditionalRestrictions",
+                    "idmType:AdditionalRestrictions" )
+
+_loaded = {}  # schema path -> Snapshot
+_lock = threading.Lock()
+
+
+def snapshot_path( schema_path ):
+    return schema_path + ".snapshot"
+
+
+def _sha256( path ):
+    digest = hashlib.sha256()
+    with open( path, "rb" ) as raw_file:
+        for chunk in iter( lambda: raw_file.read( 1 << 20 ), b"" ):
+            digest.update( chunk )
+    return digest.hexdigest()
+
+
+def _encode( value ):
+    # JSON keeps no types beyond dict and list, so every dict is stored with its type and items
+    if isinstance( value, dict ):
+        kind = { dict: "D", OrderedDict: "O" }.get( type( value ) )
+        if kind is None:
+            if type( value ).__name__ != "ReadOnlyDict":
+                raise TypeError( type( value ) )
+            kind = "R"
+        if not all( isinstance( key, str ) for key in value ):
+            raise TypeError( "non-string key" )
+        return { "t": kind, "i": [ [ key, _encode( item ) ] for key, item in value.items() ] }
+    if isinstance( value, list ):
+        return [ _encode( item ) for item in value ]
+    if value is None or type( value ) in ( str, int, float, bool ):
+        return value
+    raise TypeError( type( value ) )
+
+
+def _decode( value, read_only_dict ):
+    if isinstance( value, dict ):
+        kind = { "D": dict, "O": OrderedDict, "R": read_only_dict }[ value["t"] ]
+        return kind( ( key, _decode( item, read_only_dict ) ) for key, item in value["i"] )
+    if isinstance( value, list ):
+        return [ _decode( item, read_only_dict ) for item in value ]
+    return value
+
+
+def class_blobs( idm_types ):
+    """
+    Yield ( name, blob ) for every class in a schema's idmTypes: interventions (under idmAbstractType:Intervention,
+    or in the newer layout idmAbstractType:IndividualIntervention and idmAbstractType:NodeIntervention), the
+    other abstract groups (events, coordinators, node sets, waning effects, ...) and idmType: structures.
+    """
+    for group, blobs in idm_types.items():
+        if not isinstance( blobs, dict ):
+            continue
+        if group == "idmAbstractType:Intervention":
+            for iv_type in blobs.values():
+                yield from iv_type.items()
+        elif group in ABSTRACT_GROUPS:
+            yield from ( ( name, blob ) for name, blob in blobs.items() if isinstance( blob, dict ) )
+        elif group.startswith( "idmType:" ):
+            yield group, blobs  # a structure such as idmType:AgeAndProbability
+
+
+def class_names( schema ):
+    """Return the names of every class get_class_with_defaults can build from a schema dict."""
+    return list( dict.fromkeys( name for name, _ in class_blobs( schema.get( "idmTypes", {} ) ) ) )
+
+
+def compile_snapshot( schema_path, path=None ):
+    """
+    Build the defaults of every class in the schema and write the snapshot to path (by default next to the
+    schema). Returns the snapshot's bytes, which are still usable if the file couldn't be written (e.g., a
+    read-only directory).
+    """
+    import emod_api.schema_to_class as s2c
+    stat = os.stat( schema_path )
+    with open( schema_path, "rb" ) as schema_file:
+        raw = schema_file.read()
+    if hasattr( s2c, "clear_schema_cache" ):
+        s2c.clear_schema_cache()  # emod_api caches by path, which may now hold an edited schema
+    blobs = []
+    index = {}
+    offset = 0
+    for name in class_names( json.loads( raw ) ):
+        try:
+            defaults = s2c.get_class_with_defaults( name, schema_path )
+        except Exception:
+            continue  # emod_api can't build it either; a lookup will raise its error
+        try:
+            blob = json.dumps( _encode( defaults ), separators=( ",", ":" ) ).encode()
+        except TypeError:
+            continue  # holds something JSON can't keep; looked up in emod_api instead
+        index[name] = ( offset, len( blob ) )
+        blobs.append( blob )
+        offset += len( blob )
+    header = json.dumps( { "format": FORMAT, "sha256": hashlib.sha256( raw ).hexdigest(),
+                           "stat": [ stat.st_size, stat.st_mtime_ns ], "index": index } ).encode()
+    data = b"".join( [ _HEADER.pack( len( header ) ), header ] + blobs )
+    path = path or snapshot_path( schema_path )
+    tmp_path = f"{path}.{os.getpid()}.tmp"  # workers may compile the same schema at once
+    try:
+        with open( tmp_path, "wb" ) as snap_file:
+            snap_file.write( data )
+        os.replace( tmp_path, path )
+    except OSError:
+        pass
+    return data
+
+
+class Snapshot:
+    """
+    A loaded snapshot, read from a file (memory mapped) or from compiled bytes. Use load() rather than
+    constructing one.
+    """
+    def __init__( self, path=None, data=None ):
+        self.path = path
+        if data is None:
+            with open( path, "rb" ) as snap_file:
+                data = mmap.mmap( snap_file.fileno(), 0, access=mmap.ACCESS_READ )
+        self._data = data
+        size, = _HEADER.unpack( data[:_HEADER.size] )
+        self._start = _HEADER.size + size
+        header = json.loads( data[_HEADER.size:self._start] )
+        if not isinstance( header, dict ) or header.get( "format" ) != FORMAT:
+            raise ValueError( f"{path} is snapshot format {header.get( 'format' )}, expected {FORMAT}." )
+        self.sha256 = header["sha256"]
+        self.stat = tuple( header["stat"] )
+        self.index = { name: tuple( entry ) for name, entry in header["index"].items() }
+
+    def __contains__( self, classname ):
+        return classname in self.index
+
+    def get( self, classname ):
+        """Return a fresh copy of classname's defaults, as emod_api would build them."""
+        from emod_api.schema_to_class import ReadOnlyDict
+        offset, length = self.index[classname]
+        start = self._start + offset
+        return _decode( json.loads( self._data[start:start + length] ), ReadOnlyDict )
+
+    def close( self ):
+        if isinstance( self._data, mmap.mmap ):
+            self._data.close()
+
+
+def _current( schema_path, snapshot ):
+    stat = os.stat( schema_path )
+    if ( stat.st_size, stat.st_mtime_ns ) == snapshot.stat:
+        return True
+    if _sha256( schema_path ) == snapshot.sha256:
+        snapshot.stat = ( stat.st_size, stat.st_mtime_ns )
+        return True
+    return False
+
+
+def load( schema_path ):
+    """
+    Return the Snapshot for schema_path, compiling it first if it is missing or out of date.
+    """
+    with _lock:
+        snapshot = _loaded.get( schema_path )
+        if snapshot is not None and _current( schema_path, snapshot ):
+            return snapshot
+        path = snapshot_path( schema_path )
+        snapshot = None
+        if os.path.isfile( path ):
+            try:
+                snapshot = Snapshot( path )
+            except Exception:
+                snapshot = None  # truncated or from another format; rebuild it
+            if snapshot is not None and not _current( schema_path, snapshot ):
+                snapshot.close()
+                snapshot = None
+        if snapshot is None:
+            snapshot = Snapshot( data=compile_snapshot( schema_path, path ) )
+        _loaded[schema_path] = snapshot
+        return snapshot
+
+
+def get_class_with_defaults( classname, schema_path=None, *args, **kwargs ):
+    """
+    Return the default parameter values for a class defined in the schema, from the schema's snapshot. Same
+    arguments and result as emod_api.schema_to_class.get_class_with_defaults, which is used for anything the
+    snapshot doesn't cover.
+    """
+    if schema_path is not None and not args and not kwargs and os.path.isfile( schema_path ):
+        snapshot = load( schema_path )
+        if classname in snapshot:
+            return snapshot.get( classname )
+    import emod_api.schema_to_class as s2c
+    return s2c.get_class_with_defaults( classname, schema_path, *args, **kwargs )
+
+
+def clear():
+    """Forget the loaded snapshots (the files stay)."""
+    with _lock:
+        for snapshot in _loaded.values():
+            snapshot.close()
+        _loaded.clear()
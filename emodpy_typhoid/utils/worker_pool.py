@@ -0,0 +1,181 @@
+"""
+Warm worker pool for building campaigns (and configs) outside the main process. Workers are started from a fork
+server that has already imported emodpy_typhoid and emod_api, and each worker loads the schema snapshot (see
+emodpy_typhoid.utils.schema_snapshot) once when it starts, so a task only pays for the build itself. Sweep callbacks hand their work to the pool up front and pick
+the results up as idmtools creates the simulations.
+
+Example::
+
+    pool = WarmBuilderPool( manifest.schema_file )
+    efficacies = np.linspace( 0, 1, 10000 )
+    builder = SimulationBuilder()
+    builder.add_sweep_definition( pool.sweep_callback( build_camp, "vax_eff", efficacies ), efficacies )
+    experiment = Experiment.from_builder( builder, task )
+    ...
+    pool.shutdown()
+
+build_camp( camp, vax_eff ) must be a module-level function adding events to camp (a CampaignContext).
+"""
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from emodpy_typhoid.campaign.context import CampaignContext
+from emodpy_typhoid.utils import schema_snapshot
+
+PRELOAD = ( "emodpy_typhoid.interventions.typhoid_vaccine", "emodpy_typhoid.interventions.typhoid_wash",
+            "emodpy_typhoid.interventions.tcc", "emodpy_typhoid.interventions.tcd",
+            "emodpy_typhoid.interventions.outbreak", "emodpy_typhoid.campaign.context" )
+
+# Per-worker state, filled in by _warm when the worker starts.
+worker = { "pid": None, "schema_path": None, "schema_sha256": None, "schema_loads": 0, "tasks": 0 }
+
+
+def _warm( schema_path, modules ):
+    import importlib
+    for module in modules:
+        importlib.import_module( module )
+    snapshot = schema_snapshot.load( schema_path )
+    worker.update( pid=os.getpid(), schema_path=schema_path, schema_sha256=snapshot.sha256,
+                   schema_loads=worker["schema_loads"] + 1 )
+
+
+def _build_context( build_fn, kwargs ):
+    # the events and the registered triggers, so Custom_Individual_Events can be set from them
+    worker["tasks"] += 1
+    camp = CampaignContext( worker["schema_path"] )
+    build_fn( camp, **kwargs )
+    return json.loads( json.dumps( { "campaign": camp.to_dict(), "triggers": camp.triggers() } ) )
+
+
+def _build_campaign( build_fn, kwargs ):
+    return _build_context( build_fn, kwargs )["campaign"]
+
+
+def _build_config( param_fn, parameters, kwargs ):
+    worker["tasks"] += 1
+    config = _Config( parameters )
+    config = param_fn( config, **kwargs ) or config
+    return { "parameters": dict( config.parameters ) }
+
+
+def _call( fn, args, kwargs ):
+    worker["tasks"] += 1
+    return fn( *args, **kwargs )
+
+
+class _Parameters( dict ):
+    __getattr__ = dict.__getitem__
+    __setattr__ = dict.__setitem__
+
+
+class _Config:
+    def __init__( self, parameters ):
+        self.parameters = _Parameters( parameters )
+
+
+def _key( value ):
+    try:
+        return json.dumps( value, sort_keys=True )
+    except TypeError:
+        return repr( value )
+
+
+def campaign_context( campaign, schema_path=None, triggers=None ):
+    """
+    Return a CampaignContext holding the events of a built campaign dict and the triggers registered while
+    building it, to hand to task.create_campaign_from_callback.
+    """
+    return CampaignContext.from_dict( campaign, schema_path, triggers )
+
+
+class WarmBuilderPool:
+    """
+    Process pool whose workers have the schema and builders loaded.
+
+    Args:
+        schema_path: Schema file every worker loads once.
+        processes: Number of workers. None uses all cores.
+        preload: Modules imported by the fork server (and so already in every worker).
+    """
+    def __init__( self, schema_path, processes=None, preload=PRELOAD ):
+        self.schema_path = schema_path
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context( "forkserver" if "forkserver" in methods else "spawn" )
+        if "forkserver" in methods:
+            context.set_forkserver_preload( list( preload ) )
+        self._executor = ProcessPoolExecutor( max_workers=processes, mp_context=context, initializer=_warm,
+                                              initargs=( schema_path, tuple( preload ) ) )
+        self._prebuilt = {}
+
+    def submit( self, fn, *args, **kwargs ):
+        """Run fn( *args, **kwargs ) in a worker and return the Future."""
+        return self._executor.submit( _call, fn, args, kwargs )
+
+    def submit_campaign( self, build_fn, **kwargs ):
+        """
+        Build build_fn( camp, **kwargs ) into a fresh CampaignContext in a worker. The Future's result is the
+        campaign dict.
+        """
+        return self._executor.submit( _build_campaign, build_fn, kwargs )
+
+    def submit_context( self, build_fn, **kwargs ):
+        """
+        Like submit_campaign, but the Future's result is {"campaign": campaign dict, "triggers": the registered
+        triggers}, which campaign_context turns back into a CampaignContext.
+        """
+        return self._executor.submit( _build_context, build_fn, kwargs )
+
+    def build_campaigns( self, build_fn, scenarios ):
+        """Return the campaign dict of each scenario (a dict of build_fn keyword arguments), in order."""
+        futures = [ self.submit_campaign( build_fn, **kwargs ) for kwargs in scenarios ]
+        return [ future.result() for future in futures ]
+
+    def build_configs( self, param_fn, config, scenarios ):
+        """
+        Apply param_fn( config, **kwargs ) to a copy of config for each scenario in the workers and return the
+        {"parameters": ...} dicts, in order. config is a config dict or file with a "parameters" section;
+        param_fn sets config.parameters.<Name> like a set_param_fn.
+        """
+        if isinstance( config, str ):
+            with open( config ) as config_file:
+                config = json.load( config_file )
+        parameters = dict( config["parameters"] )
+        futures = [ self._executor.submit( _build_config, param_fn, parameters, kwargs ) for kwargs in scenarios ]
+        return [ future.result() for future in futures ]
+
+    def sweep_callback( self, build_fn, param, values=None ):
+        """
+        Return a sweep callback( simulation, value ) setting the simulation's campaign to build_fn( camp,
+        **{param: value} ). With values, every campaign is submitted now, so workers build them while idmtools
+        creates the simulations; other values are built when their simulation is created. Each value is built
+        once, however many simulations use it.
+        """
+        prebuilt = self._prebuilt.setdefault( ( build_fn, param ), {} )
+
+        def future( value ):
+            key = _key( value )
+            if key not in prebuilt:
+                prebuilt[key] = self.submit_context( build_fn, **{ param: value } )
+            return prebuilt[key]
+
+        for value in values or []:
+            future( value )
+
+        def callback( simulation, value ):
+            built = future( value ).result()
+            # a fresh context per simulation, since emodpy resets the campaign once it has read it
+            camp = campaign_context( built["campaign"], self.schema_path, built["triggers"] )
+            simulation.task.create_campaign_from_callback( lambda: camp )
+            return { param: value }
+        return callback
+
+    def shutdown( self, wait=True ):
+        self._executor.shutdown( wait=wait )
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, *exc ):
+        self.shutdown()
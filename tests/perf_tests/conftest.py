@@ -0,0 +1,19 @@
+import glob
+import os
+
+# Allowed slowdown of a benchmark's mean against the latest saved run before the test run fails.
+REGRESSION_THRESHOLD = "mean:25%"
+
+
+def pytest_configure(config):
+    # Compare against the latest saved baseline automatically, once one exists (see test_benchmarks.py).
+    try:
+        from pytest_benchmark.utils import parse_compare_fail
+    except ImportError:
+        return
+    storage = os.path.join(os.path.dirname(os.path.realpath(__file__)), ".benchmarks")
+    if config.getoption("benchmark_compare") or not glob.glob(os.path.join(storage, "**", "*.json"), recursive=True):
+        return
+    config.option.benchmark_compare = True
+    if not config.getoption("benchmark_compare_fail"):
+        config.option.benchmark_compare_fail = [parse_compare_fail(REGRESSION_THRESHOLD)]
@@ -0,0 +1,167 @@
+"""
+Performance tests for campaign, config and demographics generation, using pytest-benchmark and the small
+schema in data/schema.json so they run offline.
+
+Baselines live in .benchmarks next to this file (see pytest.ini). To record a new baseline after an intended
+change:
+
+    py.test --benchmark-save=baseline
+
+Every other run compares against the latest saved run and fails if a mean regresses by more than 25%. CI
+restores the baseline from the cache of the last passing run on main, saves every run
+(--benchmark-autosave) and always compares (--benchmark-compare-fail=mean:25%).
+"""
+import os
+import tracemalloc
+
+import numpy
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+import emodpy_typhoid.interventions.typhoid_vaccine as ty
+import emodpy_typhoid.interventions.tcd as tcd
+import emodpy_typhoid.interventions.tcc as tcc
+import emodpy_typhoid.interventions.compact as compact
+import emodpy_typhoid.demographics.TyphoidDemographics as TyphoidDemographics
+from emodpy_typhoid.campaign.compactor import compact_campaign
+from emodpy_typhoid.campaign.context import build_campaigns
+from emodpy_typhoid.campaign.timeline import CampaignTimeline
+
+SCHEMA = os.path.join(os.path.dirname(os.path.realpath(__file__)), "data", "schema.json")
+
+
+@pytest.fixture
+def camp():
+    import emod_api.campaign as camp
+    camp.set_schema(SCHEMA)
+    yield camp
+    camp.campaign_dict["Events"].clear()
+
+
+def outbreak_event(start_day):
+    return {"class": "CampaignEvent", "Start_Day": start_day, "Nodeset_Config": {"class": "NodeSetAll"},
+            "Event_Coordinator_Config": {"class": "StandardInterventionDistributionEventCoordinator",
+                                         "Number_Repetitions": 1, "Timesteps_Between_Repetitions": -1,
+                                         "Demographic_Coverage": 1.0,
+                                         "Intervention_Config": {"class": "Outbreak", "Number_Cases_Per_Node": 1}}}
+
+
+# Campaign events
+
+def test_typhoid_vaccine_scheduled(benchmark, camp):
+    event = benchmark(ty.new_scheduled_intervention, camp, start_day=10, coverage=0.7)
+    assert event["Start_Day"] == 10
+
+
+def test_typhoid_vaccine_triggered(benchmark, camp):
+    benchmark(ty.new_triggered_intervention, camp, start_day=10)
+
+
+def test_tcc_triggered(benchmark, camp):
+    benchmark(tcc.new_triggered_intervention, camp, rate=0.5, start_day=10)
+
+
+def test_tcd_triggered(benchmark, camp):
+    benchmark(tcd.new_triggered_intervention, camp, start_day=10)
+
+
+def test_routine_immunization_at_scale(benchmark, camp):
+    def build():
+        return [ty.new_routine_immunization(camp, start_day=day, child_age=270) for day in range(1000)]
+    events = benchmark.pedantic(build, rounds=3, iterations=1)
+    assert len(events) == 1000
+
+
+def test_campaign_serialization(benchmark, camp, tmp_path):
+    for day in range(1000):
+        camp.add(ty.new_scheduled_intervention(camp, start_day=day + 1))
+    benchmark(camp.save, str(tmp_path / "campaign.json"))
+
+
+def build_scenario(camp, coverage):
+    for day in range(200):
+        camp.add(ty.new_scheduled_intervention(camp, start_day=day + 1, coverage=coverage))
+
+
+# ids independent of the machine, so runs on different hardware compare against each other
+@pytest.mark.parametrize("processes", [1, os.cpu_count()], ids=["serial", "all_cores"])
+def test_build_scenarios_parallel(benchmark, processes):
+    scenarios = [{"coverage": coverage} for coverage in numpy.linspace(0, 1, 64)]
+    campaigns = benchmark.pedantic(build_campaigns, args=(build_scenario, scenarios, SCHEMA),
+                                   kwargs={"processes": processes}, rounds=1, iterations=1)
+    assert [campaign["Events"][0]["Event_Coordinator_Config"]["Demographic_Coverage"] for campaign in campaigns] \
+        == [scenario["coverage"] for scenario in scenarios]
+
+
+def test_compact_events_memory(benchmark, camp):
+    def traced(build):
+        tracemalloc.start()
+        events = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return events, size
+
+    def build_compact():
+        return [compact.ScheduledEvent(day + 1, [compact.TyphoidVaccine()], coverage=0.7) for day in range(10000)]
+    _, dict_bytes = traced(lambda: [ty.new_scheduled_intervention(camp, start_day=day + 1, coverage=0.7)
+                                    for day in range(10000)])
+    _, compact_bytes = traced(build_compact)
+    benchmark.extra_info.update(dict_bytes=dict_bytes, compact_bytes=compact_bytes)
+    events = benchmark(build_compact)
+    assert len(events) == 10000
+    assert compact_bytes < dict_bytes / 2
+
+
+def test_compact_campaign(benchmark):
+    events = [outbreak_event(1 + day) for day in range(10000)]
+    compacted, _ = benchmark(compact_campaign, events)
+    assert len(compacted["Events"]) == 1
+
+
+def test_campaign_timeline(benchmark):
+    events = [outbreak_event(1 + day) for day in range(10000)]
+    timeline = benchmark(CampaignTimeline, events)
+    assert len(timeline.active_between(100, 200)) == 101
+
+
+# Demographics
+
+@pytest.mark.parametrize("num_nodes", [10, 1000, 100000])
+def test_from_params(benchmark, num_nodes):
+    numpy.random.seed(0)
+    demog = benchmark.pedantic(TyphoidDemographics.from_params, kwargs={"tot_pop": 1e7, "num_nodes": num_nodes},
+                               rounds=1 if num_nodes > 1000 else 5, iterations=1)
+    assert len(demog.nodes) == num_nodes
+
+
+def test_from_csv_large(benchmark, tmp_path):
+    rng = numpy.random.default_rng(0)
+    n = 50000
+    csv_path = tmp_path / "nodes.csv"
+    with open(csv_path, "w") as csv_file:
+        csv_file.write("loc,lat,lon,pop,node_id\n")
+        for idx, (lat, lon, pop) in enumerate(zip(rng.uniform(-60, 60, n), rng.uniform(-180, 180, n),
+                                                  rng.integers(100, 100000, n))):
+            csv_file.write(f"{idx},{lat:.4f},{lon:.4f},{pop},{idx + 1}\n")
+    demog = benchmark.pedantic(TyphoidDemographics.from_csv, args=(str(csv_path),), rounds=3, iterations=1)
+    assert len(demog.nodes) == n
+
+
+def test_hint_matrix(benchmark):
+    values = [f"G{idx}" for idx in range(30)]
+    matrix = numpy.eye(len(values)).tolist()
+
+    def build():
+        demog = TyphoidDemographics.from_template_node(pop=10000)
+        demog.AddIndividualPropertyAndHINT(Property="Region", Values=values,
+                                           InitialDistribution=[1 / len(values)] * len(values),
+                                           TransmissionMatrix=matrix, EnviroTransmissionMatrix=matrix)
+        return demog
+    benchmark(build)
+
+
+def test_demographics_serialization(benchmark, tmp_path):
+    numpy.random.seed(0)
+    demog = TyphoidDemographics.from_params(tot_pop=1e7, num_nodes=1000)
+    benchmark(demog.generate_file, str(tmp_path / "demographics.json"))
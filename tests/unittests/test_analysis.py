@@ -0,0 +1,275 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import emodpy_typhoid.analysis.hint_validation as hv
+from emodpy_typhoid.analysis.analyzer import Analyzer, ExperimentAnalysis, FunctionAnalyzer
+from emodpy_typhoid.analysis.sensitivity import SensitivityAnalysis, morris_design, saltelli_design
+from emodpy_typhoid.analysis.paired import PairedDifferenceAnalyzer, paired_differences, replicates_needed
+
+CONTACT_MATRIX = [
+    [0.0, 1.0, 2.0, 5.0],
+    [0.0, 0.0, 0.0, 0.0],
+    [0.0, 0.0, 0.0, 0.0],
+    [0.0, 0.0, 0.0, 0.0]
+]
+
+
+def write_property_report(path, scale):
+    channels = {}
+    for route in ["Contact", "Environment"]:
+        for region, rate in zip("ABCD", [0, 1, 2, 5]):
+            channels[f"Contagion: {route}/Region:{region}"] = {"Data": [rate * scale * t for t in range(5)]}
+    with open(path, "w") as report_file:
+        json.dump({"Header": {}, "Channels": channels}, report_file)
+
+
+def write_age_gender_report(path, infections, infected=None):
+    rows = []
+    for year in [2010.0, 2011.0]:
+        for region, new_infected in zip("ABCD", infections):
+            for gender in [0, 1]:
+                rows.append({"Time Of Report (Year)": year, " Gender": gender, " HINT Group": f" Region:{region}",
+                             " Newly Infected": new_infected,
+                             " Infected": new_infected if infected is None else infected, " Population": 100})
+    pd.DataFrame(rows).to_csv(path, index=False)
+
+
+class HINTValidationTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_hint_expectations(self):
+        checks = hv.hint_expectations("Region", list("ABCD"), CONTACT_MATRIX, CONTACT_MATRIX, seeded_value="A")
+        self.assertEqual(len(checks), 9)
+        self.assertDictEqual(checks[0], hv.expect_zero("Contagion: Contact/Region:A"))
+        self.assertDictEqual(checks[5], hv.expect_positive("Contagion: Environment/Region:B"))
+        self.assertListEqual(checks[-1]["channels"],
+                             ["Newly Infected/Region:B", "Newly Infected/Region:C", "Newly Infected/Region:D"])
+        # D is only reached from C, which may have no infections; B is not seeded and nothing reaches it
+        chain = [[0, 0, 1, 0], [0, 0, 0, 0], [0, 0, 0, 1], [0, 0, 0, 0]]
+        checks = hv.hint_expectations("Region", list("ABCD"), chain, seeded_value="A")
+        self.assertListEqual([check["check"] for check in checks], ["zero", "zero", "positive", "nonnegative"])
+        checks = hv.hint_expectations("Region", list("ABCD"), chain, seeded_value="A", infected_values=["C"])
+        self.assertEqual(checks[3], hv.expect_positive("Contagion: Contact/Region:D"))
+        self.assertListEqual([check["check"] for check in hv.hint_expectations("Region", list("ABCD"), chain)],
+                             ["zero", "zero", "nonnegative", "nonnegative"])
+
+    def test_validate_property_reports(self):
+        paths = []
+        for sim in range(3):
+            paths.append(os.path.join(self.tmp.name, f"PropertyReportTyphoid_{sim}.json"))
+            write_property_report(paths[-1], scale=sim)  # sim 0 has no contagion anywhere
+        channels = hv.load_channels(paths, processes=2)
+        self.assertEqual(channels["Contagion: Contact/Region:D"].shape, (3, 5))
+
+        checks = hv.hint_expectations("Region", list("ABCD"), CONTACT_MATRIX, CONTACT_MATRIX, seeded_value="A")
+        checks.append(hv.expect_route_split("Contagion: Contact/Region:D", "Contagion: Environment/Region:D", 0.5))
+        checks.append(hv.expect_zero("Contagion: Contact/Region:E"))
+        table = hv.validate(channels, checks, sim_ids=["s0", "s1", "s2"])
+        self.assertEqual(len(table), 3 * len(checks))
+        failed = table[~table.passed]
+        self.assertSetEqual(set(failed[failed.check == "positive"].sim), {"s0"})
+        self.assertEqual(len(failed[failed.check == "zero"]), 3)  # only the missing channel
+        split = table[table.check == "route_split"]
+        np.testing.assert_array_equal(split.passed.values, [False, True, True])
+
+    def test_validate_age_gender_reports(self):
+        paths = []
+        for sim, infections in enumerate([[3, 1, 2, 5], [3, 2, 2, 5]]):
+            paths.append(os.path.join(self.tmp.name, f"ReportTyphoidByAgeAndGender_{sim}.csv"))
+            write_age_gender_report(paths[-1], infections)
+        channels = hv.load_channels(paths, reader=hv.read_age_gender_report, processes=1)
+        np.testing.assert_array_equal(channels["Newly Infected/Region:D"], [[10, 10], [10, 10]])
+        table = hv.validate(channels, [hv.expect_increasing(["Newly Infected/Region:B", "Newly Infected/Region:C",
+                                                             "Newly Infected/Region:D"])])
+        self.assertListEqual(table.passed.tolist(), [True, False])
+
+
+class InfectedTotal(Analyzer):
+    filenames = ["ReportTyphoidByAgeAndGender.csv"]
+    calls = 0
+
+    def map(self, files, sim):
+        InfectedTotal.calls += 1
+        return int(pd.read_csv(files["ReportTyphoidByAgeAndGender.csv"])[" Infected"].sum())
+
+    def reduce(self, results):
+        return sum(results.values())
+
+
+def campaign_events(files, sim):
+    with open(files["campaign.json"]) as campaign_file:
+        return len(json.load(campaign_file)["Events"])
+
+
+def output_campaign_events(files, sim):
+    return campaign_events({"campaign.json": files["output/campaign.json"]}, sim)
+
+
+class AnalyzerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "experiment")
+        self.cache = os.path.join(self.tmp.name, "cache")
+        InfectedTotal.calls = 0
+        for sim in range(3):
+            self.add_sim(f"sim{sim}", [1, 2, 3, sim])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def add_sim(self, sim, infections, events=2):
+        sim_dir = os.path.join(self.root, sim, "output")
+        os.makedirs(sim_dir, exist_ok=True)
+        write_age_gender_report(os.path.join(sim_dir, "ReportTyphoidByAgeAndGender.csv"), infections)
+        with open(os.path.join(sim_dir, "campaign.json"), "w") as campaign_file:
+            json.dump({"Events": [{}] * events}, campaign_file)
+
+    def analysis(self, processes=1):
+        return ExperimentAnalysis(self.root, [InfectedTotal(), FunctionAnalyzer("events", ["campaign.json"],
+                                                                                campaign_events)],
+                                  cache_dir=self.cache, processes=processes)
+
+    def test_map_reduce_and_cache(self):
+        results = self.analysis().run()
+        # 2 years x 2 genders x (6 + sim)
+        self.assertEqual(results["InfectedTotal"], 4 * (6 + 7 + 8))
+        self.assertDictEqual(results["events"], {os.path.join(f"sim{sim}", "output"): 2 for sim in range(3)})
+        self.assertEqual(InfectedTotal.calls, 3)
+
+        # a new analysis of the same files only reads the cache
+        analysis = self.analysis()
+        self.assertEqual(analysis.run()["InfectedTotal"], 4 * 21)
+        self.assertEqual(InfectedTotal.calls, 3)
+
+        # only the new and the changed sim are mapped again
+        self.add_sim("sim3", [0, 0, 0, 1])
+        self.add_sim("sim0", [1, 1, 1, 0], events=5)
+        self.assertListEqual(sorted(analysis.update()), [os.path.join("sim0", "output"), os.path.join("sim3", "output")])
+        self.assertEqual(InfectedTotal.calls, 5)
+        results = analysis.reduce()
+        self.assertEqual(results["InfectedTotal"], 4 * (3 + 7 + 8 + 1))
+        self.assertEqual(results["events"][os.path.join("sim0", "output")], 5)
+
+    def test_cache_per_analyzer(self):
+        self.analysis().run()
+        # a changed analyzer next to an unchanged one: only the changed one maps again
+        events = FunctionAnalyzer("events", ["campaign.json"], campaign_events, reduce_fn=len, version=2)
+        results = ExperimentAnalysis(self.root, [InfectedTotal(), events], cache_dir=self.cache, processes=1).run()
+        self.assertEqual(results["events"], 3)
+        self.assertEqual(InfectedTotal.calls, 3)
+
+    def test_filenames_in_subdirectories(self):
+        events = FunctionAnalyzer("events", ["output/campaign.json"], output_campaign_events)
+        results = ExperimentAnalysis(self.root, [events], processes=1).run()
+        self.assertDictEqual(results["events"], {f"sim{sim}": 2 for sim in range(3)})
+
+    def test_process_pool(self):
+        results = self.analysis(processes=2).run()
+        self.assertEqual(results["InfectedTotal"], 4 * 21)
+        with self.assertRaises(ValueError):
+            ExperimentAnalysis(self.root, [InfectedTotal(), InfectedTotal()])
+
+    def test_map_required(self):
+        class NoMap(Analyzer):
+            filenames = ["InsetChart.json"]
+
+        with self.assertRaises(TypeError):
+            NoMap()
+
+
+class PairedDifferenceTest(unittest.TestCase):
+    def test_paired_differences(self):
+        rng = np.random.default_rng(0)
+        trajectories = 1000 + rng.normal(0, 100, size=(30, 4))  # shared by both arms of a pair
+        values = np.vstack([trajectories - 10 + rng.normal(0, 2, size=(30, 4)), trajectories])
+        arms = ["vax"] * 30 + ["no_vax"] * 30
+        pairs = list(range(30)) * 2
+        result = paired_differences(values, arms, pairs, "vax", "no_vax")
+        self.assertEqual(result["differences"].shape, (30, 4))
+        self.assertTrue(np.all(np.abs(result["mean"] + 10) < 4 * result["se"]))
+        self.assertTrue(np.allclose(result["ci_high"] - result["mean"], 1.96 * result["se"]))
+        self.assertTrue(np.all(result["variance_reduction"] > 100))
+        self.assertTrue(np.all(replicates_needed(result, half_width=1) < 30))
+        scalar = paired_differences(values[:, 0], arms, pairs, "vax", "no_vax")
+        self.assertAlmostEqual(scalar["mean"], result["mean"][0])
+        with self.assertRaises(ValueError):
+            paired_differences(values, arms, [0] * 60, "vax", "no_vax")
+
+    def test_analyzer(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            arms = {}
+            for pair in range(3):
+                for arm, infections in [("vax", 5 + pair), ("no_vax", 8 + 2 * pair)]:
+                    sim = f"{arm}_{pair}"
+                    os.makedirs(os.path.join(tmp, sim))
+                    write_age_gender_report(os.path.join(tmp, sim, "ReportTyphoidByAgeAndGender.csv"), [infections] * 4,
+                                            infected=10 * infections)
+                    arms[sim] = (arm, pair)
+            analyzer = PairedDifferenceAnalyzer("vax_effect", "vax", "no_vax", arms)
+            result = ExperimentAnalysis(tmp, [analyzer], processes=1).run()["vax_effect"]
+        # incidence, not prevalence: 8 rows per year of (5 + p) - (8 + 2p) = -3 - p new infections, mean over pairs -4
+        self.assertListEqual(list(result["mean"].index), [2010, 2011])
+        self.assertListEqual(result["mean"].tolist(), [-32.0, -32.0])
+        self.assertEqual(result["pairs"], [0, 1, 2])
+
+    def test_analyzer_mismatched_points(self):
+        analyzer = PairedDifferenceAnalyzer("vax_effect", "vax", "no_vax", {"a": ("vax", 0), "b": ("no_vax", 0),
+                                                                            "c": ("vax", 1), "d": ("no_vax", 1)})
+        full = pd.Series([1.0, 2.0], index=[2010, 2011])
+        # d stopped early
+        with self.assertRaisesRegex(ValueError, "different points"):
+            analyzer.reduce({"a": full, "b": full, "c": full, "d": full.iloc[:1]})
+
+
+class SensitivityTest(unittest.TestCase):
+    ranges = {"Typhoid_Acute_Infectiousness": (2000, 6000), "Typhoid_Environmental_Exposure_Rate": (0, 1),
+              "Typhoid_Symptomatic_Fraction": (0, 0.1)}
+
+    def model(self, design):
+        # linear in the fraction of each range: weights 10, 1 and 0
+        return (10 * (design["Typhoid_Acute_Infectiousness"] - 2000) / 4000
+                + design["Typhoid_Environmental_Exposure_Rate"]).to_dict()
+
+    def test_morris(self):
+        design = morris_design(self.ranges, trajectories=20, seed=1)
+        self.assertEqual(len(design), 20 * 4)
+        self.assertTrue(design["Typhoid_Symptomatic_Fraction"].between(0, 0.1).all())
+        analysis = SensitivityAnalysis(design, "morris", ranges=self.ranges)
+        outputs = self.model(design)
+        # only the first 10 trajectories have finished
+        analysis.update({row: outputs[row] for row in range(10 * 4 - 2)})
+        self.assertEqual(analysis.complete_blocks(), list(range(9)))
+        analysis.update(outputs)
+        indices = analysis.indices(bootstrap=200, seed=0)
+        np.testing.assert_allclose(indices["mu_star"], [10, 1, 0], atol=1e-9)
+        np.testing.assert_allclose(indices["sigma"], [0, 0, 0], atol=1e-9)
+        self.assertListEqual(list(indices.index), list(self.ranges))
+
+    def test_sobol(self):
+        design = saltelli_design(self.ranges, samples=1024, seed=2)
+        self.assertEqual(len(design), 1024 * 5)
+        analysis = SensitivityAnalysis(design, "sobol")
+        outputs = self.model(design)
+        # a second output point, only driven by the exposure rate
+        analysis.update({row: [value, design.loc[row, "Typhoid_Environmental_Exposure_Rate"]]
+                         for row, value in outputs.items()})
+        indices = analysis.indices(bootstrap=100, seed=0)
+        # variance shares of 10 * U and 1 * U: 100/101 and 1/101
+        np.testing.assert_allclose(indices[("S1", 0)], [100 / 101, 1 / 101, 0], atol=0.05)
+        np.testing.assert_allclose(indices[("ST", 1)], [0, 1, 0], atol=0.05)
+        self.assertTrue((indices[("ST_conf", 0)] < 0.1).all())
+        with self.assertRaises(ValueError):
+            SensitivityAnalysis(design, "morris")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,483 @@
+import copy
+import json
+import os
+import tempfile
+import threading
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+import emodpy_typhoid.campaign.compactor as compactor
+import emodpy_typhoid.campaign.coverage_map as coverage_map
+from emodpy_typhoid.campaign.carrier_program import CarrierScreeningProgram
+from emodpy_typhoid.campaign.context import CampaignContext, build_campaigns
+from emodpy_typhoid.campaign.seeding import SeedingPlan
+from emodpy_typhoid.campaign.timeline import CampaignTimeline
+from emodpy_typhoid.campaign.vaccine_schedule import VaccineSchedule
+from emodpy_typhoid.campaign.wash_rollout import WashRollout, ramp
+
+
+def scheduled_event(start_day, intervention, coverage=1.0, node_ids=None, ip_restrictions=None):
+    nodeset = {"class": "NodeSetAll"} if node_ids is None else {"class": "NodeSetNodeList", "Node_List": node_ids}
+    return {
+        "class": "CampaignEvent",
+        "Start_Day": start_day,
+        "Nodeset_Config": nodeset,
+        "Event_Coordinator_Config": {
+            "class": "StandardInterventionDistributionEventCoordinator",
+            "Number_Repetitions": 1,
+            "Timesteps_Between_Repetitions": -1,
+            "Demographic_Coverage": coverage,
+            "Property_Restrictions": ip_restrictions or [],
+            "Intervention_Config": intervention
+        }
+    }
+
+
+def triggered_event(start_day, intervention, triggers=("Births",), ip_restrictions=None):
+    nlhtiv = {
+        "class": "NodeLevelHealthTriggeredIV",
+        "Trigger_Condition_List": list(triggers),
+        "Demographic_Coverage": 1.0,
+        "Property_Restrictions": ip_restrictions or [],
+        "Actual_IndividualIntervention_Config": intervention
+    }
+    return scheduled_event(start_day, nlhtiv)
+
+
+OUTBREAK = {"class": "Outbreak", "Number_Cases_Per_Node": 1}
+VACCINE = {"class": "TyphoidVaccine", "Effect": 0.82, "Mode": "Shedding"}
+BROADCAST = {"class": "BroadcastEvent", "Broadcast_Event": "VaccineDistributed"}
+
+
+class CampaignCompactorTest(unittest.TestCase):
+    def test_fold_daily_outbreaks(self):
+        campaign = {"Events": [scheduled_event(1 + x, OUTBREAK) for x in range(10)], "Use_Defaults": 1}
+        original = copy.deepcopy(campaign)
+        compacted, report = compactor.compact_campaign(campaign)
+        self.assertEqual(campaign, original)
+        self.assertEqual(len(compacted["Events"]), 1)
+        ecc = compacted["Events"][0]["Event_Coordinator_Config"]
+        self.assertEqual(compacted["Events"][0]["Start_Day"], 1)
+        self.assertEqual(ecc["Number_Repetitions"], 10)
+        self.assertEqual(ecc["Timesteps_Between_Repetitions"], 1)
+        self.assertEqual(report["events_before"], 10)
+        self.assertEqual(report["events_after"], 1)
+        self.assertEqual(report["events_folded"], 9)
+        self.assertLess(report["bytes_after"], report["bytes_before"])
+
+    def test_fold_linspace_with_tolerance(self):
+        step = 4379 / 19
+        events = [scheduled_event(1 + i * step, VACCINE, coverage=0.1, ip_restrictions=["Region:Rural"])
+                  for i in range(20)]
+        compacted, _ = compactor.compact_campaign(events)
+        self.assertEqual(len(compacted["Events"]), 20)
+        compacted, _ = compactor.compact_campaign(events, day_tolerance=10)
+        self.assertEqual(len(compacted["Events"]), 1)
+        self.assertEqual(compacted["Events"][0]["Event_Coordinator_Config"]["Timesteps_Between_Repetitions"], 230)
+
+    def test_one_off_day_before_series(self):
+        days = [1] + [730 + 365 * year for year in range(10)]
+        compacted, _ = compactor.compact_campaign([scheduled_event(day, OUTBREAK) for day in days])
+        self.assertListEqual([event["Start_Day"] for event in compacted["Events"]], [1, 730])
+        ecc = compacted["Events"][1]["Event_Coordinator_Config"]
+        self.assertEqual((ecc["Number_Repetitions"], ecc["Timesteps_Between_Repetitions"]), (10, 365))
+        # a run of three before a longer series is kept whole
+        days = [1, 2, 3, 100, 200, 300, 400, 500]
+        compacted, _ = compactor.compact_campaign([scheduled_event(day, OUTBREAK) for day in days])
+        self.assertListEqual([event["Start_Day"] for event in compacted["Events"]], [1, 100])
+
+    def test_different_targeting_not_folded(self):
+        events = [scheduled_event(1, OUTBREAK, node_ids=[1]), scheduled_event(2, OUTBREAK, node_ids=[2])]
+        compacted, report = compactor.compact_campaign(events)
+        self.assertEqual(len(compacted["Events"]), 2)
+        self.assertEqual(report["events_folded"], 0)
+
+    def test_triggered_events_not_folded(self):
+        events = [triggered_event(1, VACCINE), triggered_event(2, VACCINE)]
+        compacted, _ = compactor.compact_campaign(events, merge=False)
+        self.assertEqual(len(compacted["Events"]), 2)
+
+    def test_merge_triggered_listeners(self):
+        events = [triggered_event(10, VACCINE), triggered_event(10, BROADCAST), triggered_event(10, VACCINE, triggers=["Births", "Emigrating"])]
+        compacted, report = compactor.compact_campaign(events)
+        self.assertEqual(len(compacted["Events"]), 2)
+        self.assertEqual(report["events_merged"], 1)
+        merged = compacted["Events"][0]["Event_Coordinator_Config"]["Intervention_Config"]["Actual_IndividualIntervention_Config"]
+        self.assertEqual(merged["class"], "MultiInterventionDistributor")
+        self.assertListEqual(merged["Intervention_List"], [VACCINE, BROADCAST])
+
+    def test_partial_coverage_not_merged(self):
+        events = [scheduled_event(10, VACCINE, coverage=0.5), scheduled_event(10, BROADCAST, coverage=0.5)]
+        compacted, _ = compactor.compact_campaign(events)
+        self.assertEqual(len(compacted["Events"]), 2)
+
+    def test_compact_builder_in_place(self):
+        class FakeCamp:
+            campaign_dict = {"Events": [scheduled_event(1 + 7 * x, OUTBREAK) for x in range(4)], "Use_Defaults": 1}
+        report = compactor.compact(FakeCamp)
+        self.assertEqual(len(FakeCamp.campaign_dict["Events"]), 1)
+        self.assertEqual(report["events_after"], 1)
+
+
+class CampaignTimelineTest(unittest.TestCase):
+    def setUp(self):
+        repeating = scheduled_event(1, OUTBREAK)
+        repeating["Event_Coordinator_Config"]["Number_Repetitions"] = 10
+        repeating["Event_Coordinator_Config"]["Timesteps_Between_Repetitions"] = 365
+        self.events = [
+            repeating,                                                                      # days 1..3286
+            scheduled_event(3286, {"class": "MultiInterventionDistributor",
+                                   "Intervention_List": [VACCINE, BROADCAST]},
+                            ip_restrictions=["Region:Urban"]),                              # day 3286
+            triggered_event(3286, VACCINE, ip_restrictions=["Region:Rural"]),               # day 3286 on
+            triggered_event(100, BROADCAST, triggers=["TestedPositive"]),                   # orphan listener
+            scheduled_event(50, VACCINE)                                                    # day 50
+        ]
+        self.timeline = CampaignTimeline({"Events": self.events})
+
+    def indices(self, entries):
+        return [entry.index for entry in entries]
+
+    def test_active_between(self):
+        self.assertListEqual(self.indices(self.timeline.active_between(10, 60)), [0, 4])
+        self.assertListEqual(self.indices(self.timeline.active_between(4000, 5000)), [2, 3])
+        self.assertListEqual(self.indices(self.timeline.active_between(3000, 4000)), [0, 1, 2, 3])
+        self.assertListEqual(self.indices(self.timeline.active_between(3000, 4000, ip="Region:Urban")), [0, 1, 3])
+        self.assertListEqual(self.indices(self.timeline.active_between(3000, 4000, ip="Region:Rural")), [0, 2, 3])
+        self.assertListEqual(self.indices(self.timeline.starting_between(50, 100)), [3, 4])
+
+    def test_matches_brute_force(self):
+        events = []
+        for x in range(500):
+            event = scheduled_event(x * 7 % 1000, OUTBREAK)
+            event["Event_Coordinator_Config"]["Number_Repetitions"] = 1 + x % 4
+            event["Event_Coordinator_Config"]["Timesteps_Between_Repetitions"] = x % 50
+            events.append(event)
+        timeline = CampaignTimeline(events)
+        for lo, hi in [(0, 0), (10, 20), (500, 510), (990, 2000), (-5, -1)]:
+            expected = [e.index for e in timeline.entries if e.start <= hi and e.stop >= lo]
+            self.assertListEqual(self.indices(timeline.active_between(lo, hi)), expected)
+
+    def test_trigger_maps(self):
+        self.assertListEqual(self.timeline.listeners["Births"], [2])
+        self.assertListEqual(self.timeline.broadcasters["VaccineDistributed"], [1, 3])
+        self.assertDictEqual(self.timeline.orphan_listeners(), {"TestedPositive": [3]})
+        self.assertDictEqual(self.timeline.unheard_broadcasts(), {"VaccineDistributed": [1, 3]})
+        self.assertDictEqual(self.timeline.unheard_broadcasts(reported_events=["VaccineDistributed"]), {})
+        with self.assertRaises(ValueError):
+            self.timeline.validate(reported_events=["VaccineDistributed"])
+
+    def test_non_trigger_event_keys(self):
+        node_broadcast = {"class": "BroadcastNodeEvent", "Broadcast_Event": "SpraysDone"}
+        counted = dict(BROADCAST, Max_Distributed_Per_Event=100, Reported_Events=[2, "Reported"])
+        timeline = CampaignTimeline([scheduled_event(1, node_broadcast), scheduled_event(1, counted)])
+        self.assertDictEqual(timeline.broadcasters, {"VaccineDistributed": [1], "Reported": [1]})
+        # events of other models aren't taken as built in
+        timeline = CampaignTimeline([triggered_event(1, VACCINE, triggers=["Pregnant"])])
+        self.assertDictEqual(timeline.orphan_listeners(), {"Pregnant": [0]})
+
+
+def make_node(node_id, lat=0, lon=0, pop=1000):
+    return SimpleNamespace(id=node_id, lat=lat, lon=lon, node_attributes=SimpleNamespace(initial_population=pop))
+
+
+class CoverageMapTest(unittest.TestCase):
+    def test_bin_coverage_within_tolerance(self):
+        rng = np.random.default_rng(0)
+        coverage = {node_id: float(value) for node_id, value in enumerate(rng.uniform(0.3, 0.9, 5000), start=1)}
+        classes = coverage_map.bin_coverage(coverage, tolerance=0.025)
+        # 0.6 wide range, 0.05 per class
+        self.assertLessEqual(len(classes), 13)
+        self.assertEqual(sum(len(node_ids) for _, node_ids in classes), 5000)
+        for level, node_ids in classes:
+            for node_id in node_ids:
+                self.assertLessEqual(abs(coverage[node_id] - level), 0.025 + 1e-12)
+
+    def test_bin_coverage_aligned_array_and_weights(self):
+        nodes = [make_node(10), make_node(20, pop=9000), make_node(30), make_node(40)]
+        classes = coverage_map.bin_coverage([0.5, 0.54, np.nan, 0.0], nodes=nodes, tolerance=0.05,
+                                            weights={10: 1000, 20: 9000})
+        self.assertEqual(len(classes), 1)
+        self.assertAlmostEqual(classes[0][0], 0.536)
+        self.assertListEqual(classes[0][1], [10, 20])
+        self.assertListEqual(coverage_map.bin_coverage({1: 0.5, 2: 0.5, 3: 0.7}, tolerance=0),
+                             [(0.5, [1, 2]), (0.7, [3])])
+        with self.assertRaises(ValueError):
+            coverage_map.bin_coverage([0.5, 0.6], nodes=nodes)
+
+    def test_coverage_from_raster(self):
+        raster = np.array([[0.1, 0.2], [0.3, np.nan]])
+        nodes = [make_node(1, lat=1.5, lon=0.5), make_node(2, lat=0.5, lon=0.5), make_node(3, lat=0, lon=2),
+                 make_node(4, lat=5, lon=0.5)]
+        coverage = coverage_map.coverage_from_raster(nodes, raster, lat_bounds=(0, 2), lon_bounds=(0, 2))
+        self.assertEqual(coverage[1], 0.1)
+        self.assertEqual(coverage[2], 0.3)
+        self.assertTrue(np.isnan(coverage[3]))
+        self.assertTrue(np.isnan(coverage[4]))
+
+    def test_one_event_per_class(self):
+        def builder(camp, coverage, node_ids, start_day=1):
+            return scheduled_event(start_day, VACCINE, coverage=coverage)
+
+        nodes = [make_node(node_id) for node_id in range(1, 101)]
+        events = coverage_map.new_coverage_map_interventions(None, [0.5] * 50 + [0.8] * 50, builder=builder,
+                                                             nodes=nodes, start_day=30)
+        self.assertEqual(len(events), 2)
+        self.assertEqual(events[1]["Event_Coordinator_Config"]["Demographic_Coverage"], 0.8)
+        self.assertListEqual(events[1]["Nodeset_Config"]["Node_List"], list(range(51, 101)))
+        self.assertEqual(events[0]["Start_Day"], 30)
+
+
+class VaccineScheduleTest(unittest.TestCase):
+    def test_compile_schedule(self):
+        schedule = VaccineSchedule(name="TCV", start_day=100, notify="VaccineDistributed")
+        first = schedule.routine(age=270, coverage=0.85)
+        second = schedule.routine(age=450, window=14, coverage=0.9)
+        catch_up = schedule.catch_up(start_day=200, age_min=0.75, age_max=15, coverage=0.72)
+        schedule.booster(after=catch_up, interval=5 * 365, window=30, coverage=0.5)
+        self.assertListEqual(schedule.broadcast_events(), sorted([first, catch_up]) + ["VaccineDistributed"])
+
+        events = schedule.compile().to_dict()["Events"]
+        self.assertEqual(len(events), 4)
+        routine = events[0]["Event_Coordinator_Config"]["Intervention_Config"]
+        self.assertListEqual(routine["Trigger_Condition_List"], ["Births"])
+        delayed = routine["Actual_IndividualIntervention_Config"]
+        self.assertEqual((delayed["Delay_Period_Min"], delayed["Delay_Period_Max"]), (263, 277))
+        self.assertListEqual([iv.get("Broadcast_Event") for iv in delayed["Actual_IndividualIntervention_Configs"]],
+                             [None, "VaccineDistributed", first])
+
+        second_dose = events[1]["Event_Coordinator_Config"]["Intervention_Config"]
+        self.assertListEqual(second_dose["Trigger_Condition_List"], [first])
+        self.assertEqual(second_dose["Actual_IndividualIntervention_Config"]["Delay_Period_Min"], 166)
+        self.assertEqual(events[1]["Event_Name"], second)
+
+        ecc = events[2]["Event_Coordinator_Config"]
+        self.assertEqual((events[2]["Start_Day"], ecc["Target_Age_Min"], ecc["Target_Age_Max"]), (200, 0.75, 15))
+        booster = events[3]["Event_Coordinator_Config"]["Intervention_Config"]
+        self.assertListEqual(booster["Trigger_Condition_List"], [catch_up])
+
+    def test_overlaps_rejected(self):
+        schedule = VaccineSchedule()
+        schedule.routine(age=270, window=30)
+        schedule.routine(age=290)
+        with self.assertRaises(ValueError):
+            schedule.compile()
+
+        schedule = VaccineSchedule()
+        schedule.catch_up(start_day=365, age_min=1, age_max=5, repetitions=3, interval=365)
+        schedule.catch_up(start_day=1095, age_min=4, age_max=15)
+        with self.assertRaises(ValueError):
+            schedule.validate()
+        with self.assertRaises(ValueError):
+            schedule.booster(after="missing", interval=30)
+
+    def test_shared_templates_at_scale(self):
+        events = []
+        for region in range(500):
+            schedule = VaccineSchedule(node_ids=[region + 1])
+            schedule.routine(age=270)
+            schedule.catch_up(start_day=365, age_min=0.75, age_max=15)
+            events.extend(schedule.compile().events)
+        self.assertEqual(len(events), 1000)
+        self.assertIs(events[0].interventions[0], events[-1].interventions[0])
+
+
+class WashRolloutTest(unittest.TestCase):
+    def test_ramp(self):
+        self.assertListEqual(ramp(0, 730, 0, 0.5, 2), [(365, 0.25), (730, 0.5)])
+
+    def test_phases_merge_across_nodes(self):
+        rows = [{"node_ids": f"{node_id}", "start_year": 2020, "end_year": 2024, "coverage": 0.8, "steps": 4}
+                for node_id in range(1, 1001)]
+        rows.append({"node_ids": "1;2", "start_year": 2025, "coverage": 0.9, "property_restrictions": "Region:Urban",
+                     "decay_time_constant": 3650})
+        rollout = WashRollout.from_table(rows, base_year=2020, efficacy=0.6)
+        events = rollout.compile().to_dict()["Events"]
+        self.assertEqual(len(events), 5)
+        # 0.2 of everyone, then 0.2 of the remaining 0.8, ...
+        coverages = [event["Event_Coordinator_Config"]["Demographic_Coverage"] for event in events[:4]]
+        for coverage, expected in zip(coverages, [0.2, 0.25, 1 / 3, 0.5]):
+            self.assertAlmostEqual(coverage, expected)
+        self.assertEqual(len(events[0]["Nodeset_Config"]["Node_List"]), 1000)
+        self.assertEqual(events[3]["Start_Day"], 4 * 365)
+
+        wash = events[0]["Event_Coordinator_Config"]["Intervention_Config"]
+        self.assertDictEqual(wash, {"class": "TyphoidWASH", "Effect": 0.6, "Mode": "Shedding", "Dont_Allow_Duplicates": 1,
+                                    "Changing_Effect": {"class": "WaningEffectBoxExponential", "Initial_Effect": 0.6,
+                                                        "Box_Duration": 36500, "Decay_Time_Constant": 0}})
+        urban = events[4]["Event_Coordinator_Config"]
+        self.assertListEqual(urban["Property_Restrictions"], ["Region:Urban"])
+        self.assertListEqual(events[4]["Nodeset_Config"]["Node_List"], [1, 2])
+        self.assertEqual(urban["Intervention_Config"]["Changing_Effect"]["Decay_Time_Constant"], 3650)
+
+    def test_phases_carry_on(self):
+        rollout = WashRollout()
+        rollout.add_phase(start_day=100, coverage=0.5, node_ids=[1])
+        rollout.add_phase(start_day=200, coverage=0.75, node_ids=[1])
+        self.assertListEqual([step[4] for step in rollout.steps()], [0.5, 0.5])
+        # a new efficacy under the same name still only reaches people not yet covered
+        rollout.add_phase(start_day=300, coverage=0.875, node_ids=[1], efficacy=0.5)
+        self.assertListEqual([step[4] for step in rollout.steps()], [0.5, 0.5, 0.5])
+        # a differently named intervention has its own coverage
+        rollout.add_phase(start_day=400, coverage=0.5, node_ids=[1], intervention_name="WASH_Latrines")
+        events = rollout.compile().to_dict()["Events"]
+        self.assertEqual(events[3]["Event_Coordinator_Config"]["Demographic_Coverage"], 0.5)
+        self.assertEqual(events[3]["Event_Coordinator_Config"]["Intervention_Config"]["Intervention_Name"],
+                         "WASH_Latrines")
+        self.assertNotIn("Intervention_Name", events[2]["Event_Coordinator_Config"]["Intervention_Config"])
+        rollout.add_phase(start_day=300, coverage=0.5, node_ids=[1])
+        with self.assertRaises(ValueError):
+            rollout.steps()
+        with self.assertRaises(ValueError):
+            WashRollout.from_table([{"start_day": 1, "coverage": 0.5, "district": "A"}])
+
+
+class CarrierProgramTest(unittest.TestCase):
+    def test_single_listener(self):
+        program = CarrierScreeningProgram(sensitivity=0.7, specificity=0.95, clearance_rate=0.9)
+        program.add_rounds(days=[3650, 4015, 4380, 4745, 6000], coverage=0.3, age_min=30, node_ids=[1, 2])
+        program.add_round(5000, node_ids=[3])
+        events = program.compile().to_dict()["Events"]
+        self.assertEqual(len(events), 4)
+        self.assertEqual(events[0]["Event_Coordinator_Config"]["Number_Repetitions"], 4)
+        self.assertEqual(events[0]["Event_Coordinator_Config"]["Timesteps_Between_Repetitions"], 365)
+        self.assertEqual(events[0]["Event_Coordinator_Config"]["Target_Age_Min"], 30)
+        diagnostic = events[0]["Event_Coordinator_Config"]["Intervention_Config"]
+        self.assertEqual(diagnostic["Positive_Diagnosis_Event"], "TestedPositive")
+        self.assertEqual(diagnostic["Base_Sensitivity"], 0.7)
+
+        listener = events[-1]
+        self.assertEqual(listener["Start_Day"], 3650)
+        self.assertListEqual(listener["Nodeset_Config"]["Node_List"], [1, 2, 3])
+        nlhtiv = listener["Event_Coordinator_Config"]["Intervention_Config"]
+        self.assertListEqual(nlhtiv["Trigger_Condition_List"], ["TestedPositive"])
+        self.assertEqual(nlhtiv["Actual_IndividualIntervention_Config"]["Clearance_Rate"], 0.9)
+        self.assertDictEqual(CampaignTimeline(events).orphan_listeners(), {})
+
+    def test_trigger_validation(self):
+        program = CarrierScreeningProgram()
+        with self.assertRaises(ValueError):
+            program.compile()
+        for pos_event in ["Births", "Tested Positive", ""]:
+            invalid = CarrierScreeningProgram(pos_event=pos_event)
+            invalid.add_round(10)
+            with self.assertRaises(ValueError):
+                invalid.compile()
+        program.add_round(10)
+        with self.assertRaises(ValueError):
+            program.compile(existing=[triggered_event(1, {"class": "TyphoidCarrierClear"}, triggers=["TestedPositive"])])
+        self.assertEqual(len(program.compile(existing=[scheduled_event(1, OUTBREAK)])), 2)
+
+
+class SeedingPlanTest(unittest.TestCase):
+    def test_fold_and_merge(self):
+        plan = SeedingPlan()
+        plan.add(day=1, coverage=0.005)
+        plan.add_rows({"day": 730 + 365 * year, "coverage": 0.005} for year in range(10))
+        plan.add_rows([{"node_ids": node_id, "day": 100, "cases": 5} for node_id in range(1, 1001)])
+        plan.add_rows([{"node_ids": "1;2", "day": 200, "coverage": 0.1, "property_restrictions": "Region:Urban",
+                        "cases": None}])
+        events = plan.compile().to_dict()["Events"]
+        self.assertEqual(len(events), 4)
+        initial, cases, urban, yearly = events
+        self.assertEqual(initial["Event_Coordinator_Config"]["Intervention_Config"]["class"], "OutbreakIndividual")
+        self.assertEqual(initial["Nodeset_Config"]["class"], "NodeSetAll")
+        self.assertEqual(len(cases["Nodeset_Config"]["Node_List"]), 1000)
+        self.assertEqual(cases["Event_Coordinator_Config"]["Intervention_Config"]["Number_Cases_Per_Node"], 5)
+        self.assertListEqual(urban["Event_Coordinator_Config"]["Property_Restrictions"], ["Region:Urban"])
+        self.assertEqual(yearly["Start_Day"], 730)
+        self.assertEqual(yearly["Event_Coordinator_Config"]["Number_Repetitions"], 10)
+        self.assertEqual(yearly["Event_Coordinator_Config"]["Timesteps_Between_Repetitions"], 365)
+        self.assertEqual(yearly["Event_Coordinator_Config"]["Demographic_Coverage"], 0.005)
+
+    def test_invalid_rows(self):
+        plan = SeedingPlan()
+        with self.assertRaises(ValueError):
+            plan.add(day=1)
+        with self.assertRaises(ValueError):
+            plan.add(day=1, cases=2, property_restrictions=["Region:Urban"])
+        with self.assertRaises(ValueError):
+            plan.add_rows([{"day": 1, "coverage": 0.1, "district": "A"}])
+
+    def test_stochastic_importations(self):
+        plan = SeedingPlan()
+        total = plan.add_importations(rate=lambda days, nodes: np.where(nodes % 2 == 0, 1e-3, 0.0) + 0 * days,
+                                      node_ids=range(1, 1001), start_day=1, end_day=3650, seed=1)
+        self.assertGreater(total, 0)
+        events = plan.events()
+        self.assertEqual(sum(event.interventions[0].cases * len(event.node_ids) * event.repetitions
+                             for event in events), total)
+        self.assertTrue(all(node_id % 2 == 0 for event in events for node_id in event.node_ids))
+        again = SeedingPlan()
+        again.add_importations(rate=lambda days, nodes: np.where(nodes % 2 == 0, 1e-3, 0.0) + 0 * days,
+                               node_ids=range(1, 1001), start_day=1, end_day=3650, seed=1)
+        self.assertEqual(again.events(), events)
+
+
+def build_outbreaks(camp, days, coverage=1.0):
+    for day in days:
+        camp.add(scheduled_event(day, OUTBREAK, coverage=coverage))
+    camp.get_send_trigger("Seeded")
+
+
+class CampaignContextTest(unittest.TestCase):
+    def test_isolated_concurrent_builds(self):
+        contexts = [CampaignContext("schema_%d.json" % idx) for idx in range(8)]
+        start = threading.Barrier(len(contexts))
+
+        def build(idx):
+            start.wait()
+            build_outbreaks(contexts[idx], range(1, 501), coverage=idx / 10)
+
+        threads = [threading.Thread(target=build, args=(idx,)) for idx in range(len(contexts))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for idx, camp in enumerate(contexts):
+            events = camp.campaign_dict["Events"]
+            self.assertEqual(len(events), 500)
+            self.assertSetEqual({event["Event_Coordinator_Config"]["Demographic_Coverage"] for event in events},
+                                {idx / 10})
+            self.assertEqual(camp.schema_path, "schema_%d.json" % idx)
+
+    def test_builder_interface(self):
+        camp = CampaignContext()
+        camp.add(scheduled_event(5, OUTBREAK))
+        camp.add(scheduled_event(1, VACCINE), name="Vax", first=True)
+        self.assertEqual(camp.campaign_dict["Events"][0]["Event_Name"], "Vax")
+        self.assertEqual(camp.get_send_trigger("VaccineDistributed"), "VaccineDistributed")
+        self.assertDictEqual(camp.get_adhoc_events(), {"VaccineDistributed": "VaccineDistributed"})
+        with self.assertRaises(ValueError):
+            camp.get_recv_trigger("")
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(camp.save(os.path.join(tmp, "campaign.json"))) as campaign_file:
+                self.assertEqual(len(json.load(campaign_file)["Events"]), 2)
+        camp.set_schema("schema.json")
+        self.assertListEqual(camp.campaign_dict["Events"], [])
+
+    def test_consumed_like_emod_api_campaign(self):
+        # what emodpy's create_campaign_from_callback does with the campaign a builder returns
+        camp = CampaignContext("schema.json")
+        build_outbreaks(camp, [1, 2])
+        camp.custom_coordinator_events.append("Coordinator_Event")
+        events = list(camp.campaign_dict["Events"])
+        self.assertDictEqual(camp.get_adhocs(), {"Seeded": "Seeded"})
+        self.assertListEqual(camp.get_custom_coordinator_events(), ["Coordinator_Event"])
+        self.assertListEqual(camp.get_custom_node_events(), [])
+        camp.reset()
+        self.assertEqual(len(events), 2)
+        self.assertListEqual(camp.campaign_dict["Events"], [])
+        self.assertDictEqual(camp.get_adhocs(), {})
+
+    def test_build_campaigns(self):
+        scenarios = [{"days": range(1, day + 1)} for day in range(1, 5)]
+        for kwargs in [{"processes": 2}, {"processes": 2, "threads": True}, {"processes": 1}]:
+            campaigns = build_campaigns(build_outbreaks, scenarios, "schema.json", **kwargs)
+            self.assertListEqual([len(campaign["Events"]) for campaign in campaigns], [1, 2, 3, 4])
+
+
+if __name__ == '__main__':
+    unittest.main()
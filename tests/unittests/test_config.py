@@ -0,0 +1,153 @@
+import json
+import os
+import random
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+import emodpy_typhoid.config as config_utils
+from emodpy_typhoid.utils.schema_index import ParameterIndex
+
+
+def fake_pilot(rate, run_number):
+    # noise shrinks with the number of agents, like a real stochastic sim
+    rng = random.Random(run_number * 1000 + int(rate * 1000))
+    return [100 + rng.gauss(0, 20 / rate ** 0.5) for _ in range(10)]
+
+
+def schema_backed_config(parameters):
+    # a config as emodpy builds it from a schema: parameters are an emod_api ReadOnlyDict
+    from emod_api.config.default_from_schema_no_validation import get_default_config_from_schema
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "schema.json")
+        with open(path, "w") as schema_file:
+            json.dump({"config": {"Disease": parameters}}, schema_file)
+        config = get_default_config_from_schema(path, as_rod=True)
+    return SimpleNamespace(parameters=config.parameters)
+
+
+class SampleRatePlannerTest(unittest.TestCase):
+    def test_recommends_lowest_rate_meeting_target(self):
+        plan = config_utils.plan_sample_rate(fake_pilot, rates=[1.0, 0.01, 0.1], replicates=5, target_cv=0.05)
+        self.assertListEqual([row['rate'] for row in plan['rows']], [0.01, 0.1, 1.0])
+        passing = [row['rate'] for row in plan['rows'] if row['meets_target']]
+        self.assertEqual(plan['recommended_rate'], min(passing))
+        self.assertEqual(plan['config_changes']['Base_Individual_Sample_Rate'], plan['recommended_rate'])
+        self.assertEqual(plan['config_changes']['Individual_Sampling_Type'], 'FIXED_SAMPLING')
+        self.assertIn('Recommended Base_Individual_Sample_Rate', config_utils.format_sample_rate_report(plan))
+
+    def test_numpy_outputs(self):
+        def numpy_pilot(rate, run_number):
+            output = np.array(fake_pilot(rate, run_number))
+            return output.sum() if run_number % 2 else np.int64(output.sum())
+        plan = config_utils.plan_sample_rate(numpy_pilot, rates=np.array([0.1, 1.0]), replicates=4, target_cv=0.5,
+                                             summary=np.sum)
+        self.assertEqual(json.loads(json.dumps(plan)), plan)
+        self.assertIs(type(plan["recommended_rate"]), float)
+        self.assertIn("Recommended Base_Individual_Sample_Rate: 0.1\n", config_utils.format_sample_rate_report(plan) + "\n")
+
+    def test_no_rate_meets_target(self):
+        plan = config_utils.plan_sample_rate(fake_pilot, rates=[0.01], replicates=3, target_cv=1e-9)
+        self.assertIsNone(plan['recommended_rate'])
+        self.assertDictEqual(plan['config_changes'], {})
+        config = SimpleNamespace(parameters={})
+        with self.assertRaises(ValueError):
+            config_utils.apply_sample_rate_plan(config, plan)
+
+    def test_apply_plan(self):
+        plan = config_utils.plan_sample_rate(lambda rate, run_number: 10 + run_number, rates=[0.2], replicates=2)
+        config = SimpleNamespace(parameters={})
+        config_utils.apply_sample_rate_plan(config, plan)
+        self.assertEqual(config.parameters['Base_Individual_Sample_Rate'], 0.2)
+
+    def test_apply_plan_schema_backed(self):
+        plan = config_utils.plan_sample_rate(lambda rate, run_number: 10 + run_number, rates=[0.2], replicates=2)
+        rate = {"default": 1, "type": "float", "min": 0, "max": 1}
+        config = schema_backed_config({"Base_Individual_Sample_Rate": rate, "Individual_Sampling_Type": {
+            "default": "TRACK_ALL", "type": "enum", "enum": ["TRACK_ALL", "FIXED_SAMPLING"]}})
+        config_utils.apply_sample_rate_plan(config, plan)
+        self.assertEqual(config.parameters.Individual_Sampling_Type, "FIXED_SAMPLING")
+        self.assertListEqual(sorted(config.parameters.explicits), ["Base_Individual_Sample_Rate", "Individual_Sampling_Type"])
+        # values are checked against the schema
+        config = schema_backed_config({"Base_Individual_Sample_Rate": rate, "Individual_Sampling_Type": {
+            "default": "TRACK_ALL", "type": "enum", "enum": ["TRACK_ALL"]}})
+        with self.assertRaises(ValueError):
+            config_utils.apply_sample_rate_plan(config, plan)
+
+    def test_bad_arguments(self):
+        with self.assertRaises(ValueError):
+            config_utils.plan_sample_rate(fake_pilot, replicates=1)
+        with self.assertRaises(ValueError):
+            config_utils.plan_sample_rate(fake_pilot, rates=[1.5])
+
+
+def current_parameters(run_number=0):
+    return {"Run_Number": run_number, "Serialized_Population_Filenames": [], "Serialization_Time_Steps": [],
+            "Demographics_Filename": "demographics.json", "Incubation_Period_Distribution": "GAUSSIAN_DISTRIBUTION",
+            "Infectious_Period_Distribution": "GAUSSIAN_DISTRIBUTION", "Environmental_Cutoff_Days": 190.0}
+
+
+class TranslationTest(unittest.TestCase):
+    def test_cleanup_for_2018_mode(self):
+        config = SimpleNamespace(parameters=current_parameters())
+        config_utils.cleanup_for_2018_mode(config)
+        self.assertDictEqual(config.parameters, {
+            "Run_Number": 0, "Incubation_Period_Distribution": "FIXED_DURATION",
+            "Infectious_Period_Distribution": "FIXED_DURATION", "Base_Incubation_Period": 1,
+            "Base_Infectious_Period": 1, "Environmental_Cutoff_Days": 190.0})
+
+    def schema_config(self, distributions):
+        enum = {"default": "EXPONENTIAL_DISTRIBUTION", "type": "enum", "enum": distributions}
+        number = {"default": 6, "type": "float", "min": 0, "max": 1000}
+        return schema_backed_config({
+            "Incubation_Period_Distribution": enum, "Infectious_Period_Distribution": enum,
+            "Base_Incubation_Period": number, "Base_Infectious_Period": number,
+            "Demographics_Filename": {"default": "", "type": "string"}})
+
+    def test_schema_backed_config(self):
+        config = self.schema_config(["EXPONENTIAL_DISTRIBUTION", "FIXED_DURATION"])
+        config_utils.cleanup_for_2018_mode(config)
+        self.assertNotIn("Demographics_Filename", config.parameters)
+        self.assertEqual(config.parameters.Incubation_Period_Distribution, "FIXED_DURATION")
+        self.assertListEqual(config.parameters.explicits, [
+            "Incubation_Period_Distribution", "Infectious_Period_Distribution", "Base_Incubation_Period",
+            "Base_Infectious_Period"])
+        # values are checked against the schema
+        with self.assertRaises(ValueError):
+            config_utils.cleanup_for_2018_mode(self.schema_config(["EXPONENTIAL_DISTRIBUTION"]))
+
+    def test_batch_and_table_agree(self):
+        index = ParameterIndex.build({"2018": {"config": {name: {"default": 0} for name in [
+            "Run_Number", "Incubation_Period_Distribution", "Infectious_Period_Distribution",
+            "Base_Incubation_Period", "Base_Infectious_Period"]}}})
+        configs = config_utils.translate_configs([current_parameters(run) for run in range(5)], "current", "2018",
+                                                 index=index)
+        table = pd.DataFrame([current_parameters(run) for run in range(5)])
+        translated = config_utils.translate_table(table, "current", "2018", index=index)
+        self.assertNotIn("Environmental_Cutoff_Days", translated.columns)
+        self.assertListEqual(translated.to_dict("records"), configs)
+        kept = config_utils.translate_configs([current_parameters()], "current", "2018", index=index,
+                                              keep=["Environmental_Cutoff_Days"])
+        self.assertIn("Environmental_Cutoff_Days", kept[0])
+
+    def test_campaign_rules(self):
+        campaign = {"Events": [{"Event_Coordinator_Config": {"Intervention_Config": {
+            "class": "TyphoidWASH", "Effect": 0.5, "Changing_Effect": {"class": "WaningEffectBox"}}}}]}
+        rules = [("rename_class", "TyphoidWASH", None, "TyphoidWASHOld"), ("drop", "TyphoidWASH", "Changing_Effect", None)]
+        original = config_utils.CAMPAIGN_TRANSLATIONS.get(("current", "2018"))
+        config_utils.CAMPAIGN_TRANSLATIONS[("current", "2018")] = rules
+        try:
+            config_utils.translate_campaign(campaign, "current", "2018")
+        finally:
+            config_utils.CAMPAIGN_TRANSLATIONS[("current", "2018")] = original
+        self.assertDictEqual(campaign["Events"][0]["Event_Coordinator_Config"]["Intervention_Config"],
+                             {"class": "TyphoidWASHOld", "Effect": 0.5})
+        with self.assertRaisesRegex(ValueError, "No translation"):
+            config_utils.translate_configs([{}], "2018", "2016")
+
+
+if __name__ == '__main__':
+    unittest.main()
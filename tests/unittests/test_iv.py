@@ -2,11 +2,14 @@ import copy
 import json
 import os
 import pathlib
+import subprocess
+import sys
 import unittest
 import emodpy_typhoid.interventions.typhoid_vaccine as ty
 import emodpy_typhoid.interventions.typhoid_wash as tw
 import emodpy_typhoid.interventions.tcd as tcd
 import emodpy_typhoid.interventions.tcc as tcc
+import emodpy_typhoid.interventions.compact as compact
 import emod_api.campaign as camp
 import pytest
 
@@ -175,5 +178,89 @@ class TestTyphoidInterventions(unittest.TestCase):
         self.assertEqual(self.event_coordinator['Demographic_Coverage'], coverage)
 
 
+class TestCompactInterventions(unittest.TestCase):
+
+    def test_scheduled_typhoid_vaccine(self):
+        vax = compact.TyphoidVaccine(efficacy=0.8, waning=compact.waning_box_exponential(0.8, 0, 1234))
+        event = compact.ScheduledEvent(start_day=4, interventions=[vax], coverage=0.7,
+                                       property_restrictions=['Demo:1']).to_dict()
+        ecc = event['Event_Coordinator_Config']
+        self.assertEqual(event['Start_Day'], 4)
+        self.assertEqual(event['Nodeset_Config']['class'], 'NodeSetAll')
+        self.assertEqual(ecc['Demographic_Coverage'], 0.7)
+        self.assertListEqual(ecc['Property_Restrictions'], ['Demo:1'])
+        self.assertEqual(ecc['Intervention_Config']['class'], 'TyphoidVaccine')
+        self.assertEqual(ecc['Intervention_Config']['Mode'], 'Shedding')
+        self.assertEqual(ecc['Intervention_Config']['Changing_Effect']['Decay_Time_Constant'], 1234)
+
+    def test_routine_immunization(self):
+        child_age = 250
+        event = compact.TriggeredEvent(start_day=4, interventions=[compact.SimpleVaccine()], node_ids=[1, 2],
+                                       delay=(child_age - 7, child_age + 7)).to_dict()
+        nlhtiv = event['Event_Coordinator_Config']['Intervention_Config']
+        self.assertListEqual(event['Nodeset_Config']['Node_List'], [1, 2])
+        self.assertListEqual(nlhtiv['Trigger_Condition_List'], ['Births'])
+        delayed = nlhtiv['Actual_IndividualIntervention_Config']
+        self.assertEqual(delayed['Delay_Distribution'], 'UNIFORM_DURATION')
+        self.assertEqual(delayed['Delay_Period_Max'], child_age + 7)
+        self.assertEqual(delayed['Actual_IndividualIntervention_Configs'][0]['Vaccine_Type'], 'AcquisitionBlocking')
+
+    def test_shared_and_immutable(self):
+        self.assertIs(compact.waning_box_exponential(0.8, 0, 10), compact.waning_box_exponential(0.8, 0, 10))
+        vax = compact.TyphoidVaccine()
+        self.assertEqual(vax, compact.TyphoidVaccine())
+        with self.assertRaises(AttributeError):
+            vax.efficacy = 0.5
+        with self.assertRaises(ValueError):
+            compact.SimpleVaccine(mode="Shedding")
+        events = [compact.TriggeredEvent(1, [vax], triggers=[''.join(['Bir', 'ths'])]) for _ in range(2)]
+        self.assertIs(events[0].triggers[0], events[1].triggers[0])
+
+    def test_incomplete_subclass(self):
+        class NoParams(compact._Parameterized):
+            __slots__ = ("effect",)
+
+        class NoDict(compact._Frozen):
+            __slots__ = ("effect",)
+
+        for incomplete in (NoParams, NoDict):
+            with self.assertRaises(TypeError):
+                incomplete(effect=0.5)
+
+    def test_multiple_interventions_and_save(self):
+        campaign = compact.CompactCampaign()
+        campaign.add(compact.ScheduledEvent(1, [compact.SimpleVaccine(), compact.BroadcastEvent("VaccineDistributed")],
+                                            target_age_min=0.75, target_age_max=15))
+        config = campaign.to_dict()['Events'][0]['Event_Coordinator_Config']
+        self.assertEqual(config['Target_Demographic'], 'ExplicitAgeRanges')
+        self.assertEqual(config['Intervention_Config']['class'], 'MultiInterventionDistributor')
+        self.assertEqual(len(config['Intervention_Config']['Intervention_List']), 2)
+        filename = self._testMethodName + ".json"
+        try:
+            campaign.save(filename)
+            self.assertDictEqual(read_camp(filename), json.loads(json.dumps(campaign.to_dict())))
+        finally:
+            pathlib.Path(filename).unlink(missing_ok=True)
+
+
+class TestInterventionImportTime(unittest.TestCase):
+    max_import_seconds = 0.1
+
+    def test_typhoid_vaccine_import_time(self):
+        # Fresh interpreter so nothing is already imported; -X importtime gives the breakdown if this regresses.
+        module = "emodpy_typhoid.interventions.typhoid_vaccine"
+        code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                                check=True)
+        elapsed = float(result.stdout.strip())
+        slowest = sorted((line for line in result.stderr.splitlines() if line.startswith("import time:")
+                          and "cumulative" not in line), key=lambda line: -int(line.split("|")[1]))[:10]
+        self.assertLess(elapsed, self.max_import_seconds, "Slowest imports:\n" + "\n".join(slowest))
+        # emod_api shouldn't be loaded until a builder runs
+        lazy_check = f"import sys, {module}; print('emod_api.interventions.common' in sys.modules)"
+        result = subprocess.run([sys.executable, "-c", lazy_check], capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "False")
+
+
 if __name__ == "__main__":
     unittest.main()
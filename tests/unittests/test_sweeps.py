@@ -0,0 +1,225 @@
+import copy
+import os
+import tempfile
+import unittest
+from functools import partial
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from emodpy_typhoid.sweeps.axes import SweepPlan, classify
+from emodpy_typhoid.sweeps.pairing import paired_design
+from emodpy_typhoid.sweeps.table import SweepTable, grid, latin_hypercube, load_tags, sobol
+
+
+def build_camp(camp=None, vax_eff=0.5):
+    return {"vax_eff": vax_eff}
+
+
+def call_builder(builder, params):
+    return builder() if params is None else builder(params=params)
+
+
+def create_campaign(simulation, builder, params=None):
+    # like emodpy: call the builder, read the campaign's events and triggers, then reset it
+    campaign = call_builder(builder, params)
+    if hasattr(campaign, "get_adhocs"):
+        simulation.adhocs = campaign.get_adhocs()
+        campaign.get_custom_coordinator_events()
+        campaign.get_custom_node_events()
+        simulation.campaign = copy.deepcopy(campaign.campaign_dict)
+        campaign.reset()
+    else:
+        simulation.campaign = campaign
+
+
+def new_simulation():
+    simulation = SimpleNamespace(campaign=None, demographics=None)
+    simulation.task = SimpleNamespace(
+        config=SimpleNamespace(parameters=SimpleNamespace()),
+        create_campaign_from_callback=lambda builder, params=None: create_campaign(simulation, builder, params),
+        create_demog_from_callback=lambda builder, from_sweep=False, params=None:
+            setattr(simulation, "demographics", call_builder(builder, params)))
+    return simulation
+
+
+builds = []
+
+
+class Camp:
+    def __init__(self):
+        self.schema_path = None
+        self.reset()
+
+    def reset(self):
+        self.campaign_dict = {"Events": []}
+        self.event_map = {}
+
+    def get_adhocs(self):
+        return self.event_map
+
+    def get_custom_coordinator_events(self):
+        return []
+
+    def get_custom_node_events(self):
+        return []
+
+
+def build_counted_camp(vax_eff=0.5, start_day=1):
+    # like emod_api.campaign: the same object is reset and rebuilt every time
+    builds.append((vax_eff, start_day))
+    Camp.instance.campaign_dict = {"Events": [{"Start_Day": start_day, "Effect": vax_eff}]}
+    Camp.instance.event_map = {"Vaccinated": "Vaccinated"}
+    return Camp.instance
+
+
+def build_params_camp(params=None):
+    return build_counted_camp(**params)
+
+
+def update_sim_random_seed(simulation, value):
+    simulation.task.config.parameters.Run_Number = value
+    return {"Run_Number": value}
+
+
+def update_campaign_efficacy(simulation, value):
+    simulation.task.create_campaign_from_callback(partial(build_counted_camp, vax_eff=value))
+    return {"vax_efficacy": value}
+
+
+def update_campaign_start(simulation, value):
+    simulation.task.create_campaign_from_callback(partial(build_counted_camp, start_day=value))
+    return {"campaign_start_day": value}
+
+
+def update_campaign_params(simulation, value):
+    simulation.task.create_campaign_from_callback(build_params_camp, params={"vax_eff": value})
+    return {"vax_efficacy": value}
+
+
+def update_demographics(simulation, value):
+    simulation.task.create_demog_from_callback(lambda: {"pop": value}, from_sweep=True)
+    return {"pop": value}
+
+
+def sweep(builder):
+    # what idmtools does with a builder: apply each item's callbacks to a fresh simulation and collect the tags
+    simulations = []
+    for callbacks in builder:
+        simulation = new_simulation()
+        simulation.tags = {}
+        for callback in callbacks:
+            simulation.tags.update(callback(simulation=simulation))
+        simulations.append(simulation)
+    return simulations
+
+
+class SweepTableTest(unittest.TestCase):
+    def test_rows_applied(self):
+        design = grid(vax_eff=[0.2, 0.8], Run_Number=range(3))
+        design["_arm"] = np.where(design["vax_eff"] > 0.5, "high", "low")
+        table = SweepTable(design, campaign_builder=build_camp, campaign_columns=["vax_eff"])
+        self.assertEqual(len(table), 6)
+        simulations = sweep(table)
+        self.assertEqual([sim.task.config.parameters.Run_Number for sim in simulations], [0, 1, 2, 0, 1, 2])
+        self.assertIsInstance(simulations[0].task.config.parameters.Run_Number, int)
+        self.assertFalse(hasattr(simulations[0].task.config.parameters, "vax_eff"))
+        self.assertEqual(simulations[4].campaign, {"vax_eff": 0.8})
+        self.assertDictEqual(simulations[4].tags, {"_arm": "high", "sweep_row": 4})
+
+    def test_streamed_design_and_tags(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "sweep.csv")
+            design = latin_hypercube({"Typhoid_Acute_Infectiousness": (2000, 6000), "Base_Infectivity_Constant": (0, 1)},
+                                     samples=50, seed=3, chunk_size=16)
+            table = SweepTable(design, tags_path=path)
+            self.assertIsNone(table.count)
+            simulations = sweep(table)
+            self.assertEqual(table.count, 50)
+            tags = load_tags(path)
+            self.assertEqual(len(tags), 50)
+            self.assertAlmostEqual(tags.loc[37, "Base_Infectivity_Constant"],
+                                   simulations[37].task.config.parameters.Base_Infectivity_Constant)
+            with self.assertRaises(ValueError):
+                list(table)
+
+    def test_designs(self):
+        design = latin_hypercube({"a": (0, 10), "b": (-1, 1)}, samples=20, seed=1)
+        # one sample in each of the 20 strata of every column
+        self.assertListEqual(sorted(np.floor(design["a"] / 0.5).astype(int)), list(range(20)))
+        self.assertTrue(design["b"].between(-1, 1).all())
+        chunks = list(sobol({"a": (0, 1)}, samples=64, seed=1, chunk_size=32))
+        self.assertEqual([len(chunk) for chunk in chunks], [32, 32])
+        self.assertEqual(len(pd.concat(chunks)["a"].unique()), 64)
+
+    def test_bad_columns(self):
+        with self.assertRaises(ValueError):
+            SweepTable(grid(vax_eff=[0.5]), campaign_columns=["vax_eff"])
+        with self.assertRaises(ValueError):
+            list(SweepTable(grid(Run_Number=[1]), campaign_builder=build_camp, campaign_columns=["vax_eff"]))
+
+
+class SweepPlanTest(unittest.TestCase):
+    def setUp(self):
+        builds.clear()
+        Camp.instance = Camp()
+
+    def test_classify(self):
+        self.assertEqual(classify(update_sim_random_seed, 1), {"config"})
+        self.assertEqual(classify(update_campaign_efficacy, 0.5), {"campaign"})
+        self.assertEqual(classify(update_demographics, 10), {"demographics"})
+        self.assertEqual(builds, [])
+
+    def test_builds_once_per_combination(self):
+        plan = SweepPlan()
+        plan.add_sweep_definition(update_campaign_efficacy, [0.0, 0.5, 1.0])
+        plan.add_sweep_definition(update_sim_random_seed, range(5))
+        plan.add_sweep_definition(update_demographics, [100, 200])
+        simulations = sweep(plan)
+        self.assertEqual(len(simulations), len(plan))
+        self.assertEqual(len(builds), 3)
+        self.assertEqual(plan.builds, {"campaign": 3, "demographics": 2})
+        self.assertEqual(plan.kinds, {0: {"campaign"}, 1: {"config"}, 2: {"demographics"}})
+        # same efficacy, different seeds: one build, and resetting one simulation's campaign leaves the others
+        self.assertEqual(simulations[9].campaign, {"Events": [{"Start_Day": 1, "Effect": 0.0}]})
+        self.assertDictEqual(simulations[9].adhocs, {"Vaccinated": "Vaccinated"})
+        self.assertEqual(simulations[-1].campaign["Events"][0]["Effect"], 1.0)
+        self.assertEqual([sim.task.config.parameters.Run_Number for sim in simulations[:4]], [0, 0, 1, 1])
+        self.assertDictEqual(simulations[3].tags, {"vax_efficacy": 0.0, "Run_Number": 1, "pop": 200})
+
+    def test_campaign_axes_combined(self):
+        plan = SweepPlan()
+        plan.add_sweep_definition(update_campaign_efficacy, [0.2, 0.8])
+        plan.add_sweep_definition(update_campaign_start, [1, 366])
+        simulations = sweep(plan)
+        self.assertEqual(sorted(builds), [(0.2, 1), (0.2, 366), (0.8, 1), (0.8, 366)])
+        self.assertEqual(simulations[1].campaign["Events"][0], {"Start_Day": 366, "Effect": 0.2})
+
+    def test_builder_params(self):
+        plan = SweepPlan()
+        plan.add_sweep_definition(update_campaign_params, [0.2, 0.8])
+        plan.add_sweep_definition(update_sim_random_seed, range(3))
+        simulations = sweep(plan)
+        self.assertEqual(builds, [(0.2, 1), (0.8, 1)])
+        self.assertEqual([sim.campaign["Events"][0]["Effect"] for sim in simulations], [0.2] * 3 + [0.8] * 3)
+
+
+class PairedDesignTest(unittest.TestCase):
+    def test_arms_share_run_numbers(self):
+        design = paired_design({"no_vax": {"vax_eff": 0.0}, "vax": {"vax_eff": 0.82}}, replicates=3, first_run_number=10)
+        self.assertListEqual(design["Run_Number"].tolist(), [10, 10, 11, 11, 12, 12])
+        self.assertListEqual(design["_arm"].tolist(), ["no_vax", "vax"] * 3)
+        simulations = sweep(SweepTable(design, campaign_builder=build_camp, campaign_columns=["vax_eff"]))
+        self.assertDictEqual(simulations[3].tags, {"_arm": "vax", "_pair": 1, "sweep_row": 3})
+        self.assertEqual(simulations[3].campaign, {"vax_eff": 0.82})
+
+    def test_bad_arms(self):
+        with self.assertRaises(ValueError):
+            paired_design({"a": {"vax_eff": 0.0}, "b": {"coverage": 1.0}}, replicates=2)
+        with self.assertRaises(ValueError):
+            paired_design({"a": {"Run_Number": 1}}, replicates=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,451 @@
+import hashlib
+import json
+import os
+import pickle
+import socket
+import struct
+import tempfile
+import threading
+import unittest
+from types import SimpleNamespace
+
+import emodpy_typhoid.utils.build_daemon as build_daemon
+import emodpy_typhoid.utils.profiling as prof
+import emodpy_typhoid.utils.schema_snapshot as schema_snapshot
+from emodpy_typhoid.utils.schema_index import ParameterIndex
+import emodpy_typhoid.utils.worker_pool as worker_pool
+from emodpy_typhoid.utils.fingerprint import ResultCache, bundle_fingerprint, canonical_json
+
+
+class FingerprintTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.demog = os.path.join(self.tmp.name, "TestDemographics_pak_updated.json")
+        with open(self.demog, "w") as demog_file:
+            json.dump({"Defaults": {"IndividualAttributes": {"AgeDistributionFlag": 1}}, "Nodes": []}, demog_file)
+        self.config = SimpleNamespace(parameters={"Run_Number": 1, "Base_Individual_Sample_Rate": 0.2,
+                                                  "schema": {"ignored": True}})
+        self.campaign = {"Events": [{"Start_Day": 1.0}], "Use_Defaults": 1}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_canonical_json(self):
+        self.assertEqual(canonical_json({"b": 1.0, "a": [2, 3.5], "schema": {}}), '{"a":[2,3.5],"b":1}')
+
+    def test_fingerprint_stable_and_sensitive(self):
+        fp, components = bundle_fingerprint(self.config, self.campaign, [self.demog], binary="dtk_centos_2018")
+        # reformatting the demographics file or reordering keys doesn't change the hash
+        with open(self.demog) as demog_file:
+            demog = json.load(demog_file)
+        with open(self.demog, "w") as demog_file:
+            json.dump(demog, demog_file, indent=4)
+        config = {"parameters": {"Base_Individual_Sample_Rate": 0.2, "Run_Number": 1.0}}
+        fp2, _ = bundle_fingerprint(config, {"Use_Defaults": 1, "Events": [{"Start_Day": 1}]}, [self.demog],
+                                    binary="dtk_centos_2018")
+        self.assertEqual(fp, fp2)
+        self.assertEqual(len(components["demographics"]), 1)
+
+        self.config.parameters["Run_Number"] = 2
+        fp3, _ = bundle_fingerprint(self.config, self.campaign, [self.demog], binary="dtk_centos_2018")
+        self.assertNotEqual(fp, fp3)
+        fp4, _ = bundle_fingerprint(self.config, self.campaign, [self.demog], binary="dtk_centos")
+        self.assertNotEqual(fp3, fp4)
+
+    def test_result_cache(self):
+        cache = ResultCache(os.path.join(self.tmp.name, "cache"))
+        fp, components = bundle_fingerprint(self.config, self.campaign, [self.demog])
+        self.assertIsNone(cache.get(fp, experiment="exp"))
+        inset = os.path.join(self.tmp.name, "InsetChart.json")
+        with open(inset, "w") as inset_file:
+            json.dump({"Channels": {}}, inset_file)
+        path = cache.put(fp, [inset], components)
+        self.assertTrue(os.path.isfile(os.path.join(path, "InsetChart.json")))
+
+        cached, to_run = cache.partition({"sim1": fp, "sim2": "f" * 64}, experiment="exp")
+        self.assertDictEqual(cached, {"sim1": path})
+        self.assertListEqual(to_run, ["sim2"])
+        self.assertAlmostEqual(cache.hit_rate("exp"), 1 / 3)
+        self.assertIn("exp", cache.report())
+
+
+class ProfilingTest(unittest.TestCase):
+    def setUp(self):
+        prof.reset()
+
+    def tearDown(self):
+        prof.disable()
+        prof.reset()
+
+    def test_disabled_records_nothing(self):
+        @prof.profiled()
+        def build_camp():
+            return 42
+
+        self.assertEqual(build_camp(), 42)
+        with prof.phase("build_demog"):
+            pass
+        self.assertListEqual(prof.records, [])
+
+    def test_phases_and_exports(self):
+        prof.enable(allocations=True)
+
+        @prof.profiled("set_param_fn")
+        def set_param_fn(config):
+            config["x"] = [0] * 1000
+            return config
+
+        for sim in range(3):
+            with prof.phase("build_camp", sim=sim):
+                set_param_fn({})
+        stats = prof.summary()
+        self.assertEqual(stats["build_camp"]["calls"], 3)
+        self.assertEqual(stats["set_param_fn"]["calls"], 3)
+        self.assertGreaterEqual(stats["build_camp"]["total"], stats["set_param_fn"]["total"])
+        self.assertIsNotNone(stats["set_param_fn"]["allocated"])
+        self.assertIn("set_param_fn", prof.format_summary())
+
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(prof.export_chrome_trace(os.path.join(tmp, "trace.json"))) as trace_file:
+                trace = json.load(trace_file)
+            self.assertEqual(len(trace["traceEvents"]), 6)
+            self.assertEqual(trace["traceEvents"][1]["args"]["sim"], "0")
+            with open(prof.export_json(os.path.join(tmp, "profile.json"))) as json_file:
+                self.assertIn("build_camp", json.load(json_file)["summary"])
+
+
+def build_vax_camp(camp, vax_eff):
+    camp.add({"Start_Day": 1, "Event_Coordinator_Config": {"Intervention_Config": {"Effect": vax_eff}}})
+    camp.get_send_trigger("Vaccinated")
+
+
+def create_campaign(created, builder):
+    # what emodpy's create_campaign_from_callback does with the campaign a builder returns
+    campaign = builder()
+    created.append((json.loads(json.dumps(campaign.campaign_dict)), campaign.get_adhocs(),
+                    campaign.get_custom_coordinator_events(), campaign.get_custom_node_events()))
+    campaign.reset()
+
+
+def set_run_number(config, run_number):
+    config.parameters.Run_Number = run_number
+
+
+def worker_state():
+    return worker_pool.worker["pid"], worker_pool.worker["schema_loads"], worker_pool.worker["schema_sha256"]
+
+
+class WarmBuilderPoolTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.schema = os.path.join(cls.tmp.name, "schema.json")
+        with open(cls.schema, "w") as schema_file:
+            json.dump({"idmTypes": {}, "Version": "test"}, schema_file)
+        cls.pool = worker_pool.WarmBuilderPool(cls.schema, processes=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.shutdown()
+        cls.tmp.cleanup()
+
+    def test_schema_loaded_once_per_worker(self):
+        with open(self.schema, "rb") as schema_file:
+            sha256 = hashlib.sha256(schema_file.read()).hexdigest()
+        states = [future.result() for future in [self.pool.submit(worker_state) for _ in range(20)]]
+        self.assertTrue(all(loads == 1 and digest == sha256 for _, loads, digest in states))
+        self.assertLessEqual(len({pid for pid, _, _ in states}), 2)
+        self.assertNotIn(os.getpid(), {pid for pid, _, _ in states})
+
+    def test_build_campaigns_and_configs(self):
+        campaigns = self.pool.build_campaigns(build_vax_camp, [{"vax_eff": eff} for eff in [0.2, 0.5, 0.9]])
+        self.assertListEqual([campaign["Events"][0]["Event_Coordinator_Config"]["Intervention_Config"]["Effect"]
+                              for campaign in campaigns], [0.2, 0.5, 0.9])
+        configs = self.pool.build_configs(set_run_number, {"parameters": {"Run_Number": 0, "Simulation_Duration": 10}},
+                                          [{"run_number": run} for run in range(3)])
+        self.assertListEqual([config["parameters"]["Run_Number"] for config in configs], [0, 1, 2])
+        self.assertEqual(configs[2]["parameters"]["Simulation_Duration"], 10)
+
+    def test_sweep_callback(self):
+        created = []
+        submitted = []
+        submit_context = self.pool.submit_context
+        self.pool.submit_context = lambda build_fn, **kwargs: submitted.append(kwargs) or submit_context(build_fn, **kwargs)
+        try:
+            callback = self.pool.sweep_callback(build_vax_camp, "vax_eff", [0.1, 0.2, 0.1])
+            for value in [0.2, 0.1, 0.3, 0.2, 0.3]:
+                task = SimpleNamespace(create_campaign_from_callback=lambda builder: create_campaign(created, builder))
+                self.assertDictEqual(callback(SimpleNamespace(task=task), value), {"vax_eff": value})
+        finally:
+            del self.pool.submit_context
+        self.assertListEqual(submitted, [{"vax_eff": 0.1}, {"vax_eff": 0.2}, {"vax_eff": 0.3}])
+        self.assertListEqual([campaign["Events"][0]["Event_Coordinator_Config"]["Intervention_Config"]["Effect"]
+                              for campaign, _, _, _ in created], [0.2, 0.1, 0.3, 0.2, 0.3])
+        # a repeated value gets the full campaign and its triggers again
+        self.assertEqual(created[3], created[0])
+        self.assertDictEqual(created[3][1], {"Vaccinated": "Vaccinated"})
+
+
+def demographics_from_file(path, pop):
+    with open(path) as node_file:
+        node_ids = [int(line) for line in node_file if line.strip()]
+    return {"Nodes": [{"NodeID": node_id, "NodeAttributes": {"InitialPopulation": pop}} for node_id in node_ids]}
+
+
+class BuildDaemonTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.tmp.name, "build.sock")
+        self.nodes = os.path.join(self.tmp.name, "nodes.txt")
+        with open(self.nodes, "w") as node_file:
+            node_file.write("1\n2\n")
+        ready = threading.Event()
+        self.thread = threading.Thread(target=build_daemon.serve, args=(self.socket_path,),
+                                       kwargs={"profiles": {"base": {"parameters": {"Run_Number": 0, "Typhoid_Acute_Infectiousness": 4000}}},
+                                               "ready": ready}, daemon=True)
+        self.thread.start()
+        ready.wait(10)
+        self.client = build_daemon.BuildClient(self.socket_path)
+
+    def tearDown(self):
+        self.client.shutdown()
+        self.thread.join(10)
+        self.tmp.cleanup()
+
+    def test_builds(self):
+        created = []
+        for eff in [0.3, 0.6]:
+            camp = self.client.campaign("test_utils:build_vax_camp", vax_eff=eff)
+            create_campaign(created, lambda: camp)
+        self.assertListEqual([campaign["Events"][0]["Event_Coordinator_Config"]["Intervention_Config"]["Effect"]
+                              for campaign, _, _, _ in created], [0.3, 0.6])
+        self.assertDictEqual(created[1][1], {"Vaccinated": "Vaccinated"})
+        self.assertDictEqual(self.client.config("base", Run_Number=7),
+                             {"Run_Number": 7, "Typhoid_Acute_Infectiousness": 4000})
+        status = self.client.status()
+        self.assertEqual(status["builders"], ["test_utils:build_vax_camp"])
+        self.assertEqual(status["requests"], 4)
+
+    def test_demographics_cached_until_input_changes(self):
+        first = self.client.demographics("test_utils:demographics_from_file", path=self.nodes, pop=1000)
+        self.assertEqual([node["NodeID"] for node in first["Nodes"]], [1, 2])
+        self.client.demographics("test_utils:demographics_from_file", path=self.nodes, pop=1000)
+        self.assertEqual(self.client.status()["demographics_cached"], 1)
+        with open(self.nodes, "a") as node_file:
+            node_file.write("3\n")
+        os.utime(self.nodes, ns=(0, 1))
+        changed = self.client.demographics("test_utils:demographics_from_file", path=self.nodes, pop=1000)
+        self.assertEqual(len(changed["Nodes"]), 3)
+
+    def test_errors(self):
+        with self.assertRaisesRegex(ValueError, "Unknown profile"):
+            self.client.config("missing")
+        with self.assertRaisesRegex(ValueError, "module:function"):
+            self.client.campaign("build_vax_camp")
+        # the connection stays usable after a failed request
+        self.assertEqual(self.client.config("base")["Run_Number"], 0)
+
+    def test_second_daemon_refused(self):
+        with self.assertRaises(FileExistsError):
+            build_daemon.serve(self.socket_path)
+        self.assertEqual(self.client.config("base")["Run_Number"], 0)
+
+    def test_stale_socket_replaced(self):
+        stale_path = os.path.join(self.tmp.name, "stale.sock")
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(stale_path)
+        stale.close()
+        ready = threading.Event()
+        thread = threading.Thread(target=build_daemon.serve, args=(stale_path,), kwargs={"ready": ready}, daemon=True)
+        thread.start()
+        self.assertTrue(ready.wait(10))
+        with build_daemon.BuildClient(stale_path) as client:
+            self.assertEqual(client.status()["requests"], 1)
+            client.shutdown()
+        thread.join(10)
+
+    def test_demographics_cache_bounded(self):
+        server = build_daemon.BuildServer(max_demographics=2)
+        for pop in [100, 200, 100, 300]:
+            server.demographics("test_utils:demographics_from_file", {"path": self.nodes, "pop": pop})
+        # 200 was the least recently used
+        self.assertEqual(server.status()["demographics_cached"], 2)
+        self.assertListEqual([json.loads(key)[1]["pop"] for key in server.demographics_cache], [100, 300])
+
+
+BUNDLED_SCHEMA = os.path.join(os.path.dirname(__file__), "..", "perf_tests", "data", "schema.json")
+
+
+def snapshot_schema(effect_default=0.5):
+    float_param = {"default": 1.0, "type": "float", "min": 0, "max": 100000}
+    return {"idmTypes": {
+        "idmAbstractType:Intervention": {"IndividualIntervention": {"TyphoidVaccine": {
+            "class": "TyphoidVaccine", "Effect": dict(float_param, default=effect_default, max=1),
+            "Mode": {"default": "Shedding", "type": "enum", "enum": ["Shedding", "Dose", "Exposures"]},
+            "Changing_Effect": {"type": "idmType:WaningEffect"}, "Sim_Types": ["TYPHOID_SIM"]}}},
+        "idmType:WaningEffect": {"WaningEffectBoxExponential": {
+            "class": "WaningEffectBoxExponential", "Initial_Effect": float_param, "Box_Duration": float_param,
+            "Decay_Time_Constant": float_param}}}}
+
+
+class SchemaSnapshotTest(unittest.TestCase):
+    def setUp(self):
+        schema_snapshot.clear()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.schema = os.path.join(self.tmp.name, "schema.json")
+        self.write_schema(snapshot_schema())
+
+    def tearDown(self):
+        schema_snapshot.clear()
+        self.tmp.cleanup()
+
+    def write_schema(self, schema):
+        with open(self.schema, "w") as schema_file:
+            json.dump(schema, schema_file)
+
+    def test_matches_emod_api(self):
+        import emod_api.schema_to_class as s2c
+        for classname in ["TyphoidVaccine", "WaningEffectBoxExponential"]:
+            self.assertEqual(schema_snapshot.get_class_with_defaults(classname, self.schema),
+                             s2c.get_class_with_defaults(classname, self.schema))
+        self.assertTrue(os.path.isfile(schema_snapshot.snapshot_path(self.schema)))
+        # each lookup is a fresh, schema-checked object
+        vaccine = schema_snapshot.get_class_with_defaults("TyphoidVaccine", self.schema)
+        vaccine.Effect = 0.9
+        with self.assertRaises(ValueError):
+            vaccine.Mode = "Typo"
+        self.assertEqual(schema_snapshot.get_class_with_defaults("TyphoidVaccine", self.schema).Effect, 0.5)
+
+    def test_builders_use_snapshot(self):
+        import emodpy_typhoid.interventions.typhoid_vaccine as ty
+        vaccine = ty.new_intervention(SimpleNamespace(schema_path=self.schema), efficacy=0.7, decay_constant=100)
+        self.assertEqual(vaccine.Changing_Effect.Decay_Time_Constant, 100)
+        self.assertIn("TyphoidVaccine", schema_snapshot.load(self.schema))
+
+    def test_invalidation(self):
+        snapshot = schema_snapshot.load(self.schema)
+        snap_mtime = os.stat(schema_snapshot.snapshot_path(self.schema)).st_mtime_ns
+        # a new process loads the file rather than compiling again
+        schema_snapshot.clear()
+        self.assertEqual(schema_snapshot.load(self.schema).sha256, snapshot.sha256)
+        # touching the schema without changing it keeps the snapshot
+        os.utime(self.schema, ns=(1, 1))
+        schema_snapshot.load(self.schema)
+        self.assertEqual(os.stat(schema_snapshot.snapshot_path(self.schema)).st_mtime_ns, snap_mtime)
+        self.write_schema(snapshot_schema(effect_default=0.25))
+        self.assertEqual(schema_snapshot.get_class_with_defaults("TyphoidVaccine", self.schema).Effect, 0.25)
+
+    def test_never_unpickles(self):
+        marker = os.path.join(self.tmp.name, "ran")
+
+        class Payload:
+            def __reduce__(self):
+                return open, (marker, "w")
+        header = pickle.dumps({"format": schema_snapshot.FORMAT, "payload": Payload()})
+        with open(schema_snapshot.snapshot_path(self.schema), "wb") as snap_file:
+            snap_file.write(struct.pack("<Q", len(header)) + header)
+        self.assertEqual(schema_snapshot.get_class_with_defaults("TyphoidVaccine", self.schema).Effect, 0.5)
+        self.assertFalse(os.path.exists(marker))
+        # rebuilt as JSON
+        with open(schema_snapshot.snapshot_path(self.schema), "rb") as snap_file:
+            size, = struct.unpack("<Q", snap_file.read(8))
+            self.assertIn("TyphoidVaccine", json.loads(snap_file.read(size))["index"])
+
+    def test_bundled_schema(self):
+        # interventions grouped under idmAbstractType:IndividualIntervention and NodeIntervention
+        import emod_api.schema_to_class as s2c
+        with open(BUNDLED_SCHEMA) as schema_file:
+            self.write_schema(json.load(schema_file))
+        snapshot = schema_snapshot.load(self.schema)
+        for classname in ["TyphoidVaccine", "TyphoidWASH", "Outbreak", "NodeLevelHealthTriggeredIV"]:
+            self.assertIn(classname, snapshot)
+        self.assertEqual(schema_snapshot.get_class_with_defaults("TyphoidWASH", self.schema),
+                         s2c.get_class_with_defaults("TyphoidWASH", self.schema))
+
+    def test_missing_class(self):
+        with self.assertRaises(ValueError):
+            schema_snapshot.get_class_with_defaults("TyphoidNotAClass", self.schema)
+
+    def test_profiled_lookups(self):
+        import emodpy_typhoid.interventions.typhoid_vaccine as ty
+        prof.reset()
+        prof.enable()
+        undo = prof.profile_emod_api()
+        try:
+            ty.new_intervention(SimpleNamespace(schema_path=self.schema), efficacy=0.7, decay_constant=100)
+            # a miss falls back to emod_api's lookup but is one lookup
+            with self.assertRaises(ValueError):
+                schema_snapshot.get_class_with_defaults("TyphoidNotAClass", self.schema)
+        finally:
+            undo()
+            prof.disable()
+        self.assertEqual(prof.summary()["schema_lookup"]["calls"], 3)
+        prof.reset()
+
+
+class ParameterIndexTest(unittest.TestCase):
+    def setUp(self):
+        old = snapshot_schema()
+        old["config"] = {"Run_Number": {"default": 0, "type": "integer"},
+                         "Typhoid_Acute_Infectiousness": {"default": 4000, "type": "float"}}
+        new = snapshot_schema()
+        new["config"] = {"Run_Number": {"default": 0, "type": "integer"},
+                         "Typhoid_Acute_Infectiousness": {"default": 4000, "type": "float"},
+                         "Environment": {"Environmental_Cutoff_Days": {"default": 0, "type": "float"}}}
+        new["idmTypes"]["idmAbstractType:Intervention"]["IndividualIntervention"]["TyphoidWASH"] = {
+            "class": "TyphoidWASH", "Effect": {"default": 1, "type": "float"}}
+        self.index = ParameterIndex.build({"2018": old, "current": new})
+
+    def test_queries_and_round_trip(self):
+        self.assertTrue(self.index.has_param("Environmental_Cutoff_Days", "current"))
+        self.assertFalse(self.index.has_param("Environmental_Cutoff_Days", "2018"))
+        self.assertTrue(self.index.has_field("WaningEffectBoxExponential", "Box_Duration", "2018"))
+        self.assertEqual(self.index.versions_with("TyphoidWASH"), ["current"])
+        with tempfile.TemporaryDirectory() as tmp:
+            loaded = ParameterIndex.load(self.index.save(os.path.join(tmp, "index.json")))
+        self.assertEqual(loaded.versions_with("Run_Number"), ["2018", "current"])
+        with self.assertRaisesRegex(ValueError, "Unknown schema version"):
+            loaded.has_param("Run_Number", "2016")
+
+    def test_config(self):
+        config = SimpleNamespace(parameters={"Run_Number": 1, "Environmental_Cutoff_Days": 190.0, "schema": {}})
+        self.index.check_config(config, "current")
+        with self.assertRaisesRegex(ValueError, r"Environmental_Cutoff_Days \(in \['current'\]\)"):
+            self.index.check_config(config, "2018")
+        self.assertEqual(self.index.adapt_config(config, "2018"), ["Environmental_Cutoff_Days"])
+        self.assertNotIn("Environmental_Cutoff_Days", config.parameters)
+
+    def test_campaign(self):
+        campaign = {"Events": [{"Event_Coordinator_Config": {"Intervention_Config": {
+            "class": "TyphoidWASH", "Effect": 0.5}}},
+            {"Event_Coordinator_Config": {"Intervention_Config": {
+                "class": "TyphoidVaccine", "Effect": 0.5, "Changing_Effect": {
+                    "class": "WaningEffectBoxExponential", "Box_Duration": 10, "Half_Life": 3}}}}]}
+        self.assertEqual(len(self.index.campaign_problems(campaign, "current")), 1)
+        problems = self.index.campaign_problems(campaign, "2018")
+        self.assertEqual([path for path, _ in problems],
+                         ["campaign.Events[0].Event_Coordinator_Config.Intervention_Config",
+                          "campaign.Events[1].Event_Coordinator_Config.Intervention_Config.Changing_Effect.Half_Life"])
+        with self.assertRaisesRegex(ValueError, "class TyphoidWASH isn't in schema '2018'"):
+            self.index.check_campaign(campaign, "2018")
+
+    def test_package_campaigns(self):
+        from emodpy_typhoid.campaign.carrier_program import CarrierScreeningProgram
+        from emodpy_typhoid.campaign.vaccine_schedule import VaccineSchedule
+        # a schema in the newer layout, with interventions under idmAbstractType:IndividualIntervention
+        index = ParameterIndex.build({"current": BUNDLED_SCHEMA})
+        self.assertTrue(index.has_class("TyphoidVaccine", "current"))
+        self.assertTrue(index.has_class("TyphoidWASH", "current"))
+        self.assertTrue(index.has_class("Outbreak", "current"))
+        program = CarrierScreeningProgram()
+        program.add_rounds(days=[3650, 4015], coverage=0.3, node_ids=[1])
+        schedule = VaccineSchedule(name="TCV", start_day=100)
+        schedule.routine(age=270, coverage=0.85)
+        schedule.routine(age=450, window=14, coverage=0.9)
+        for campaign in [program.compile().to_dict(), schedule.compile().to_dict()]:
+            self.assertListEqual(index.campaign_problems(campaign, "current"), [])
+            index.check_campaign(campaign, "current")
+
+
+if __name__ == '__main__':
+    unittest.main()